@@ -1,24 +1,37 @@
-from util.HomePage import getHomePageAttendance, getHomePageCGPA
+import time
+BOOT_STARTED = time.perf_counter()
+
+from util.HomePage import getPooledSession, getPooledSessionAsync, invalidatePooledSession, scrapeShared, session_pool, client_pool, LoggedOutError
 from util.Attendance import *
-from util.Feedback import auto_feedback_task
-from util.Cgpa import getStudentCourses, getCompletedSemester, getCGPA
-from util.Timetable import getExamSchedule
-from util.Internals import getInternals, getTargetScore, calculateTarget
-import pandas as pd
+from util.Cgpa import getStudentCourses, getCompletedSemester, getCGPA, getStudentCoursesAsync, getCompletedSemesterAsync
+from util.Timetable import getExamSchedule, getExamScheduleAsync, scheduleStrategyStats
+from util.ResultTable import ResultTable
+from util.Internals import getInternals, getTargetScore, calculateTarget, getInternalsAsync, getTargetGrid
+from util.UserInfo import getUserInfoAsync
+from util.Transport import warmUpConnections, upstream_limiter
+from util.SessionPool import sessionKey
+from util.Cache import StaleWhileRevalidateCache
+from util.LazyImport import LazyModule, recordImport, importReport, logImportReport
+from util.FeedbackJobs import FeedbackJobQueue
+from util.FeedbackHttp import submitFeedbackHttp, FeedbackFlowError, FEEDBACK_ENGINE, FEEDBACK_HTTP_FALLBACK
+from util.Metrics import Gauge, section_seconds, render as render_metrics
+from util.ServerTiming import startTimings, sectionTimings, includeTimings, current_timings
+from util.Deadline import DeadlineExceeded, startDeadline, timeRemaining
+from util.Executors import io_executor, cpu_executor, runBlocking, executorStats
 import os
 import traceback
 import logging
 import base64
 import json
 import asyncio
+import anyio.to_thread
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 from fastapi.exceptions import RequestValidationError
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime
 import pytz
-from bs4 import BeautifulSoup
 
 # Setup logging
 logging.basicConfig(level=logging.WARNING)  # Default to WARNING, will be updated after env vars
@@ -33,12 +46,19 @@ from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime
 import pytz
-from bs4 import BeautifulSoup
 
 # Setup logging
 logging.basicConfig(level=logging.WARNING)  # Default to WARNING, will be updated after env vars
 logger = logging.getLogger("nimora-api")
 
+# Selenium is only needed by /auto-feedback, so it is imported on the first feedback job
+feedback = LazyModule("util.Feedback")
+
+# Feedback browsers to launch at startup, 0 keeps Selenium out of the boot path
+FEEDBACK_BROWSER_PREWARM = int(os.environ.get("FEEDBACK_BROWSER_PREWARM", "0"))
+
+recordImport("app", BOOT_STARTED)
+
 # Payload security utilities
 class PayloadSecurity:
     @staticmethod
@@ -83,6 +103,15 @@ IS_VERCEL = DEPLOYMENT_ENV != "development"
 # Security configuration
 PAYLOAD_SALT = os.environ.get("PAYLOAD_SALT", "nimora_secure_payload_2025")  # Default for development
 
+# Server-Timing header on every response; ?timings=true also adds a `timings` object to the body
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "true").lower() == "true"
+
+# Seconds every request gets for its logins, fetches and parses; clients may ask for
+# another deadline with ?deadline=<seconds>, between REQUEST_DEADLINE_MIN and REQUEST_DEADLINE_MAX
+REQUEST_DEADLINE     = float(os.environ.get("REQUEST_DEADLINE", "25"))
+REQUEST_DEADLINE_MIN = float(os.environ.get("REQUEST_DEADLINE_MIN", "1"))
+REQUEST_DEADLINE_MAX = float(os.environ.get("REQUEST_DEADLINE_MAX", "60"))
+
 # Update logging level based on environment
 log_level = os.environ.get("LOG_LEVEL", "WARNING" if DEPLOYMENT_ENV == "production" else "INFO")
 logging.getLogger().setLevel(getattr(logging, log_level.upper()))
@@ -108,6 +137,34 @@ async def log_requests(request: Request, call_next):
         logger.error(f"Request failed: {request.method} {request.url.path} - {str(e)}")
         raise
 
+# Phase timings of the request: logins, upstream fetches, parses and compute steps
+@app.middleware("http")
+async def server_timing(request: Request, call_next):
+    in_body = request.query_params.get("timings", "").lower() == "true"
+    if not (SERVER_TIMING or in_body):
+        return await call_next(request)
+    
+    timings = startTimings(in_body)
+    response = await call_next(request)
+    response.headers["Server-Timing"] = timings.serverTiming()
+    response.headers["Timing-Allow-Origin"] = "*"
+    return response
+
+# Deadline for the upstream work of the request, 0 leaves it unbounded
+@app.middleware("http")
+async def request_deadline(request: Request, call_next):
+    seconds = REQUEST_DEADLINE
+    requested = request.query_params.get("deadline")
+    if requested:
+        try:
+            seconds = min(max(float(requested), REQUEST_DEADLINE_MIN), REQUEST_DEADLINE_MAX)
+        except ValueError:
+            pass
+    
+    if seconds > 0:
+        startDeadline(seconds)
+    return await call_next(request)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -115,8 +172,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+# Warm the shared upstream connection pool without delaying startup
+@app.on_event("startup")
+async def warm_up_upstream():
+    logImportReport()
+    app.state.warmup_task = asyncio.create_task(warmUpConnections())
+    
+    # Resolve ChromeDriver and launch feedback browsers on the io executor, off the event loop
+    if FEEDBACK_BROWSER_PREWARM > 0 and os.environ.get("DISABLE_FEEDBACK", "false").lower() != "true":
+        app.state.browser_warmup = asyncio.create_task(
+            runBlocking(feedback.browser_pool.prewarm, FEEDBACK_BROWSER_PREWARM)
+        )
+
+@app.on_event("shutdown")
+def close_feedback_browsers():
+    feedback_jobs.shutdown()
+    if feedback.loaded:
+        feedback.browser_pool.shutdown()
+    io_executor.shutdown(wait=False, cancel_futures=True)
+    cpu_executor.shutdown(wait=False, cancel_futures=True)
+
 # Custom exception handlers
 @app.exception_handler(404)
 async def custom_404_handler(request: Request, exc):
@@ -131,8 +209,13 @@ async def custom_404_handler(request: Request, exc):
                 "/cgpa": "Get CGPA and semester-wise GPA",
                 "/exam-schedule": "Get upcoming exam schedule",
                 "/auto-feedback": "Submit automated feedback",
+                "/auto-feedback/{job_id}": "Get the status and progress of a feedback job",
                 "/internals": "Get internal marks and assessment data",
                 "/data": "Get combined data for attendance, timetable, cgpa, internals, and user info",
+                "/attendance/what-if": "Affordable or required classes per course for a list of target percentages",
+                "/internals/targets": "Minimum end semester score per course for a list of target percentages",
+                "/data/stream": "Stream the /data sections as NDJSON, one line per section as it completes",
+                "/metrics": "Prometheus metrics for logins, upstream pages, parsing and /data sections",
             }
         }
     )
@@ -186,9 +269,43 @@ def health_check():
         "timestamp": datetime.now(pytz.UTC).isoformat(),
         "service": "nimora-api",
         "version": "1.0.0",
-        "environment": DEPLOYMENT_ENV
+        "environment": DEPLOYMENT_ENV,
+        "imports": importReport(),
+        "feedback_jobs": feedback_jobs.stats(),
+        "exam_schedule_strategies": scheduleStrategyStats(),
+        "upstream_limiter": upstream_limiter.stats(),
+        "executors": executorStats()
     }
 
+def threadpool_stats():
+    """Busy workers, queued work and size of each thread pool"""
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    pools = {
+        "anyio": {"busy": limiter.borrowed_tokens, "queued": limiter.statistics().tasks_waiting, "limit": limiter.total_tokens}
+    }
+    # Blocking work goes to the io and cpu executors, which count their own busy and queued work
+    pools.update(executorStats())
+    jobs = feedback_jobs.stats()
+    pools["feedback"] = {"busy": jobs["running"], "queued": jobs["queued"], "limit": jobs["workers"]}
+    return pools
+
+def threadpool_gauge(field):
+    return lambda: {(pool,): stats[field] for pool, stats in threadpool_stats().items()}
+
+# Gauges read when /metrics is rendered
+Gauge("nimora_threadpool_busy", "Busy workers in each thread pool", ("pool",), function=threadpool_gauge("busy"))
+Gauge("nimora_threadpool_queue_depth", "Work waiting for a worker in each thread pool", ("pool",), function=threadpool_gauge("queued"))
+Gauge("nimora_threadpool_limit", "Maximum workers of each thread pool", ("pool",), function=threadpool_gauge("limit"))
+Gauge("nimora_active_sessions", "Logged-in portal sessions kept for reuse", ("pool",),
+      function=lambda: {("sync",): len(session_pool), ("async",): len(client_pool)})
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus metrics in the text exposition format
+    """
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 class UserCredentials(BaseModel):
     rollno: str
     password: str
@@ -205,6 +322,7 @@ class FeedbackRequest(BaseModel):
 
 
 @app.post("/login")
+@includeTimings
 async def login(request: dict):
     """
     DEPRECATED: Use /data endpoint instead.
@@ -239,7 +357,8 @@ async def login(request: dict):
         raise HTTPException(status_code=400, detail="Invalid request format")
 
 @app.post("/attendance")
-def get_attendance(request: dict):
+@includeTimings
+async def get_attendance(request: dict):
     """
     Get raw attendance data for a student
     """
@@ -259,35 +378,112 @@ def get_attendance(request: dict):
         if not rollno or not password:
             raise HTTPException(status_code=400, detail="Missing credentials")
         
-        session = getHomePageAttendance(rollno, password)
+        session = await getPooledSessionAsync(rollno, password, "studzone")
         if not session:
             raise HTTPException(status_code=401, detail="Invalid credentials")
         
         # Get the attendance data
-        data = getStudentAttendance(session)
-        
-        # Convert the list of lists to a list of dictionaries for better JSON representation
-        result = []
-        for row in data:
-            total_classes = int(row[1])
-            present = int(row[4])
-            # Correctly calculate absent as total_classes minus present
-            absent = total_classes - present
-            result.append({
-                "course_code": row[0],
-                "total_classes": total_classes,
-                "present": present,
-                "absent": absent,
-                "percentage": row[6]
-            })
+        try:
+            data = await scrapeShared(session, getStudentAttendanceAsync)
+        except LoggedOutError:
+            # The pooled session expired upstream, log in afresh next time
+            invalidatePooledSession(rollno, password, "studzone")
+            raise
         
-        return result
+        return format_attendance(data)
     except Exception as e:
         raise HTTPException(status_code=400, detail="Invalid request format")
 
+def run_auto_feedback(feedback_index, rollno, password, progress=None):
+    # Runs on the feedback executor, so Selenium (and its first import) never blocks the event loop
+    if FEEDBACK_ENGINE == "http":
+        try:
+            return submitFeedbackHttp(feedback_index, rollno, password, progress)
+        except FeedbackFlowError as e:
+            if not FEEDBACK_HTTP_FALLBACK:
+                raise HTTPException(status_code=502, detail="Feedback pages could not be processed. Please try again later.")
+            logger.warning(f"HTTP feedback engine could not follow the portal, using Selenium: {e}")
+    return feedback.auto_feedback_task(feedback_index, rollno, password, progress)
+
+# Feedback jobs, one active job per roll number
+feedback_jobs = FeedbackJobQueue(run_auto_feedback)
+
+# Target percentages used by /attendance/what-if and /internals/targets when the request has none
+WHAT_IF_DEFAULT_TARGETS = list(range(50, 101))
+INTERNALS_DEFAULT_TARGETS = [50, 60, 70, 80, 90, 100]
+MAX_TARGETS = 201
+
+def parse_target_percentages(targets, default):
+    """Validate the requested target percentages, each must be in (0, 100]"""
+    if targets is None:
+        return default
+    if not isinstance(targets, list) or not 0 < len(targets) <= MAX_TARGETS:
+        raise HTTPException(status_code=400, detail=f"targets must be a list of 1 to {MAX_TARGETS} percentages")
+    for target in targets:
+        if isinstance(target, bool) or not isinstance(target, (int, float)) or not 0 < target <= 100:
+            raise HTTPException(status_code=400, detail="Each target must be a number between 0 and 100")
+    return targets
+
+@app.post("/attendance/what-if")
+@includeTimings
+async def attendance_what_if(request: dict):
+    """
+    Affordable (positive) or required (negative) classes for every course at
+    every target percentage, computed in one call so a slider needs no round
+    trip per value. null marks a target that a course can never reach.
+    """
+    try:
+        # Check if this is the new encoded format or old format
+        if 'data' in request:
+            # Decode the encoded payload
+            decoded_data = PayloadSecurity.decode_payload(request['data'])
+            rollno = decoded_data.get('rollno')
+            password = decoded_data.get('password')
+            targets = decoded_data.get('targets')
+        else:
+            # Fallback to old format for backward compatibility
+            rollno = request.get('rollno')
+            password = request.get('password')
+            targets = request.get('targets')
+        
+        if not rollno or not password:
+            raise HTTPException(status_code=400, detail="Missing credentials")
+        
+        targets = parse_target_percentages(targets, WHAT_IF_DEFAULT_TARGETS)
+        
+        # Share the attendance scraped for /data instead of scraping it again
+        student = sessionKey(rollno, password, "data")
+        attendance = await section_cache.get(
+            section_cache_key(student, "attendance"),
+            lambda: load_attendance_section(rollno, password),
+            SECTION_TTLS["attendance"]
+        )
+        
+        courses = []
+        for course in attendance:
+            courses.append({
+                "course_code": course["course_code"],
+                "total_classes": course["total_classes"],
+                "present": course["present"],
+                "percentage": course["percentage"],
+                "leaves": calculateLeavesGrid(course["present"], course["total_classes"], targets)
+            })
+        
+        return {"targets": targets, "courses": courses}
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Error in /attendance/what-if endpoint: {e}")
+        raise HTTPException(status_code=500, 
+                           detail="Error calculating attendance targets. Please try again or contact support if the issue persists.")
+
 @app.post("/auto-feedback")
-async def auto_feedback(request: dict, background_tasks: BackgroundTasks):
-    """API endpoint to trigger auto-feedback process"""
+async def auto_feedback(request: dict):
+    """
+    API endpoint to trigger auto-feedback process. Returns a job_id to poll at
+    /auto-feedback/{job_id}; the same request again while its job is queued or
+    running gets the existing job back, a different one for the roll number a 409.
+    """
     try:
         # Check if this is the new encoded format or old format
         if 'data' in request:
@@ -305,14 +501,37 @@ async def auto_feedback(request: dict, background_tasks: BackgroundTasks):
         if not rollno or not password:
             raise HTTPException(status_code=400, detail="Missing credentials")
         
-        # Start feedback task in the background
-        background_tasks.add_task(auto_feedback_task, feedback_index, rollno, password)
-        return {"status": "started", "message": "Feedback automation started in background"}
+        # Queue the feedback job on its own executor, one per student. Duplicates are matched
+        # on a hash of the credentials too, so only the student gets their job back
+        student = rollno.strip().upper()
+        job, created = feedback_jobs.submit(
+            student, sessionKey(student, password, f"feedback {feedback_index}"), feedback_index, rollno, password
+        )
+        return {
+            "status": "started",
+            "message": "Feedback automation started in background" if created else "Feedback automation is already in progress",
+            "job_id": job.id,
+            "job_status": job.status,
+            "duplicate": not created
+        }
+    except HTTPException as he:
+        if he.status_code in (409, 429):
+            raise he
+        raise HTTPException(status_code=400, detail="Invalid request format")
     except Exception as e:
         raise HTTPException(status_code=400, detail="Invalid request format")
 
+@app.get("/auto-feedback/{job_id}")
+def auto_feedback_status(job_id: str):
+    """Status and progress of a feedback job"""
+    job = feedback_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Feedback job not found or expired")
+    return job.toDict()
+
 @app.post("/cgpa")
-def get_cgpa(request: dict):
+@includeTimings
+async def get_cgpa(request: dict):
     """
     Get CGPA and GPA data for a student
     """
@@ -331,14 +550,16 @@ def get_cgpa(request: dict):
         if not rollno or not password:
             raise HTTPException(status_code=400, detail="Missing credentials")
         
-        session = getHomePageCGPA(rollno, password)
+        session = await getPooledSessionAsync(rollno, password, "studzone2")
         if not session:
             raise HTTPException(status_code=401, detail="Invalid credentials")
         
         try:
             # Get course data and completed semester
-            course_data = getStudentCourses(session)
-            completed_semester = getCompletedSemester(session)
+            course_data, completed_semester = await asyncio.gather(
+                scrapeShared(session, getStudentCoursesAsync),
+                scrapeShared(session, getCompletedSemesterAsync)
+            )
             
             # Calculate CGPA
             cgpa_data = getCGPA(course_data, completed_semester)
@@ -354,6 +575,10 @@ def get_cgpa(request: dict):
                 return []
             # Re-raise other HTTP exceptions
             raise he
+        except LoggedOutError:
+            # The pooled session expired upstream, log in afresh next time
+            invalidatePooledSession(rollno, password, "studzone2")
+            raise
             
     except HTTPException as he:
         # Re-raise HTTP exceptions
@@ -363,7 +588,8 @@ def get_cgpa(request: dict):
                            detail=f"Error calculating CGPA. Please try again or contact support if the issue persists.")
 
 @app.post("/internals")
-def get_internals(request: dict):
+@includeTimings
+async def get_internals(request: dict):
     """
     Get internal marks and continuous assessment data
     """
@@ -382,13 +608,13 @@ def get_internals(request: dict):
         if not rollno or not password:
             raise HTTPException(status_code=400, detail="Missing credentials")
         
-        session = getHomePageAttendance(rollno, password)
+        session = await getPooledSessionAsync(rollno, password, "studzone")
         if not session:
             raise HTTPException(status_code=401, detail="Invalid credentials")
         
         try:
             # Get internal marks data
-            internals_data = getInternals(session)
+            internals_data = await scrapeShared(session, getInternalsAsync)
             
             if not internals_data:
                 raise HTTPException(status_code=404, detail="No internal marks data found")
@@ -401,6 +627,10 @@ def get_internals(request: dict):
             
         except HTTPException as he:
             raise he
+        except LoggedOutError:
+            # The pooled session expired upstream, log in afresh next time
+            invalidatePooledSession(rollno, password, "studzone")
+            raise
             
     except HTTPException as he:
         # Re-raise HTTP exceptions
@@ -410,10 +640,14 @@ def get_internals(request: dict):
                            detail=f"Error retrieving internal marks. Please try again or contact support if the issue persists.")
 
 @app.post("/diagnose-cgpa")
-def diagnose_cgpa(request: dict):
+async def diagnose_cgpa(request: dict):
     """
     Diagnostic endpoint to troubleshoot CGPA calculation issues
     """
+    # The diagnosis logs in with a blocking session, so it runs on the io executor
+    return await runBlocking(run_cgpa_diagnosis, request)
+
+def run_cgpa_diagnosis(request):
     try:
         # Check if this is the new encoded format or old format
         if 'data' in request:
@@ -429,7 +663,7 @@ def diagnose_cgpa(request: dict):
         if not rollno or not password:
             raise HTTPException(status_code=400, detail="Missing credentials")
         
-        session = getHomePageAttendance(rollno, password)
+        session = getPooledSession(rollno, password, "studzone")
         if not session:
             raise HTTPException(status_code=401, detail="Invalid credentials")
         
@@ -460,8 +694,63 @@ def diagnose_cgpa(request: dict):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Diagnostic error: {str(e)}")
 
+@app.post("/internals/targets")
+@includeTimings
+async def internals_targets(request: dict):
+    """
+    Minimum end semester score for every course at each target percentage, in one
+    call. A score of "-" means the target cannot be reached, "*" marks courses
+    whose internal marks are not out yet.
+    """
+    try:
+        # Check if this is the new encoded format or old format
+        if 'data' in request:
+            # Decode the encoded payload
+            decoded_data = PayloadSecurity.decode_payload(request['data'])
+            rollno = decoded_data.get('rollno')
+            password = decoded_data.get('password')
+            targets = decoded_data.get('targets')
+        else:
+            # Fallback to old format for backward compatibility
+            rollno = request.get('rollno')
+            password = request.get('password')
+            targets = request.get('targets')
+        
+        if not rollno or not password:
+            raise HTTPException(status_code=400, detail="Missing credentials")
+        
+        targets = parse_target_percentages(targets, INTERNALS_DEFAULT_TARGETS)
+        
+        # Share the internals scraped for /data instead of scraping them again
+        student = sessionKey(rollno, password, "data")
+        internals_data = await section_cache.get(
+            section_cache_key(student, "internals"),
+            lambda: load_internals_section(rollno, password),
+            SECTION_TTLS["internals"]
+        )
+        
+        if not internals_data:
+            raise HTTPException(status_code=404, detail="No internal marks data found")
+        
+        courses = []
+        for course_code, internal, scores in getTargetGrid(internals_data, targets):
+            courses.append({
+                "course_code": course_code,
+                "internal": internal,
+                "scores": scores
+            })
+        
+        return {"targets": targets, "courses": courses}
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Error in /internals/targets endpoint: {e}")
+        raise HTTPException(status_code=500, 
+                           detail="Error calculating target scores. Please try again or contact support if the issue persists.")
+
 @app.post("/exam-schedule")
-def get_exam_schedule(request: dict):
+@includeTimings
+async def get_exam_schedule(request: dict):
     """
     Get the exam schedule for the student
     """
@@ -480,23 +769,28 @@ def get_exam_schedule(request: dict):
         if not rollno or not password:
             raise HTTPException(status_code=400, detail="Missing credentials")
         
-        session = getHomePageAttendance(rollno, password)
+        session = await getPooledSessionAsync(rollno, password, "studzone")
         if not session:
             raise HTTPException(status_code=401, detail="Invalid credentials")
         
         # Get the exam schedule
-        schedule = getExamSchedule(session)
+        try:
+            schedule = await scrapeShared(session, getExamScheduleAsync)
+        except LoggedOutError:
+            # The pooled session expired upstream, log in afresh next time
+            invalidatePooledSession(rollno, password, "studzone")
+            raise
         
-        # Check if schedule is a DataFrame 
-        if isinstance(schedule, pd.DataFrame):
+        # Check if schedule is a result table
+        if isinstance(schedule, ResultTable):
             # Check if it's empty
             if schedule.empty:
                 return {"exams": [], "message": "No upcoming exams found."}
             else:
-                # Convert DataFrame to dict for JSON serialization
+                # Convert the table to dicts for JSON serialization
                 return {"exams": schedule.to_dict(orient='records')}
         else:
-            # Handle non-DataFrame return (like empty list)
+            # Handle non-table return (like empty list)
             return {"exams": [], "message": "No upcoming exams found."}
         
     except Exception as e:
@@ -504,7 +798,8 @@ def get_exam_schedule(request: dict):
                           detail=f"Error retrieving exam schedule. Please try again or contact support if the issue persists.")
 
 @app.post("/user-info")
-def get_user_info(request: dict):
+@includeTimings
+async def get_user_info(request: dict):
     """
     Get user information for personalized greetings
     """
@@ -524,72 +819,11 @@ def get_user_info(request: dict):
         if not rollno or not password:
             raise HTTPException(status_code=400, detail="Missing credentials")
         
-        session = getHomePageAttendance(rollno, password)
+        session = await getPooledSessionAsync(rollno, password, "studzone")
         if not session:
             raise HTTPException(status_code=401, detail="Invalid credentials")
         
-        # Initialize default response
-        default_response = {"username": rollno, "is_birthday": False}
-        
-        # Try multiple pages to get user info
-        pages_to_try = [
-            "https://ecampus.psgtech.ac.in/studzone/Scholar/VallalarScholarship",  # Primary source
-            "https://ecampus.psgtech.ac.in/studzone/Profile"  # Backup source
-        ]
-        
-        for page_url in pages_to_try:
-            try:
-                page_response = session.get(page_url, timeout=10)  # Add timeout
-                
-                if not page_response.ok:
-                    continue
-                
-                page_soup = BeautifulSoup(page_response.text, "html.parser")
-                
-                # Check if we're on the scholarship page
-                if "VallalarScholarship" in page_url:
-                    personal_info_table = page_soup.find("td", {"class": "personal-info"})
-                    if personal_info_table:
-                        personal_info = personal_info_table.find_all("td")
-                        
-                        # Get username (first item in personal info)
-                        if personal_info and len(personal_info) > 0:
-                            username = personal_info[0].string.strip()
-                            if username and len(username) > 0:
-                                default_response["username"] = username
-                        
-                        # Get birthday (third item in personal info)
-                        if personal_info and len(personal_info) > 2:
-                            try:
-                                birthdate_str = personal_info[2].string.strip()
-                                birthdate = datetime.strptime(birthdate_str, "%d/%m/%Y").date()
-                                
-                                # Get current date in India timezone
-                                IST = pytz.timezone('Asia/Kolkata')
-                                today = datetime.now(IST).date()
-                                
-                                is_birthday = (birthdate.month == today.month and birthdate.day == today.day)
-                                default_response["is_birthday"] = is_birthday
-                            except Exception as e:
-                                pass
-                
-                # Check if we're on the profile page
-                elif "Profile" in page_url and default_response["username"] == rollno:
-                    # Try to find username in profile page if we couldn't from scholarship page
-                    name_element = page_soup.find("input", {"id": "txtName"})
-                    if name_element and name_element.has_attr("value"):
-                        username = name_element["value"].strip()
-                        if username and len(username) > 0:
-                            default_response["username"] = username
-                
-                # If we got a username that's not the roll number, we can stop
-                if default_response["username"] != rollno:
-                    break
-                    
-            except Exception as page_error:
-                continue
-        
-        return default_response
+        return await scrapeShared(session, getUserInfoAsync, rollno)
             
     except Exception as e:
         # Return default response on error instead of raising exception
@@ -597,10 +831,211 @@ def get_user_info(request: dict):
         username = locals().get('rollno', 'User')
         return {"username": username, "is_birthday": False}
 
+# Per-section freshness for the /data cache, in seconds
+SECTION_TTLS = {
+    "attendance" : int(os.environ.get("CACHE_TTL_ATTENDANCE", "600")),
+    "cgpa"       : int(os.environ.get("CACHE_TTL_CGPA", "21600")),
+    "timetable"  : int(os.environ.get("CACHE_TTL_TIMETABLE", "3600")),
+    "internals"  : int(os.environ.get("CACHE_TTL_INTERNALS", "1800")),
+    "user_info"  : int(os.environ.get("CACHE_TTL_USER_INFO", "3600")),
+}
+
+# Section results per student, served stale for up to SECTION_CACHE_MAX_STALE while refreshing
+section_cache = StaleWhileRevalidateCache(
+    max_size=int(os.environ.get("SECTION_CACHE_SIZE", "10000")),
+    max_stale=int(os.environ.get("SECTION_CACHE_MAX_STALE", "21600")),
+)
+
+def format_attendance(data):
+    """Convert the list of lists to a list of dictionaries for better JSON representation"""
+    result = []
+    for row in data:
+        total_classes = int(row[1])
+        present = int(row[4])
+        # Correctly calculate absent as total_classes minus present
+        absent = total_classes - present
+        result.append({
+            "course_code": row[0],
+            "total_classes": total_classes,
+            "present": present,
+            "absent": absent,
+            "percentage": row[6]
+        })
+    return result
+
+async def load_attendance_section(rollno, password):
+    session = await getPooledSessionAsync(rollno, password, "studzone")
+    if not session:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    try:
+        data = await scrapeShared(session, getStudentAttendanceAsync)
+    except LoggedOutError:
+        invalidatePooledSession(rollno, password, "studzone")
+        raise
+    return format_attendance(data)
+
+async def load_cgpa_section(rollno, password):
+    session_cgpa = await getPooledSessionAsync(rollno, password, "studzone2")
+    if not session_cgpa:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    try:
+        course_data, completed_semester = await asyncio.gather(
+            scrapeShared(session_cgpa, getStudentCoursesAsync),
+            scrapeShared(session_cgpa, getCompletedSemesterAsync)
+        )
+        cgpa_data = getCGPA(course_data, completed_semester)
+    except LoggedOutError:
+        invalidatePooledSession(rollno, password, "studzone2")
+        raise
+    return cgpa_data.to_dict(orient='records')
+
+async def load_timetable_section(rollno, password):
+    session = await getPooledSessionAsync(rollno, password, "studzone")
+    if not session:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    try:
+        schedule = await scrapeShared(session, getExamScheduleAsync)
+    except LoggedOutError:
+        invalidatePooledSession(rollno, password, "studzone")
+        raise
+    # Error answers and the login form raise in the scraper, so anything else is the
+    # schedule page itself and an empty result means no upcoming exams
+    if isinstance(schedule, ResultTable) and not schedule.empty:
+        return schedule.to_dict(orient='records')
+    return []
+
+async def load_internals_section(rollno, password):
+    session = await getPooledSessionAsync(rollno, password, "studzone")
+    if not session:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    try:
+        internals_data = await scrapeShared(session, getInternalsAsync)
+    except LoggedOutError:
+        invalidatePooledSession(rollno, password, "studzone")
+        raise
+    # Error answers and the login form raise in the scraper, so False is the marks page
+    # itself without its tables, as before any CA marks are published
+    return internals_data or []
+
+async def load_user_info_section(rollno, password):
+    session = await getPooledSessionAsync(rollno, password, "studzone")
+    if not session:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    try:
+        return await scrapeShared(session, getUserInfoAsync, rollno)
+    except LoggedOutError:
+        invalidatePooledSession(rollno, password, "studzone")
+        raise
+
+# Sections of the /data response and the loader for each
+SECTION_LOADERS = {
+    "attendance" : load_attendance_section,
+    "cgpa"       : load_cgpa_section,
+    "timetable"  : load_timetable_section,
+    "internals"  : load_internals_section,
+    "user_info"  : load_user_info_section,
+}
+
+def section_default(name, rollno):
+    """Value returned for a section whose fetch failed"""
+    if name == "user_info":
+        return {"username": rollno, "is_birthday": False}
+    return []
+
+def decode_credentials(request):
+    """Read rollno and password from an encoded or legacy request body"""
+    if 'data' in request:
+        decoded_data = PayloadSecurity.decode_payload(request['data'])
+        return decoded_data.get('rollno'), decoded_data.get('password')
+    return request.get('rollno'), request.get('password')
+
+def section_cache_key(student, name):
+    # The birthday flag flips at midnight IST, so user info is cached per day
+    if name == "user_info":
+        return (student, name, datetime.now(pytz.timezone('Asia/Kolkata')).date())
+    return (student, name)
+
+async def fetch_section(name, student, rollno, password, refresh):
+    """
+    Return (name, value, status) for one /data section. status is success, error or
+    timeout (the request deadline passed); the value falls back to the section default.
+    """
+    key = section_cache_key(student, name)
+    # Each section runs as its own task, so its phases are timed under its name
+    timings = sectionTimings(name)
+    cached = not refresh and section_cache.isUsable(key, SECTION_TTLS[name])
+    started = time.perf_counter()
+    
+    def finished(result, source):
+        elapsed = time.perf_counter() - started
+        section_seconds.observe(elapsed, section=name, result=result)
+        if timings is not None:
+            timings.add("total", source, elapsed)
+    
+    try:
+        value = await section_cache.get(
+            key,
+            lambda: SECTION_LOADERS[name](rollno, password),
+            SECTION_TTLS[name],
+            refresh=refresh
+        )
+        finished("success", "cached" if cached else "scraped")
+        return name, value, "success"
+    except DeadlineExceeded as e:
+        logger.warning(f"Timed out fetching {name}: {e}")
+        finished("timeout", "timeout")
+        return name, section_default(name, rollno), "timeout"
+    except Exception as e:
+        logger.error(f"Error fetching {name}: {e}")
+        finished("error", "error")
+        return name, section_default(name, rollno), "error"
+
+# /data sections still running after their request gave up on them
+section_stragglers = set()
+
+async def gather_sections(student, rollno, password, refresh):
+    """
+    Fetch every /data section concurrently and return {name: (value, status)}. Sections
+    still running when the deadline passes are reported as timed out instead of awaited;
+    they stop at their next fetch or parse, or finish into the cache.
+    """
+    tasks = {
+        asyncio.create_task(fetch_section(name, student, rollno, password, refresh)): name
+        for name in SECTION_LOADERS
+    }
+    remaining = timeRemaining()
+    done, pending = await asyncio.wait(tasks, timeout=None if remaining is None else max(remaining, 0))
+    
+    sections = {}
+    for task in done:
+        name, value, status = task.result()
+        sections[name] = (value, status)
+    for task in pending:
+        name = tasks[task]
+        sections[name] = (section_default(name, rollno), "timeout")
+        # Keep a reference until it finishes, the event loop only holds tasks weakly
+        section_stragglers.add(task)
+        task.add_done_callback(section_stragglers.discard)
+    return {name: sections[name] for name in SECTION_LOADERS}
+
+async def ensure_login_unless_cached(student, rollno, password, refresh):
+    """Log in up front unless every section can be answered from the cache"""
+    cached = all(
+        section_cache.isUsable(section_cache_key(student, name), SECTION_TTLS[name])
+        for name in SECTION_LOADERS
+    )
+    if refresh or not cached:
+        session = await getPooledSessionAsync(rollno, password, "studzone")
+        if not session:
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+
 @app.post("/data")
-async def get_combined_data(request: dict):
+@includeTimings
+async def get_combined_data(request: dict, refresh: bool = False):
     """
-    Get combined data for attendance, timetable, cgpa, internals, and user info
+    Get combined data for attendance, timetable, cgpa, internals, and user info.
+    Sections are served from the per-student cache when possible; pass
+    ?refresh=true to bypass it and scrape everything again.
     """
     try:
         # Check if this is the new encoded format or old format
@@ -617,156 +1052,26 @@ async def get_combined_data(request: dict):
         if not rollno or not password:
             raise HTTPException(status_code=400, detail="Missing credentials")
         
-        # Create session once
-        session = getHomePageAttendance(rollno, password)
-        if not session:
-            raise HTTPException(status_code=401, detail="Invalid credentials")
+        # Cache entries are keyed by a hash of the credentials, never the roll number alone
+        student = sessionKey(rollno, password, "data")
+        await ensure_login_unless_cached(student, rollno, password, refresh)
         
-        # Define async functions for each data type
-        async def fetch_attendance():
-            try:
-                data = await asyncio.to_thread(getStudentAttendance, session)
-                result = []
-                for row in data:
-                    total_classes = int(row[1])
-                    present = int(row[4])
-                    absent = total_classes - present
-                    result.append({
-                        "course_code": row[0],
-                        "total_classes": total_classes,
-                        "present": present,
-                        "absent": absent,
-                        "percentage": row[6]
-                    })
-                return {"attendance": result}
-            except Exception as e:
-                logger.error(f"Error fetching attendance: {e}")
-                return {"attendance": []}
-        
-        async def fetch_cgpa():
-            try:
-                session_cgpa = await asyncio.to_thread(getHomePageCGPA, rollno, password)
-                if not session_cgpa:
-                    return {"cgpa": []}
-                
-                course_data = await asyncio.to_thread(getStudentCourses, session_cgpa)
-                completed_semester = await asyncio.to_thread(getCompletedSemester, session_cgpa)
-                cgpa_data = await asyncio.to_thread(getCGPA, course_data, completed_semester)
-                return {"cgpa": cgpa_data.to_dict(orient='records')}
-            except Exception as e:
-                logger.error(f"Error fetching CGPA: {e}")
-                return {"cgpa": []}
-        
-        async def fetch_timetable():
-            try:
-                schedule = await asyncio.to_thread(getExamSchedule, session)
-                if isinstance(schedule, pd.DataFrame):
-                    if schedule.empty:
-                        return {"timetable": []}
-                    else:
-                        return {"timetable": schedule.to_dict(orient='records')}
-                else:
-                    return {"timetable": []}
-            except Exception as e:
-                logger.error(f"Error fetching timetable: {e}")
-                return {"timetable": []}
-        
-        async def fetch_internals():
-            try:
-                internals_data = await asyncio.to_thread(getInternals, session)
-                if not internals_data:
-                    return {"internals": []}
-                return {"internals": internals_data}
-            except Exception as e:
-                logger.error(f"Error fetching internals: {e}")
-                return {"internals": []}
-        
-        async def fetch_user_info():
-            try:
-                # Initialize default response
-                default_response = {"username": rollno, "is_birthday": False}
-                
-                # Try multiple pages to get user info
-                pages_to_try = [
-                    "https://ecampus.psgtech.ac.in/studzone/Scholar/VallalarScholarship",  # Primary source
-                    "https://ecampus.psgtech.ac.in/studzone/Profile"  # Backup source
-                ]
-                
-                for page_url in pages_to_try:
-                    try:
-                        page_response = await asyncio.to_thread(session.get, page_url, timeout=10)
-                        
-                        if not page_response.ok:
-                            continue
-                        
-                        page_soup = BeautifulSoup(page_response.text, "html.parser")
-                        
-                        # Check if we're on the scholarship page
-                        if "VallalarScholarship" in page_url:
-                            personal_info_table = page_soup.find("td", {"class": "personal-info"})
-                            if personal_info_table:
-                                personal_info = personal_info_table.find_all("td")
-                                
-                                # Get username (first item in personal info)
-                                if personal_info and len(personal_info) > 0:
-                                    username = personal_info[0].string.strip()
-                                    if username and len(username) > 0:
-                                        default_response["username"] = username
-                                
-                                # Get birthday (third item in personal info)
-                                if personal_info and len(personal_info) > 2:
-                                    try:
-                                        birthdate_str = personal_info[2].string.strip()
-                                        birthdate = datetime.strptime(birthdate_str, "%d/%m/%Y").date()
-                                        
-                                        # Get current date in India timezone
-                                        IST = pytz.timezone('Asia/Kolkata')
-                                        today = datetime.now(IST).date()
-                                        
-                                        is_birthday = (birthdate.month == today.month and birthdate.day == today.day)
-                                        default_response["is_birthday"] = is_birthday
-                                    except Exception as e:
-                                        pass
-                        
-                        # Check if we're on the profile page
-                        elif "Profile" in page_url and default_response["username"] == rollno:
-                            # Try to find username in profile page if we couldn't from scholarship page
-                            name_element = page_soup.find("input", {"id": "txtName"})
-                            if name_element and name_element.has_attr("value"):
-                                username = name_element["value"].strip()
-                                if username and len(username) > 0:
-                                    default_response["username"] = username
-                        
-                        # If we got a username that's not the roll number, we can stop
-                        if default_response["username"] != rollno:
-                            break
-                            
-                    except Exception as page_error:
-                        continue
-                
-                return {"user_info": default_response}
-            except Exception as e:
-                logger.error(f"Error fetching user info: {e}")
-                return {"user_info": {"username": rollno, "is_birthday": False}}
-        
-        # Run all fetches concurrently
-        results = await asyncio.gather(
-            fetch_attendance(),
-            fetch_cgpa(),
-            fetch_timetable(),
-            fetch_internals(),
-            fetch_user_info()
-        )
+        # Run all fetches concurrently, for no longer than the request deadline
+        sections = await gather_sections(student, rollno, password, refresh)
         
         # Combine results
         combined_data = {}
-        for result in results:
-            combined_data.update(result)
+        statuses = {}
+        for name, (value, status) in sections.items():
+            combined_data[name] = value
+            statuses[name] = status
         
+        timed_out = "timeout" in statuses.values()
         return {
             "status": "success",
             "data": combined_data,
-            "message": "Combined data retrieved successfully"
+            "sections": statuses,
+            "message": "Some sections timed out, showing the rest" if timed_out else "Combined data retrieved successfully"
         }
         
     except HTTPException as he:
@@ -776,3 +1081,64 @@ async def get_combined_data(request: dict):
         raise HTTPException(status_code=500, 
                            detail="Error retrieving combined data. Please try again or contact support if the issue persists.")
 
+@app.post("/data/stream")
+async def stream_combined_data(request: dict, refresh: bool = False):
+    """
+    Streaming variant of /data. Responds with NDJSON: one line per section as
+    soon as it is ready ({"section", "status", "ms", "data"}), then a final summary
+    line ({"status", "done", "sections", "failed", "ms", "message"}). The Server-Timing
+    header is sent before the first line, so it only covers the login; section times
+    are in the lines, and with ?timings=true so are their phases.
+    """
+    try:
+        rollno, password = decode_credentials(request)
+        if not rollno or not password:
+            raise HTTPException(status_code=400, detail="Missing credentials")
+        
+        # Authenticate before the response starts so bad credentials still get a 401
+        student = sessionKey(rollno, password, "data")
+        await ensure_login_unless_cached(student, rollno, password, refresh)
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Error in /data/stream endpoint: {e}")
+        raise HTTPException(status_code=500, 
+                           detail="Error retrieving combined data. Please try again or contact support if the issue persists.")
+    
+    timings = current_timings.get()
+    in_body = timings is not None and timings.in_body
+    
+    async def section_frames():
+        # Sections keep running if the client disconnects, so their results still reach the cache
+        started = time.perf_counter()
+        tasks = [
+            asyncio.create_task(fetch_section(name, student, rollno, password, refresh))
+            for name in SECTION_LOADERS
+        ]
+        failed = []
+        for next_section in asyncio.as_completed(tasks):
+            name, value, status = await next_section
+            if status != "success":
+                failed.append(name)
+            frame = {"section": name, "status": status, "ms": round((time.perf_counter() - started) * 1000, 1), "data": value}
+            if in_body:
+                frame["timings"] = timings.toDict().get("sections", {}).get(name)
+            yield json.dumps(frame) + "\n"
+        
+        summary = {
+            "status": "success",
+            "done": True,
+            "sections": list(SECTION_LOADERS),
+            "failed": failed,
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+            "message": "Combined data retrieved successfully"
+        }
+        if in_body:
+            summary["timings"] = timings.toDict()
+        yield json.dumps(summary) + "\n"
+    
+    return StreamingResponse(
+        section_frames(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,34 @@
+"""
+Fixtures shared by the tests that talk to mock_ecampus.py
+"""
+import socket
+import threading
+import time
+
+import pytest
+import uvicorn
+
+import mock_ecampus
+from util import Transport
+
+
+@pytest.fixture(scope="module")
+def portal():
+    """Serve the stand-in portal on a free local port and send portal requests to it"""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(mock_ecampus.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("The stand-in portal did not start")
+        time.sleep(0.01)
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(Transport, "ECAMPUS_BASE_URL", f"http://127.0.0.1:{port}")
+        yield
+    server.should_exit = True
+    thread.join()
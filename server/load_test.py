@@ -0,0 +1,169 @@
+"""
+Concurrent /data, /attendance and /cgpa traffic against a running app, reporting
+throughput and p50/p95/p99 latency per endpoint. Point the app at mock_ecampus.py
+(see its docstring) so the load never reaches the real portal.
+
+    python load_test.py --url http://127.0.0.1:8000 --concurrency 50 --duration 60
+    python load_test.py --requests 2000 --mix data=2 attendance=1 cgpa=1 --students 500 --refresh
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+import time
+
+import httpx
+
+ENDPOINTS = {
+    "data"       : "/data",
+    "attendance" : "/attendance",
+    "cgpa"       : "/cgpa",
+}
+
+
+class EndpointStats:
+    __slots__ = ("latencies", "errors", "statuses")
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.statuses = {}
+
+    def record(self, seconds, status):
+        self.latencies.append(seconds)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status != 200:
+            self.errors += 1
+
+
+def percentile(ordered, share):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(share * len(ordered)))
+    return ordered[rank - 1]
+
+
+def parseMix(pairs):
+    mix = {}
+    for pair in pairs:
+        name, _, weight = pair.partition("=")
+        if name not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint {name}, choose from {', '.join(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def worker(client, args, mix, students, stats, deadline, remaining):
+    names, weights = list(mix), list(mix.values())
+    while time.perf_counter() < deadline:
+        if remaining is not None:
+            if remaining[0] <= 0:
+                return
+            remaining[0] -= 1
+
+        name = random.choices(names, weights)[0]
+        rollno = random.choice(students)
+        body = {"rollno": rollno, "password": args.password}
+        params = {"refresh": "true"} if args.refresh and name == "data" else None
+
+        started = time.perf_counter()
+        try:
+            response = await client.post(ENDPOINTS[name], json=body, params=params)
+            await response.aread()
+            status = response.status_code
+        except httpx.TimeoutException:
+            status = "timeout"
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        stats[name].record(time.perf_counter() - started, status)
+
+
+async def run(args):
+    mix = parseMix(args.mix)
+    students = [f"{args.rollno_prefix}{number:03d}" for number in range(1, args.students + 1)]
+    stats = {name: EndpointStats() for name in mix}
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        #Log every student in once first, so the run measures steady state unless asked not to
+        if args.warm:
+            await asyncio.gather(*(
+                client.post("/login", json={"rollno": rollno, "password": args.password}) for rollno in students
+            ))
+
+        remaining = [args.requests] if args.requests else None
+        deadline = time.perf_counter() + (args.duration if not args.requests else float("inf"))
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            worker(client, args, mix, students, stats, deadline, remaining) for _ in range(args.concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+
+    return stats, elapsed
+
+
+def report(stats, elapsed, concurrency):
+    rows = []
+    everything = EndpointStats()
+    for name, endpoint in itertools.chain(stats.items(), [("total", everything)]):
+        if name != "total":
+            everything.latencies.extend(endpoint.latencies)
+            everything.errors += endpoint.errors
+            for status, count in endpoint.statuses.items():
+                everything.statuses[status] = everything.statuses.get(status, 0) + count
+
+        ordered = sorted(endpoint.latencies)
+        rows.append({
+            "endpoint"   : name,
+            "requests"   : len(ordered),
+            "errors"     : endpoint.errors,
+            "throughput" : round(len(ordered) / elapsed, 2) if elapsed else 0,
+            "p50_ms"     : round(percentile(ordered, 0.50) * 1000, 1) if ordered else None,
+            "p95_ms"     : round(percentile(ordered, 0.95) * 1000, 1) if ordered else None,
+            "p99_ms"     : round(percentile(ordered, 0.99) * 1000, 1) if ordered else None,
+            "max_ms"     : round(ordered[-1] * 1000, 1) if ordered else None,
+            "statuses"   : {str(status): count for status, count in endpoint.statuses.items()},
+        })
+
+    print(f"{elapsed:.1f}s at concurrency {concurrency}")
+    print(f"{'endpoint':<11} {'requests':>8} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for row in rows:
+        print(
+            f"{row['endpoint']:<11} {row['requests']:>8} {row['errors']:>7} {row['throughput']:>8} "
+            + " ".join(f"{row[key] if row[key] is not None else '-':>9}" for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms"))
+        )
+    for row in rows:
+        if row["errors"]:
+            print(f"{row['endpoint']} statuses: {row['statuses']}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /data, /attendance and /cgpa of a running app")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Base URL of the app")
+    parser.add_argument("--concurrency", type=int, default=20, help="Requests in flight at once")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run for")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests instead of --duration")
+    parser.add_argument("--mix", nargs="+", default=["data=1", "attendance=1", "cgpa=1"], help="Endpoints and their weights")
+    parser.add_argument("--students", type=int, default=100, help="Distinct roll numbers to spread the load over")
+    parser.add_argument("--rollno-prefix", default="23X")
+    parser.add_argument("--password", default="password", help="The mock portal's password")
+    parser.add_argument("--refresh", action="store_true", help="Bypass the /data section cache")
+    parser.add_argument("--warm", action="store_true", help="Log every student in before measuring")
+    parser.add_argument("--timeout", type=float, default=120, help="Client timeout per request in seconds")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    stats, elapsed = asyncio.run(run(args))
+    rows = report(stats, elapsed, args.concurrency)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as output:
+            json.dump({"seconds": elapsed, "concurrency": args.concurrency, "endpoints": rows}, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+"""
+Local stand-in for the ecampus studzone and studzone2 portals, for load testing app.py
+without touching the college's servers.
+
+    python mock_ecampus.py --port 9000 --latency-ms 150 --jitter-ms 100 --error-rate 0.02
+    ECAMPUS_BASE_URL=http://127.0.0.1:9000 uvicorn app:app --port 8000
+
+Both login flows work like the real ones: studzone hands out a __RequestVerificationToken
+that the login POST must echo, studzone2 hands out the ASP.NET view state fields. Any roll
+number logs in with --password. Pages come from portal_fixtures.py, generated once per
+student. Every response can be delayed, fail with a 5xx or hang past the client timeout.
+
+The studzone Feedback pages are served too, in the shapes both feedback engines read:
+an index of cards, end semester staff entries that each link to a form of star ratings
+followed by a final submission, and intermediate forms per course. What each student
+submitted can be read back from GET /mock/feedback/{rollno}.
+"""
+import argparse
+import asyncio
+import os
+import random
+import secrets
+from functools import lru_cache
+from urllib.parse import parse_qsl
+from zlib import crc32
+
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, RedirectResponse, Response
+
+from portal_fixtures import portalPages
+from util.Transport import PORTAL_ORIGIN
+
+
+class MockConfig:
+    """Behaviour of the stand-in, from MOCK_* environment variables or the command line"""
+
+    def __init__(self):
+        self.password         = os.environ.get("MOCK_PASSWORD", "password")
+        self.latency_ms       = float(os.environ.get("MOCK_LATENCY_MS", "0"))
+        self.jitter_ms        = float(os.environ.get("MOCK_JITTER_MS", "0"))
+        self.login_latency_ms = float(os.environ.get("MOCK_LOGIN_LATENCY_MS", "0"))
+        self.error_rate       = float(os.environ.get("MOCK_ERROR_RATE", "0"))
+        self.hang_rate        = float(os.environ.get("MOCK_HANG_RATE", "0"))
+        self.hang_seconds     = float(os.environ.get("MOCK_HANG_SECONDS", "120"))
+        self.courses          = int(os.environ.get("MOCK_COURSES", "8"))
+        self.semesters        = int(os.environ.get("MOCK_SEMESTERS", "6"))
+        self.feedback_staff   = int(os.environ.get("MOCK_FEEDBACK_STAFF", "3"))
+        self.feedback_courses = int(os.environ.get("MOCK_FEEDBACK_COURSES", "2"))
+        self.feedback_questions = int(os.environ.get("MOCK_FEEDBACK_QUESTIONS", "5"))
+        #false leaves the final submission off the end semester page, as a changed layout would
+        self.feedback_final   = os.environ.get("MOCK_FEEDBACK_FINAL", "true").lower() == "true"
+
+
+config = MockConfig()
+app = FastAPI(title="Mock ecampus")
+
+#Issued login tokens and logged-in sessions, by value
+login_tokens = set()
+sessions = {"studzone": {}, "studzone2": {}}
+counters = {"requests": 0, "logins": 0, "failed_logins": 0, "errors": 0, "hangs": 0}
+
+#Submitted feedback by roll number
+feedback = {}
+
+SESSION_COOKIES = {"studzone": "ASP.NET_SessionId", "studzone2": "StudZone2Session"}
+
+#Scraped pages by path, with the portal whose login they need
+PAGE_PORTALS = {
+    url[len(PORTAL_ORIGIN):]: ("studzone2" if url.startswith(PORTAL_ORIGIN + "/studzone2/") else "studzone")
+    for url in portalPages(1)
+}
+
+STUDZONE_LOGIN_PAGE = (
+    "<html><body><form method='post' action='/studzone'>"
+    "<input name='rollno'><input name='password' type='password'><input name='chkterms' type='checkbox'>"
+    "<input name='__RequestVerificationToken' type='hidden' value='{token}'>"
+    "</form></body></html>"
+)
+STUDZONE_HOME_PAGE = (
+    "<html><body><nav class='navbar navbar-expand-lg navbar-light'><a href='/studzone/Attendance/StudentPercentage'>"
+    "Attendance</a></nav><a href='/studzone/Feedback/Index'><div class='card'><h5>Feedback</h5></div></a></body></html>"
+)
+STUDZONE2_LOGIN_PAGE = (
+    "<html><body><form method='post' action='/studzone2/'>"
+    "<input name='__VIEWSTATE' value='{token}'><input name='__VIEWSTATEGENERATOR' value='C2EE9ABB'>"
+    "<input name='__EVENTVALIDATION' value='{token}'><input name='abcd3' value='{token}'>"
+    "<input name='txtusercheck'><input name='txtpwdcheck' type='password'>"
+    "</form></body></html>"
+)
+STUDZONE2_HOME_PAGE = "<html><body><div id='divStudent'>Welcome</div></body></html>"
+
+
+@lru_cache(maxsize=1024)
+def studentPages(rollno):
+    #Seeded by roll number, so a student sees the same pages on every request
+    return portalPages(config.courses, config.semesters, seed=crc32(rollno.encode()) % 100000)
+
+
+def issueToken():
+    #Login pages fetched without a login POST leave their tokens behind
+    if len(login_tokens) > 100000:
+        login_tokens.clear()
+    token = secrets.token_urlsafe(24)
+    login_tokens.add(token)
+    return token
+
+
+def startSession(response, portal, rollno):
+    session_id = secrets.token_hex(12)
+    sessions[portal][session_id] = rollno
+    response.set_cookie(SESSION_COOKIES[portal], session_id, path="/", httponly=True)
+    counters["logins"] += 1
+
+
+async def formFields(request):
+    #Login forms are urlencoded, read them without needing python-multipart
+    return dict(parse_qsl((await request.body()).decode(), keep_blank_values=True))
+
+
+def loggedInStudent(request, portal):
+    return sessions[portal].get(request.cookies.get(SESSION_COOKIES[portal]))
+
+
+@app.middleware("http")
+async def injectFaults(request: Request, call_next):
+    counters["requests"] += 1
+    if request.url.path.startswith("/mock/"):
+        return await call_next(request)
+
+    delay = config.latency_ms + random.uniform(0, config.jitter_ms)
+    if request.method == "POST":
+        delay += config.login_latency_ms
+    if delay > 0:
+        await asyncio.sleep(delay / 1000)
+
+    chance = random.random()
+    if chance < config.hang_rate:
+        counters["hangs"] += 1
+        await asyncio.sleep(config.hang_seconds)
+    elif chance < config.hang_rate + config.error_rate:
+        counters["errors"] += 1
+        return HTMLResponse("<html><body>Service Unavailable</body></html>", status_code=random.choice([500, 502, 503]))
+
+    return await call_next(request)
+
+
+@app.get("/studzone")
+async def studzoneLoginPage(request: Request):
+    #A logged-in student is shown the home page instead
+    if loggedInStudent(request, "studzone") is not None:
+        return HTMLResponse(STUDZONE_HOME_PAGE)
+    return HTMLResponse(STUDZONE_LOGIN_PAGE.format(token=issueToken()))
+
+
+@app.post("/studzone")
+async def studzoneLogin(request: Request):
+    form = await formFields(request)
+    token = form.get("__RequestVerificationToken")
+    if token not in login_tokens or form.get("password") != config.password or not form.get("rollno"):
+        counters["failed_logins"] += 1
+        #The real portal answers a failed login with the login form again
+        return HTMLResponse(STUDZONE_LOGIN_PAGE.format(token=issueToken()))
+
+    login_tokens.discard(token)
+    response = HTMLResponse(STUDZONE_HOME_PAGE)
+    startSession(response, "studzone", form["rollno"])
+    return response
+
+
+@app.get("/studzone2")
+@app.get("/studzone2/")
+async def studzone2LoginPage():
+    return HTMLResponse(STUDZONE2_LOGIN_PAGE.format(token=issueToken()))
+
+
+@app.post("/studzone2")
+@app.post("/studzone2/")
+async def studzone2Login(request: Request):
+    form = await formFields(request)
+    token = form.get("__VIEWSTATE")
+    if token not in login_tokens or form.get("txtpwdcheck") != config.password or not form.get("txtusercheck"):
+        counters["failed_logins"] += 1
+        return HTMLResponse(STUDZONE2_LOGIN_PAGE.format(token=issueToken()))
+
+    login_tokens.discard(token)
+    response = HTMLResponse(STUDZONE2_HOME_PAGE)
+    startSession(response, "studzone2", form["txtusercheck"])
+    return response
+
+
+def ratingRows(prefix, questions):
+    #One question per row, rated by a group of five stars like the portal's star-rating cells
+    return "".join(
+        f"<tr><td class='question-cell'>Question {question}</td><td class='rating-cell'><div class='star-rating'>"
+        + "".join(f"<input type='radio' name='{prefix}{question}' value='{stars}'><label>*</label>" for stars in range(5, 0, -1))
+        + "</div></td></tr>"
+        for question in range(1, questions + 1)
+    )
+
+
+def studentFeedback(rollno):
+    return feedback.setdefault(rollno, {"staff": {}, "final": False, "intermediate": {}})
+
+
+def answered(form, prefix):
+    return all(form.get(f"{prefix}{question}") in ("1", "2", "3", "4", "5") for question in range(1, config.feedback_questions + 1))
+
+
+@app.get("/studzone/Feedback/Index")
+async def feedbackIndex(request: Request):
+    if loggedInStudent(request, "studzone") is None:
+        return RedirectResponse("/studzone", status_code=302)
+    #The end semester card is opened by a script, the intermediate one by a link
+    return HTMLResponse(
+        "<html><body>"
+        "<div class='card'><div class='card-body' onclick=\"location.href='/studzone/Feedback/EndSemester'\">End Semester</div></div>"
+        "<div class='card'><div class='card-body'><a href='/studzone/Feedback/Intermediate'>Intermediate</a></div></div>"
+        "</body></html>"
+    )
+
+
+@app.get("/studzone/Feedback/EndSemester")
+async def endSemesterFeedback(request: Request):
+    rollno = loggedInStudent(request, "studzone")
+    if rollno is None:
+        return RedirectResponse("/studzone", status_code=302)
+
+    staff = "".join(
+        f"<div class='staff-item' data-url='/studzone/Feedback/Staff/{number}'><span class='ms-1'>Staff {number}</span></div>"
+        for number in range(1, config.feedback_staff + 1)
+    )
+    #The final submission appears once every staff form is saved
+    final = ""
+    if config.feedback_final and len(studentFeedback(rollno)["staff"]) == config.feedback_staff:
+        final = (
+            "<form method='post' action='/studzone/Feedback/FinalSubmit'>"
+            "<input type='hidden' name='__RequestVerificationToken' value='final'>"
+            "<button id='btnFinalSubmit' name='btnFinalSubmit' value='Submit'>Submit</button></form>"
+        )
+    return HTMLResponse(f"<html><body>{staff}{final}</body></html>")
+
+
+@app.get("/studzone/Feedback/Staff/{number}")
+async def staffFeedbackForm(number: int, request: Request):
+    if loggedInStudent(request, "studzone") is None:
+        return RedirectResponse("/studzone", status_code=302)
+    return HTMLResponse(
+        f"<html><body><form method='post'><input type='hidden' name='staff' value='{number}'>"
+        f"<table><tbody id='feedbackTableBody'>{ratingRows('rating', config.feedback_questions)}</tbody></table>"
+        "<input type='submit' id='btnSave' name='btnSave' value='Save'></form></body></html>"
+    )
+
+
+@app.post("/studzone/Feedback/Staff/{number}")
+async def saveStaffFeedback(number: int, request: Request):
+    rollno = loggedInStudent(request, "studzone")
+    if rollno is None:
+        return RedirectResponse("/studzone", status_code=302)
+    form = await formFields(request)
+    if form.get("btnSave") != "Save" or not answered(form, "rating"):
+        return HTMLResponse("<html><body>Please rate every question</body></html>", status_code=400)
+    studentFeedback(rollno)["staff"][number] = form
+    return HTMLResponse("<html><body><img class='img-fluid' src='/saved.png'></body></html>")
+
+
+@app.post("/studzone/Feedback/FinalSubmit")
+async def finalFeedbackSubmit(request: Request):
+    rollno = loggedInStudent(request, "studzone")
+    if rollno is None:
+        return RedirectResponse("/studzone", status_code=302)
+    if len(studentFeedback(rollno)["staff"]) != config.feedback_staff:
+        return HTMLResponse("<html><body>Rate every staff member first</body></html>", status_code=400)
+    studentFeedback(rollno)["final"] = True
+    return HTMLResponse("<html><body>Feedback submitted</body></html>")
+
+
+@app.get("/studzone/Feedback/Intermediate")
+async def intermediateFeedback(request: Request):
+    if loggedInStudent(request, "studzone") is None:
+        return RedirectResponse("/studzone", status_code=302)
+    forms = "".join(
+        f"<div class='intermediate-body'><form method='post' action='/studzone/Feedback/Intermediate/{course}'>"
+        f"<table>{ratingRows('radio-', config.feedback_questions)}</table>"
+        "<button id='btnSave' type='submit'>Save</button></form></div>"
+        for course in range(1, config.feedback_courses + 1)
+    )
+    return HTMLResponse(f"<html><body>{forms}</body></html>")
+
+
+@app.post("/studzone/Feedback/Intermediate/{course}")
+async def saveIntermediateFeedback(course: int, request: Request):
+    rollno = loggedInStudent(request, "studzone")
+    if rollno is None:
+        return RedirectResponse("/studzone", status_code=302)
+    form = await formFields(request)
+    if not answered(form, "radio-"):
+        return HTMLResponse("<html><body>Please answer every question</body></html>", status_code=400)
+    studentFeedback(rollno)["intermediate"][course] = form
+    return HTMLResponse("<html><body>Saved</body></html>")
+
+
+@app.get("/mock/feedback/{rollno}")
+async def mockFeedback(rollno: str):
+    return feedback.get(rollno, {"staff": {}, "final": False, "intermediate": {}})
+
+
+@app.get("/mock/stats")
+async def mockStats():
+    return {**counters, "sessions": {portal: len(ids) for portal, ids in sessions.items()}}
+
+
+@app.post("/mock/config")
+async def mockConfig(request: Request):
+    """Change latency and fault rates while a load test runs"""
+    for name, value in (await request.json()).items():
+        if not hasattr(config, name):
+            return Response(f"Unknown setting {name}", status_code=400)
+        setattr(config, name, type(getattr(config, name))(value))
+    studentPages.cache_clear()
+    return vars(config)
+
+
+@app.get("/{path:path}")
+async def portalPage(path: str, request: Request):
+    path = "/" + path
+    portal = PAGE_PORTALS.get(path)
+    if portal is None:
+        return HTMLResponse("<html><body>Not Found</body></html>", status_code=404)
+
+    #Protected pages bounce to the login form without a live session, like the portal
+    rollno = loggedInStudent(request, portal)
+    if rollno is None:
+        return RedirectResponse(f"/{portal}", status_code=302)
+
+    return HTMLResponse(studentPages(rollno)[PORTAL_ORIGIN + path])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the ecampus portals")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--password", default=config.password, help="Password every roll number logs in with")
+    parser.add_argument("--latency-ms", type=float, default=config.latency_ms, help="Delay added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=config.jitter_ms, help="Random extra delay, up to this much")
+    parser.add_argument("--login-latency-ms", type=float, default=config.login_latency_ms, help="Extra delay of login POSTs")
+    parser.add_argument("--error-rate", type=float, default=config.error_rate, help="Share of responses that are a 5xx")
+    parser.add_argument("--hang-rate", type=float, default=config.hang_rate, help="Share of responses held for --hang-seconds")
+    parser.add_argument("--hang-seconds", type=float, default=config.hang_seconds)
+    parser.add_argument("--courses", type=int, default=config.courses, help="Courses per student")
+    parser.add_argument("--semesters", type=int, default=config.semesters, help="Completed semesters per student")
+    args = parser.parse_args()
+
+    for name, value in vars(args).items():
+        if hasattr(config, name):
+            setattr(config, name, value)
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
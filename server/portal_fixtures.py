@@ -0,0 +1,169 @@
+import random
+from util.Attendance import STUDENT_PERCENTAGE_URL, COURSE_PLAN_URL
+from util.Internals import INTERNALS_URL
+from util.Timetable import SCHEDULE_PAGE_URL
+from util.Cgpa import COURSES_PAGE_URL, RESULTS_PAGE_URL
+from util.UserInfo import SCHOLARSHIP_PAGE_URL, PROFILE_PAGE_URL
+
+# Synthetic ecampus pages shaped like the ones the scrapers read, for benchmarking and
+# load testing without the live portal. Every page is generated from a seed, so the same
+# size always gives the same markup, and sizes go well past what a real student has.
+
+COURSE_WORDS = ["Data", "Structures", "and", "Algorithms", "Operating", "Systems", "Theory", "of",
+                "Computation", "Machine", "Learning", "Probability", "Statistics", "Compiler",
+                "Design", "Computer", "Networks", "Laboratory", "(Integrated)", "Engineering"]
+
+EXAM_MONTHS = ["JAN", "FEB", "MAR", "APR", "AUG", "SEP", "OCT", "NOV"]
+GRADES = ["O", "A+", "A", "B+", "B", "C"]
+
+
+def fixtureCourses(courses, seed=1):
+    """(course code, course name) pairs for the current semester"""
+    rnd = random.Random(seed)
+    return [
+        (f"23X{100 + number}", " ".join(rnd.choice(COURSE_WORDS) for _ in range(rnd.randint(2, 6))))
+        for number in range(courses)
+    ]
+
+
+def attendancePage(courses, seed=2):
+    """StudentPercentage: one row per course in table#example"""
+    rnd = random.Random(seed)
+    rows = []
+    for code, _ in courses:
+        total = rnd.randint(20, 90)
+        present = rnd.randint(total // 2, total)
+        rows.append(
+            "<tr>" + "".join(f"<td>{value}</td>" for value in (
+                code, total, total - present, 0, present, 0, present * 100 // total, "02-01-2025", "30-04-2025"
+            )) + "</tr>"
+        )
+    return (
+        "<html><head><title>Attendance</title></head><body>"
+        "<nav class='navbar navbar-expand-lg navbar-light'></nav>"
+        "<div class='container'><table id='example' class='table'>"
+        "<thead><tr><th>Course Code</th><th>Total Hours</th><th>Exemption Hours</th><th>Total Absent</th>"
+        "<th>Total Present</th><th>Medical</th><th>Percentage</th><th>From</th><th>To</th></tr></thead>"
+        "<tbody>" + "".join(rows) + "</tbody></table></div></body></html>"
+    )
+
+
+def coursePlanPage(courses):
+    """courseplan: a col-md-8 card with the code and name of each course"""
+    cards = "".join(
+        f"<div class='row'><div class='col-md-4'><img src='/images/course.png'></div>"
+        f"<div class='col-md-8'><h5>{code}</h5><h6>{name}</h6><p>Faculty: Dr. A. Staff</p></div></div>"
+        for code, name in courses
+    )
+    return f"<html><body><div class='container'>{cards}</div></body></html>"
+
+
+def internalsPage(courses, seed=3, final=True):
+    """CAMarksView: a lab table, then the theory table with the internal mark before the last column"""
+    rnd = random.Random(seed)
+    rows = []
+    for code, _ in courses:
+        marks = [str(rnd.randint(10, 50)) for _ in range(6)]
+        internal = f"{rnd.uniform(15, 40):.2f}" if rnd.random() > 0.1 else ""
+        rows.append("<tr>" + "".join(f"<td>{value}</td>" for value in [code, *marks, internal, "" if final else "*"]) + "</tr>")
+    return (
+        "<html><body>"
+        "<table class='table'><thead><tr><th>Lab</th></tr></thead><tbody><tr><td>No lab marks</td></tr></tbody></table>"
+        "<table class='table'><thead><tr><th>Course</th><th>CA1</th><th>CA2</th><th>AT1</th><th>AT2</th>"
+        "<th>TA1</th><th>TA2</th><th>Internal</th><th></th></tr></thead>"
+        "<tbody>" + "".join(rows) + "</tbody></table></body></html>"
+    )
+
+
+def examSchedulePage(courses, seed=4):
+    """CATestTimeTable: a Test-card holding one text-left block of span.sol fields per exam"""
+    rnd = random.Random(seed)
+    exams = "".join(
+        f"<div class='text-left'><span class='sol'>: {code}</span><span class='sol'>: CA Test {rnd.randint(1, 2)}</span>"
+        f"<span class='sol'>: {rnd.randint(1, 28):02d}/{rnd.choice(EXAM_MONTHS)}/25</span>"
+        f"<span class='sol'>: Monday</span><span class='sol'>: {rnd.choice(['09:30 AM', '01:45 PM'])}</span></div>"
+        for code, _ in courses
+    )
+    return f"<html><body><div class='Test-card'>{exams}</div></body></html>"
+
+
+def courseSelectionPage(semesters, per_semester=6, seed=5):
+    """AttWfStudCourseSelection.aspx: table#PDGCourse of completed courses, latest semester first"""
+    rnd = random.Random(seed)
+    rows = ["<tr><td>S.No</td><td>COURSE CODE</td><td>COURSE TITLE</td><td>TYPE</td><td>SEMESTER</td>"
+            "<td>REGULATION</td><td>GRADE</td><td>CREDITS</td></tr>"]
+    number = 0
+    for semester in range(semesters, 0, -1):
+        for course in range(per_semester):
+            number += 1
+            rows.append(
+                f"<tr><td>{number}</td><td> 23Z{semester}{course:02d} </td><td>Course Title</td><td>Theory</td>"
+                f"<td> {semester} </td><td>2023</td><td> {rnd.choice(GRADES)} </td><td> {rnd.randint(1, 4)} </td></tr>"
+            )
+    return "<html><body><form><table id='PDGCourse'>" + "".join(rows) + "</table></form></body></html>"
+
+
+def resultsPage(semesters, per_semester=3, arrear_semester=None):
+    """FrmEpsStudResult.aspx: table#DgResult, the semester only on its first row, RA for an arrear"""
+    rows = ["<tr><td>Semester</td><td>Course</td><td>Title</td><td>Credits</td><td>Grade</td><td>Result</td></tr>"]
+    for semester in range(1, semesters + 1):
+        for course in range(per_semester):
+            result = "RA" if semester == arrear_semester and course == 1 else "PASS"
+            rows.append(
+                f"<tr><td>{semester if course == 0 else ' '}</td><td>23Z{semester}{course:02d}</td>"
+                f"<td>Course Title</td><td>3</td><td>A</td><td>{result}</td></tr>"
+            )
+    return "<html><body><table id='DgResult'>" + "".join(rows) + "</table></body></html>"
+
+
+def scholarshipPage(name="STUDENT NAME"):
+    return (
+        "<html><body><table><tr><td class='personal-info'><table><tr>"
+        f"<td>{name}</td><td>B.E. CSE</td><td>17/10/2004</td></tr></table></td></tr></table></body></html>"
+    )
+
+
+def profilePage(name="STUDENT NAME"):
+    return f"<html><body><input id='txtName' value='{name}'></body></html>"
+
+
+def portalPages(courses=8, semesters=6, per_semester=6, final=True, arrear_semester=None, seed=1):
+    """Every scraped page of one student, keyed by URL"""
+    current = fixtureCourses(courses, seed)
+    return {
+        STUDENT_PERCENTAGE_URL : attendancePage(current, seed + 1),
+        COURSE_PLAN_URL        : coursePlanPage(current),
+        INTERNALS_URL          : internalsPage(current, seed + 2, final),
+        SCHEDULE_PAGE_URL      : examSchedulePage(current, seed + 3),
+        COURSES_PAGE_URL       : courseSelectionPage(semesters, per_semester, seed + 4),
+        RESULTS_PAGE_URL       : resultsPage(semesters, arrear_semester=arrear_semester),
+        SCHOLARSHIP_PAGE_URL   : scholarshipPage(),
+        PROFILE_PAGE_URL       : profilePage(),
+    }
+
+
+class FixtureResponse:
+    """The parts of a requests/httpx response the scrapers read"""
+
+    def __init__(self, url, text, status_code=200):
+        self.url = url
+        self.text = text
+        self.content = text.encode()
+        self.status_code = status_code
+        self.ok = self.is_success = 200 <= status_code < 400
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise RuntimeError(f"{self.status_code} for {self.url}")
+
+
+class FixtureSession:
+    """Stand-in for a logged-in session that answers GETs from fixture pages"""
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    def get(self, url, **kwargs):
+        if url not in self.pages:
+            return FixtureResponse(url, "", 404)
+        return FixtureResponse(url, self.pages[url])
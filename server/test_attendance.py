@@ -0,0 +1,93 @@
+"""
+calculateLeaves and calculateLeavesGrid against the class-by-class loop they replaced.
+
+    python -m pytest test_attendance.py
+"""
+import pytest
+
+from util.Attendance import calculateLeaves, calculateLeavesGrid
+
+#Every whole target the loop terminates for, and a few that are not whole
+TARGETS = list(range(1, 100)) + [12.5, 33.3, 66.7, 74.5, 87.5, 99.5]
+
+
+def loopLeaves(classes_present, classes_total, maintenance_percentage):
+    """The original simulation, one class at a time. Never ends for targets of 100 or more with a deficit, or 0 or less."""
+    affordable_leaves = 0
+    i = 1
+    if float(classes_present/classes_total)*100 < maintenance_percentage:
+        while float((classes_present + i)/(classes_total + i))*100 <= maintenance_percentage:
+            affordable_leaves -= 1
+            i += 1
+    else:
+        while float(classes_present/(classes_total + i))*100 >= maintenance_percentage:
+            affordable_leaves += 1
+            i += 1
+    return affordable_leaves
+
+
+def test_calculateLeaves_matches_loop():
+    for classes_total in range(1, 61):
+        for classes_present in range(classes_total + 1):
+            for target in TARGETS:
+                expected = loopLeaves(classes_present, classes_total, target)
+                assert calculateLeaves(classes_present, classes_total, target) == expected, (classes_present, classes_total, target)
+
+
+@pytest.mark.parametrize("classes_present, classes_total, target", [
+    #Deficits whose estimate float rounding leaves one class short or over
+    (0, 9, 55), (1, 10, 55), (2, 11, 55), (1, 12, 56),
+    #Surpluses likewise
+    (29, 29, 29), (29, 29, 58), (29, 30, 29), (29, 31, 29),
+])
+def test_calculateLeaves_settles_rounded_estimates(classes_present, classes_total, target):
+    assert calculateLeaves(classes_present, classes_total, target) == loopLeaves(classes_present, classes_total, target)
+
+
+@pytest.mark.parametrize("classes_present, classes_total, target", [
+    (9, 10, 100), (0, 10, 100), (10, 10, 101), (5, 10, 150),
+])
+def test_calculateLeaves_rejects_unreachable_targets(classes_present, classes_total, target):
+    #The loop never ends for these
+    with pytest.raises(ValueError):
+        calculateLeaves(classes_present, classes_total, target)
+
+
+@pytest.mark.parametrize("classes_present, classes_total, target", [
+    (0, 10, 0), (5, 10, 0), (5, 10, -10),
+])
+def test_calculateLeaves_rejects_targets_met_by_any_leaves(classes_present, classes_total, target):
+    with pytest.raises(ValueError):
+        calculateLeaves(classes_present, classes_total, target)
+
+
+def test_calculateLeaves_full_attendance_at_100():
+    #Met exactly, and one leave would break it
+    assert calculateLeaves(10, 10, 100) == 0
+
+
+def test_calculateLeaves_without_classes():
+    with pytest.raises(ZeroDivisionError):
+        calculateLeaves(0, 0, 75)
+
+
+def test_calculateLeavesGrid_matches_calculateLeaves():
+    targets = list(range(50, 101))
+    for classes_total in range(1, 41):
+        for classes_present in range(classes_total + 1):
+            grid = calculateLeavesGrid(classes_present, classes_total, targets)
+            assert len(grid) == len(targets)
+            for target, leaves in zip(targets, grid):
+                if target == 100 and classes_present < classes_total:
+                    assert leaves is None
+                else:
+                    assert leaves == loopLeaves(classes_present, classes_total, target)
+
+
+@pytest.mark.parametrize("classes_total", [0, -1])
+def test_calculateLeavesGrid_without_classes(classes_total):
+    assert calculateLeavesGrid(0, classes_total, [50, 75, 100]) == [None, None, None]
+
+
+def test_calculateLeavesGrid_unreachable_targets():
+    assert calculateLeavesGrid(5, 10, [0, 50, 100]) == [None, 0, None]
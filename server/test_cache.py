@@ -0,0 +1,169 @@
+"""
+AsyncSingleFlight: one shared call per key, independent of the caller that started it.
+
+    python -m pytest test_cache.py
+"""
+import asyncio
+
+import pytest
+
+from util.Cache import AsyncSingleFlight
+from util.Deadline import DeadlineExceeded, checkDeadline, startDeadline, timeRemaining
+
+
+def test_callers_share_one_call():
+    async def run():
+        flights = AsyncSingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "page"
+
+        results = await asyncio.gather(*(flights.do("key", fetch) for _ in range(5)))
+        assert results == ["page"] * 5
+        assert len(calls) == 1
+        assert not flights.inFlight("key")
+
+    asyncio.run(run())
+
+
+def test_cancelled_starter_does_not_cancel_the_call():
+    async def run():
+        flights = AsyncSingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.05)
+            return "page"
+
+        starter = asyncio.create_task(flights.do("key", fetch))
+        await asyncio.sleep(0)
+        joiner = asyncio.create_task(flights.do("key", fetch))
+        await asyncio.sleep(0)
+        starter.cancel()
+
+        assert await joiner == "page"
+        with pytest.raises(asyncio.CancelledError):
+            await starter
+
+    asyncio.run(run())
+
+
+def test_call_keeps_the_deadline_of_its_caller():
+    async def run():
+        flights = AsyncSingleFlight()
+        parsed = []
+
+        async def fetch():
+            await asyncio.sleep(0.1)
+            checkDeadline("parse")
+            parsed.append(1)
+            return "page"
+
+        startDeadline(0.02)
+        with pytest.raises(DeadlineExceeded):
+            await flights.do("key", fetch)
+        await asyncio.sleep(0.15)
+
+        #The shared work stopped at the deadline too
+        assert parsed == []
+        assert not flights.inFlight("key")
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("joiner_deadline", [1.0, None])
+def test_joiner_extends_the_deadline(joiner_deadline):
+    async def run():
+        flights = AsyncSingleFlight()
+        seen = []
+
+        async def fetch():
+            await asyncio.sleep(0.1)
+            seen.append(timeRemaining())
+            return "page"
+
+        async def caller(deadline):
+            if deadline is not None:
+                startDeadline(deadline)
+            return await flights.do("key", fetch)
+
+        starter = asyncio.create_task(caller(0.02))
+        await asyncio.sleep(0)
+        joiner = asyncio.create_task(caller(joiner_deadline))
+
+        #The starter gives up at its deadline, the shared call goes on under the joiner's
+        with pytest.raises(DeadlineExceeded):
+            await starter
+        assert await joiner == "page"
+        if joiner_deadline is None:
+            assert seen == [None]
+        else:
+            assert seen[0] > 0.5
+
+    asyncio.run(run())
+
+
+def test_joiner_retries_a_step_cut_off_by_the_earlier_deadline():
+    async def run():
+        flights = AsyncSingleFlight()
+        calls = []
+
+        async def fetch():
+            #Like a fetch to the portal, bounded by the deadline when it was sent
+            calls.append(1)
+            try:
+                await asyncio.wait_for(asyncio.sleep(0.1), timeRemaining())
+            except TimeoutError:
+                raise DeadlineExceeded("Request deadline passed during GET /studzone") from None
+            return "page"
+
+        async def caller(deadline):
+            startDeadline(deadline)
+            return await flights.do("key", fetch)
+
+        starter = asyncio.create_task(caller(0.02))
+        await asyncio.sleep(0)
+        joiner = asyncio.create_task(caller(1.0))
+
+        with pytest.raises(DeadlineExceeded):
+            await starter
+        assert await joiner == "page"
+        assert len(calls) == 2
+
+    asyncio.run(run())
+
+
+def test_joiners_retry_a_cancelled_call():
+    async def run():
+        flights = AsyncSingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            if len(calls) == 1:
+                #Cancelled from outside, like a shutdown would
+                asyncio.current_task().cancel()
+                await asyncio.sleep(0)
+            return "page"
+
+        assert await flights.do("key", fetch) == "page"
+        assert len(calls) == 2
+
+    asyncio.run(run())
+
+
+def test_failures_reach_every_caller():
+    async def run():
+        flights = AsyncSingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.01)
+            raise ValueError("logged out")
+
+        results = await asyncio.gather(*(flights.do("key", fetch) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        assert not flights.inFlight("key")
+
+    asyncio.run(run())
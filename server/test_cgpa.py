@@ -0,0 +1,40 @@
+"""
+getCGPA on a course table that may be shared with other requests.
+
+    python -m pytest test_cgpa.py
+"""
+from util.Cgpa import getCGPA
+
+HEADER = ["S.No", "COURSE CODE", "COURSE TITLE", "TYPE", "SEMESTER", "REGULATION", "GRADE", "CREDITS"]
+
+
+def courseTable():
+    #Most recent semester first, grades as points
+    return [
+        list(HEADER),
+        [1, "23X201", "Operating Systems", "CORE", 2, "2023", 9, 4],
+        [2, "23X202", "Computer Networks", "CORE", 2, "2023", 8, 3],
+        [3, "23X101", "Data Structures", "CORE", 1, "2023", 10, 4],
+        [4, "23X102", "Discrete Mathematics", "CORE", 1, "2023", 7, 3],
+    ]
+
+
+def test_getCGPA():
+    result = getCGPA(courseTable(), 3)
+    assert result.to_dict() == [
+        {"SEMESTER": 1, "GPA": "8.7142", "CGPA": "8.7142"},
+        {"SEMESTER": 2, "GPA": "8.5714", "CGPA": "8.6428"},
+    ]
+
+
+def test_getCGPA_pending_semester():
+    assert getCGPA(courseTable(), 2).to_dict()[1] == {"SEMESTER": 2, "GPA": "-", "CGPA": "-"}
+
+
+def test_getCGPA_leaves_the_table_unchanged():
+    table = courseTable()
+    first = getCGPA(table, 3).to_dict()
+
+    #A scrape shared between requests is read again by the next one
+    assert table == courseTable()
+    assert getCGPA(table, 3).to_dict() == first
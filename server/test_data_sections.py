@@ -0,0 +1,76 @@
+"""
+The /data section loaders against mock_ecampus.py: which failures drop the pooled login.
+
+    python -m pytest test_data_sections.py
+"""
+import asyncio
+import itertools
+
+import pytest
+
+import app
+import mock_ecampus
+from util.Deadline import DeadlineExceeded
+from util.HomePage import LoggedOutError, client_pool
+from util.Limiter import UpstreamBusyError
+from util.SessionPool import sessionKey
+
+PASSWORD = mock_ecampus.config.password
+
+#A student of their own for every test, so no pooled login carries over
+ROLLNOS = (f"22z{number}" for number in itertools.count(800))
+
+pytestmark = pytest.mark.usefixtures("portal")
+
+
+def loadFailing(monkeypatch, section, error):
+    """Run the section's loader with every scrape failing with error, return the pooled client before and after"""
+    rollno = next(ROLLNOS)
+    portal = "studzone2" if section == "cgpa" else "studzone"
+
+    async def failing(client, scrape, *args):
+        raise error
+
+    async def run():
+        before = await app.getPooledSessionAsync(rollno, PASSWORD, portal)
+        with pytest.raises(type(error)):
+            await app.SECTION_LOADERS[section](rollno, PASSWORD)
+        return before
+
+    monkeypatch.setattr(app, "scrapeShared", failing)
+    before = asyncio.run(run())
+    return before, client_pool.checkout(sessionKey(rollno, PASSWORD, portal))[0]
+
+
+@pytest.mark.parametrize("section", sorted(app.SECTION_LOADERS))
+@pytest.mark.parametrize("error", [
+    UpstreamBusyError("timeout", "No upstream slot within 1.0s"),
+    DeadlineExceeded("Request deadline passed during GET /studzone"),
+    ValueError("Unexpected page layout"),
+])
+def test_other_failures_keep_the_login(monkeypatch, section, error):
+    before, after = loadFailing(monkeypatch, section, error)
+    assert after is before
+
+
+@pytest.mark.parametrize("section", sorted(app.SECTION_LOADERS))
+def test_logged_out_session_drops_the_login(monkeypatch, section):
+    before, after = loadFailing(monkeypatch, section, LoggedOutError("The session was logged out"))
+    assert before is not None
+    assert after is None
+
+
+def test_marks_page_without_tables_is_empty(monkeypatch):
+    #getInternals answers False for a marks page without its tables, before any CA marks are out
+    async def noTables(client, scrape, *args):
+        return False
+
+    async def run():
+        rollno = next(ROLLNOS)
+        before = await app.getPooledSessionAsync(rollno, PASSWORD)
+        assert await app.load_internals_section(rollno, PASSWORD) == []
+        return before, client_pool.checkout(sessionKey(rollno, PASSWORD, "studzone"))[0]
+
+    monkeypatch.setattr(app, "scrapeShared", noTables)
+    before, after = asyncio.run(run())
+    assert after is before
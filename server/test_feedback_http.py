@@ -0,0 +1,75 @@
+"""
+The browserless feedback engine (util/FeedbackHttp.py) run against the Feedback pages of
+mock_ecampus.py, served on a local port for the length of the module.
+
+    python -m pytest test_feedback_http.py
+"""
+import pytest
+from fastapi import HTTPException
+
+import mock_ecampus
+from util.FeedbackHttp import submitFeedbackHttp
+
+PASSWORD = mock_ecampus.config.password
+
+pytestmark = pytest.mark.usefixtures("portal")
+
+
+def test_end_semester_feedback():
+    stages = []
+    result = submitFeedbackHttp(0, "22z101", PASSWORD, lambda stage, done, total: stages.append(stage))
+
+    staff, questions = mock_ecampus.config.feedback_staff, mock_ecampus.config.feedback_questions
+    assert result == {"status": "success", "message": "End semester feedback completed", "forms": staff, "answers": staff * questions}
+
+    submitted = mock_ecampus.feedback["22z101"]
+    assert submitted["final"]
+    assert sorted(submitted["staff"]) == list(range(1, staff + 1))
+    for form in submitted["staff"].values():
+        #One of the first two stars for every question
+        assert all(form[f"rating{question}"] in ("5", "4") for question in range(1, questions + 1))
+
+    assert stages[:2] == ["logging_in", "opening_feedback"]
+    assert stages[-2:] == ["submitting", "submitted"]
+    assert stages.count("filling") == staff
+
+
+def test_intermediate_feedback():
+    result = submitFeedbackHttp(1, "22z102", PASSWORD)
+
+    courses = mock_ecampus.config.feedback_courses
+    assert result["message"] == "Intermediate feedback completed"
+    assert result["forms"] == courses
+
+    submitted = mock_ecampus.feedback["22z102"]["intermediate"]
+    assert sorted(submitted) == list(range(1, courses + 1))
+    #The first option of every question
+    assert all(value == "5" for form in submitted.values() for name, value in form.items() if name.startswith("radio-"))
+
+
+def test_end_semester_feedback_without_final_submission():
+    mock_ecampus.config.feedback_final = False
+    try:
+        with pytest.raises(HTTPException) as error:
+            submitFeedbackHttp(0, "22z103", PASSWORD)
+    finally:
+        mock_ecampus.config.feedback_final = True
+
+    #The staff forms went in, so the job fails instead of reporting feedback that was never recorded
+    assert error.value.status_code == 502
+    submitted = mock_ecampus.feedback["22z103"]
+    assert len(submitted["staff"]) == mock_ecampus.config.feedback_staff
+    assert not submitted["final"]
+
+
+def test_invalid_credentials():
+    with pytest.raises(HTTPException) as error:
+        submitFeedbackHttp(0, "22z104", PASSWORD + "x")
+    assert error.value.status_code == 401
+    assert "22z104" not in mock_ecampus.feedback
+
+
+def test_missing_feedback_card():
+    with pytest.raises(HTTPException) as error:
+        submitFeedbackHttp(5, "22z105", PASSWORD)
+    assert error.value.status_code == 404
@@ -0,0 +1,71 @@
+"""
+FeedbackJobQueue: one active job per student, handed back only for the same request.
+
+    python -m pytest test_feedback_jobs.py
+"""
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from util.FeedbackJobs import FeedbackJobQueue
+from util.SessionPool import sessionKey
+
+
+def blockedQueue():
+    """A queue whose jobs run until release is set"""
+    release = threading.Event()
+
+    def run(*args, progress):
+        release.wait(5)
+        return {"message": "Feedback completed"}
+
+    return FeedbackJobQueue(run, workers=1), release
+
+
+def request(password="password", feedback_index=0):
+    return sessionKey("22Z101", password, f"feedback {feedback_index}")
+
+
+def test_same_request_gets_the_running_job():
+    queue, release = blockedQueue()
+    try:
+        job, created = queue.submit("22Z101", request())
+        again, created_again = queue.submit("22Z101", request())
+        assert created and not created_again
+        assert again is job
+    finally:
+        release.set()
+        queue.shutdown()
+
+
+@pytest.mark.parametrize("other", [request(feedback_index=1), request(password="wrong")])
+def test_other_requests_for_the_student_are_refused(other):
+    queue, release = blockedQueue()
+    try:
+        job, _ = queue.submit("22Z101", request())
+        with pytest.raises(HTTPException) as error:
+            queue.submit("22Z101", other)
+        #Without the running job's id
+        assert error.value.status_code == 409
+        assert job.id not in error.value.detail
+    finally:
+        release.set()
+        queue.shutdown()
+
+
+def test_next_request_runs_once_the_job_finished():
+    queue, release = blockedQueue()
+    try:
+        job, _ = queue.submit("22Z101", request())
+        release.set()
+        deadline = time.monotonic() + 5
+        while job.finished is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert job.status == "completed"
+
+        second, created = queue.submit("22Z101", request(feedback_index=1))
+        assert created and second is not job
+    finally:
+        queue.shutdown()
@@ -0,0 +1,73 @@
+"""
+calculateTarget and getTargetGrid against the score-by-score loop they replaced.
+
+    python -m pytest test_internals.py
+"""
+import pytest
+
+from util.Internals import calculateTarget, getTargetGrid, getTargetScore
+
+
+def loopTarget(internal, final):
+    """The original search, every end semester score from 45 to 100"""
+    internal = (float)(internal)
+    final    = (float)(final)
+    for target in range(45, 101):
+        if (float)(0.8 * internal) + (float)(0.6 * target) >= final:
+            return target
+    return '-'
+
+
+def test_calculateTarget_matches_loop():
+    #Internals in quarter marks, as strings like the marks page gives them, and targets in half percents
+    for quarters in range(0, 201):
+        internal = str(quarters / 4)
+        for halves in range(0, 241):
+            final = halves / 2
+            assert calculateTarget(internal, final) == loopTarget(internal, final), (internal, final)
+
+
+@pytest.mark.parametrize("internal, final", [
+    #The estimate float rounding puts one score too high
+    ("0.5", 34.0), ("0.5", 37.0), ("1.75", 35.0), ("3.0", 30.0),
+    #and one too low
+    ("0.25", 29.0), ("0.25", 32.0), ("0.5", 58.0), ("1.75", 59.0),
+])
+def test_calculateTarget_settles_rounded_estimates(internal, final):
+    assert calculateTarget(internal, final) == loopTarget(internal, final)
+
+
+@pytest.mark.parametrize("internal, final", [
+    ("50", 0), ("0", 0), ("-10", 50), ("50", 100), ("0", 60), ("0", 61),
+    ("37.33", 79.9), ("12.5", 120), ("inf", 50), ("-inf", 50), ("nan", 50), ("25", float("inf")),
+])
+def test_calculateTarget_bounds(internal, final):
+    #Scores stay within 45..100, anything beyond is '-'
+    assert calculateTarget(internal, final) == loopTarget(internal, final)
+
+
+def test_getTargetGrid_matches_calculateTarget():
+    targets = [50, 60, 70, 80, 90, 100]
+    theory_table = [
+        ["23X101   -   DS", "40", "38", "35", "*", "37.50", ""],
+        ["23X102   -   OS", "", "", "", "", " ", ""],
+        ["23X103   -   CN", "20", "25", "30", "", "22", ""],
+    ]
+    grid = getTargetGrid(theory_table, targets)
+
+    assert grid[0] == ["23X101   -   DS", "37.50", [loopTarget("37.50", target) for target in targets]]
+    assert grid[1] == ["23X102   -   OS", "*", "*"]
+    assert grid[2] == ["23X103   -   CN", "22.00", [loopTarget("22", target) for target in targets]]
+
+
+def test_getTargetGrid_marks_temporary_internals():
+    theory_table = [["23X101   -   DS", "40", "38", "35", "36.25", "*"]]
+    assert getTargetGrid(theory_table, [50]) == [["23X101   -   DS", "36.25*", [loopTarget("36.25", 50)]]]
+
+
+def test_getTargetGrid_agrees_with_getTargetScore():
+    theory_table = [["23X101   -   DS", "40", "38", "35", "31.5", ""], ["23X102   -   OS", "20", "20", "20", "18", ""]]
+    scores = getTargetScore(theory_table, 80)
+    grid = getTargetGrid(theory_table, [50, 80])
+    for (course, internal, pass_score, target_score), (_, _, grid_scores) in zip(scores, grid):
+        assert grid_scores == [pass_score, target_score]
@@ -0,0 +1,205 @@
+"""
+Offline benchmarks of the scrapers and calculations, run against generated portal pages
+(portal_fixtures.py) instead of the live ecampus site.
+
+    python test_scraping_local.py                      # time everything, compare with the baseline
+    python test_scraping_local.py --update-baseline    # time everything and store it as the baseline
+    python test_scraping_local.py --sizes large huge --tolerance 0.5
+
+Timings are the median per call over --repeat samples. A benchmark slower than its
+baseline by more than --tolerance is flagged and the run exits with status 1.
+Baselines depend on the machine, so record them where the comparison is made.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import timeit
+
+from portal_fixtures import portalPages, fixtureCourses, coursePlanPage, internalsPage, FixtureSession
+from util.Attendance import getStudentAttendance, getCourseNames, parseCourseNames, getAffordableLeaves, calculateLeaves, calculateLeavesGrid
+from util.Internals import getInternals, parseInternals, getTargetScore, calculateTarget, getTargetGrid
+from util.Timetable import getExamSchedule
+from util.Cgpa import getStudentCourses, getCompletedSemester, getCGPA
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(HERE, "benchmark_baseline.json")
+
+#Saved CA marks page, checked before timing so fixture drift shows up as a failure
+SAMPLE_INTERNALS_PAGE = os.path.join(HERE, "test_internals_page.html")
+SAMPLE_COURSES = 8
+
+#Fixture sizes: a typical student, a long programme and far past anything real
+SIZES = {
+    "small" : {"courses": 8,   "semesters": 8,  "per_semester": 6},
+    "large" : {"courses": 60,  "semesters": 16, "per_semester": 12},
+    "huge"  : {"courses": 400, "semesters": 40, "per_semester": 25},
+}
+
+TARGETS = list(range(50, 101))
+
+
+def scraperBenchmarks(pages):
+    #A new session per call, so each call pays for the course map like a first scrape does
+    return {
+        "getStudentAttendance" : lambda: getStudentAttendance(FixtureSession(pages)),
+        "getCourseNames"       : lambda: getCourseNames(FixtureSession(pages)),
+        "getInternals"         : lambda: getInternals(FixtureSession(pages)),
+        "getExamSchedule"      : lambda: getExamSchedule(FixtureSession(pages)),
+        "getStudentCourses"    : lambda: getStudentCourses(FixtureSession(pages)),
+        "getCompletedSemester" : lambda: getCompletedSemester(FixtureSession(pages)),
+    }
+
+
+def computeBenchmarks(pages):
+    session = FixtureSession(pages)
+    attendance = getStudentAttendance(session)
+    theory_table = getInternals(session)
+    courses = getStudentCourses(session)
+    completed_semester = getCompletedSemester(session)
+    counts = [(int(row[4]), int(row[1])) for row in attendance]
+
+    return {
+        "getAffordableLeaves" : lambda: getAffordableLeaves(attendance, 75),
+        "calculateLeaves"     : lambda: [calculateLeaves(present, total, 75) for present, total in counts],
+        "calculateLeavesGrid" : lambda: [calculateLeavesGrid(present, total, TARGETS) for present, total in counts],
+        "getCGPA"             : lambda: getCGPA(courses, completed_semester),
+        "getTargetScore"      : lambda: getTargetScore(theory_table, 80),
+        "calculateTarget"     : lambda: [calculateTarget(record[-2], 80) for record in theory_table if record[-2].strip()],
+        "getTargetGrid"       : lambda: getTargetGrid(theory_table, TARGETS),
+    }
+
+
+def checkFixtures(pages, courses):
+    """Fail early if a scraper no longer understands the fixture pages"""
+    session = FixtureSession(pages)
+    results = {
+        "getStudentAttendance" : len(getStudentAttendance(session)),
+        "getCourseNames"       : len(getCourseNames(session)),
+        "getInternals"         : len(getInternals(session)),
+        "getExamSchedule"      : len(getExamSchedule(session)),
+    }
+    for name, count in results.items():
+        if count != courses:
+            raise SystemExit(f"{name} read {count} of {courses} courses from the fixtures")
+    if not getStudentCourses(session) or not getCompletedSemester(session):
+        raise SystemExit("The CGPA pages could not be read from the fixtures")
+
+
+def checkSample():
+    with open(SAMPLE_INTERNALS_PAGE, encoding="utf-8") as sample:
+        html = sample.read()
+    course_map = parseCourseNames(coursePlanPage(fixtureCourses(SAMPLE_COURSES)))
+    theory_table = parseInternals(html, course_map)
+    if not theory_table or len(theory_table) != SAMPLE_COURSES:
+        raise SystemExit(f"{os.path.basename(SAMPLE_INTERNALS_PAGE)} no longer parses, regenerate it with --write-sample")
+
+
+def writeSample():
+    with open(SAMPLE_INTERNALS_PAGE, "w", encoding="utf-8") as sample:
+        sample.write(internalsPage(fixtureCourses(SAMPLE_COURSES), final=False))
+
+
+def timeCall(function, repeat):
+    """Median and fastest seconds per call, with enough calls per sample to time reliably"""
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    samples = [elapsed / number for elapsed in timer.repeat(repeat=repeat, number=number)]
+    return statistics.median(samples), min(samples)
+
+
+def loadBaseline():
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH, encoding="utf-8") as baseline:
+        return json.load(baseline).get("sizes", {})
+
+
+def saveBaseline(results):
+    sizes = loadBaseline()
+    for size, timings in results.items():
+        sizes.setdefault(size, {}).update(timings)
+    with open(BASELINE_PATH, "w", encoding="utf-8") as baseline:
+        json.dump({
+            "python"  : platform.python_version(),
+            "machine" : platform.machine(),
+            "unit"    : "ms per call",
+            "sizes"   : sizes,
+        }, baseline, indent=2, sort_keys=True)
+        baseline.write("\n")
+
+
+def compare(median_ms, baseline_ms, tolerance):
+    if baseline_ms is None:
+        return "new", ""
+    change = median_ms / baseline_ms - 1
+    if change > tolerance:
+        status = "REGRESSION"
+    elif change < -tolerance:
+        status = "faster"
+    else:
+        status = "ok"
+    return status, f"{change:+.0%}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scrapers and calculations against generated portal pages")
+    parser.add_argument("--sizes", nargs="+", choices=sorted(SIZES), default=["small", "large"])
+    parser.add_argument("--only", nargs="+", help="Only run these benchmarks")
+    parser.add_argument("--repeat", type=int, default=7, help="Samples per benchmark")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown against the baseline, 0.25 = 25%%")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these timings as the baseline")
+    parser.add_argument("--write-sample", action="store_true", help=f"Regenerate {os.path.basename(SAMPLE_INTERNALS_PAGE)} and exit")
+    args = parser.parse_args()
+
+    if args.write_sample:
+        writeSample()
+        return 0
+
+    #The scrapers log every page they read
+    logging.disable(logging.WARNING)
+
+    checkSample()
+    baseline = {} if args.update_baseline else loadBaseline()
+    results = {}
+    regressions = []
+
+    print(f"{'size':<6} {'benchmark':<22} {'median ms':>10} {'best ms':>10} {'baseline':>10} {'change':>7}")
+    for size in args.sizes:
+        pages = portalPages(**SIZES[size])
+        checkFixtures(pages, SIZES[size]["courses"])
+
+        benchmarks = {**scraperBenchmarks(pages), **computeBenchmarks(pages)}
+        results[size] = {}
+        for name, function in benchmarks.items():
+            if args.only and name not in args.only:
+                continue
+
+            median, best = timeCall(function, args.repeat)
+            median_ms = median * 1000
+            results[size][name] = round(median_ms, 4)
+
+            baseline_ms = baseline.get(size, {}).get(name)
+            status, change = compare(median_ms, baseline_ms, args.tolerance)
+            if status == "REGRESSION":
+                regressions.append(f"{size}/{name}")
+            baseline_text = f"{baseline_ms:.4f}" if baseline_ms is not None else "-"
+            print(f"{size:<6} {name:<22} {median_ms:>10.4f} {best * 1000:>10.4f} {baseline_text:>10} {change:>7}  {status}")
+
+    if args.update_baseline:
+        saveBaseline(results)
+        print(f"Baseline written to {BASELINE_PATH}")
+    elif not baseline:
+        print("No baseline yet, run with --update-baseline to record one")
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+Pooled clients stay usable for the requests holding them after they leave the pool,
+run against mock_ecampus.py served on a local port.
+
+    python -m pytest test_session_pool.py
+"""
+import asyncio
+
+import pytest
+
+import mock_ecampus
+from util.Attendance import getStudentAttendanceAsync
+from util.HomePage import getPooledSessionAsync, invalidatePooledSession, scrapeShared, client_pool
+from util.SessionPool import SessionPool, sessionKey
+
+PASSWORD = mock_ecampus.config.password
+
+pytestmark = pytest.mark.usefixtures("portal")
+
+
+def test_invalidated_client_serves_the_requests_holding_it():
+    async def run():
+        first = await getPooledSessionAsync("22z601", PASSWORD)
+        second = await getPooledSessionAsync("22z601", PASSWORD)
+        assert first is second
+
+        #One request gives up on the login while the other is still scraping with it
+        scraping = asyncio.create_task(getStudentAttendanceAsync(first))
+        await asyncio.sleep(0)
+        invalidatePooledSession("22z601", PASSWORD)
+        assert client_pool.checkout(sessionKey("22z601", PASSWORD, "studzone")) == (None, False)
+
+        attendance, shared = await asyncio.gather(scraping, scrapeShared(second, getStudentAttendanceAsync))
+        assert attendance and shared == attendance
+
+        #The next request logs in again
+        assert await getPooledSessionAsync("22z601", PASSWORD) is not first
+
+    asyncio.run(run())
+
+
+def test_replaced_evicted_and_expired_clients_stay_usable():
+    async def run():
+        pool = SessionPool(ttl=60, validate_after=60, max_size=1)
+        held = await getPooledSessionAsync("22z602", PASSWORD)
+        pool.put("held", held)
+        assert pool.checkout("held")[0] is held
+
+        #Replaced by a newer login of its own
+        pool.put("held", await getPooledSessionAsync("22z603", PASSWORD))
+        assert await getStudentAttendanceAsync(held)
+
+        #Evicted by another student's login
+        pool.put("held", held)
+        pool.put("other", await getPooledSessionAsync("22z604", PASSWORD))
+        assert pool.checkout("held") == (None, False)
+        assert await getStudentAttendanceAsync(held)
+
+        pool = SessionPool(ttl=0, validate_after=60, max_size=1)
+        pool.put("held", held)
+        await asyncio.sleep(0.01)
+        assert pool.checkout("held") == (None, False)
+        assert await getStudentAttendanceAsync(held)
+
+    asyncio.run(run())
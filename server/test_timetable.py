@@ -0,0 +1,152 @@
+"""
+classifyToken and formatDate against the search-and-strptime code they replaced.
+
+    python -m pytest test_timetable.py
+"""
+import random
+import re
+from datetime import datetime
+
+import pytest
+
+from util.Timetable import classifyToken, formatDate
+
+
+def searchIsDate(text):
+    """The original date check, every pattern searched in turn"""
+    if not text:
+        return False
+    date_patterns = [
+        r'\d{1,2}[/\-\.]\d{1,2}[/\-\.]\d{2,4}',
+        r'\d{4}[/\-\.]\d{1,2}[/\-\.]\d{1,2}',
+        r'\d{1,2}\s+\w+\s+\d{4}',
+        r'\w+\s+\d{1,2},?\s+\d{4}',
+        r'\d{1,2}/[A-Z]{3}/\d{2}',
+    ]
+    return any(re.search(pattern, text) for pattern in date_patterns)
+
+
+def searchIsTime(text):
+    """The original time check"""
+    if not text:
+        return False
+    time_patterns = [
+        r'\d{1,2}:\d{2}\s*(AM|PM|am|pm)?',
+        r'\d{1,2}:\d{2}:\d{2}',
+        r'\d{1,2}:\d{2}',
+    ]
+    return any(re.search(pattern, text) for pattern in time_patterns)
+
+
+def strptimeFormatDate(date_str):
+    """
+    The original formatDate, strptime over every format. DD/MON/YY takes a two or four digit
+    year only, where the original read anything int() did (250, 25_0) as the year.
+    """
+    if not date_str:
+        return None
+    date_str = date_str.strip()
+
+    if re.fullmatch(r'\d{1,2}/[A-Z]{3}/(\d{2}|\d{4})', date_str):
+        try:
+            day, month, year = date_str.split('/')
+            day = int(day)
+            year = int(year)
+            month_map = {
+                'JAN': 1, 'FEB': 2, 'MAR': 3, 'APR': 4, 'MAY': 5, 'JUN': 6,
+                'JUL': 7, 'AUG': 8, 'SEP': 9, 'OCT': 10, 'NOV': 11, 'DEC': 12
+            }
+            if month in month_map:
+                if year < 100:
+                    year += 2000
+                return datetime(year, month_map[month], day).strftime("%d-%m-%y")
+        except (ValueError, KeyError):
+            pass
+
+    date_formats = [
+        "%d/%m/%Y", "%d-%m-%Y", "%d/%m/%y", "%d-%m-%y", "%Y-%m-%d", "%d.%m.%Y",
+        "%d.%m.%y", "%d %B %Y", "%B %d, %Y", "%d %b %Y", "%b %d, %Y",
+    ]
+    for fmt in date_formats:
+        try:
+            return datetime.strptime(date_str, fmt).strftime("%d-%m-%y")
+        except ValueError:
+            continue
+
+    patterns = [
+        r'(\d{1,2})[/\-\.](\d{1,2})[/\-\.](\d{2,4})',
+        r'(\d{4})[/\-\.](\d{1,2})[/\-\.](\d{1,2})',
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, date_str)
+        if match:
+            try:
+                day, month, year = match.groups()
+                day, month, year = int(day), int(month), int(year)
+                if year < 100:
+                    year += 2000
+                return datetime(year, month, day).strftime("%d-%m-%y")
+            except ValueError:
+                continue
+    return None
+
+
+#Pieces of exam page text, glued together at random
+ATOMS = [
+    '1', '2', '9', '0', '00', '01', '12', '13', '28', '29', '30', '31', '32', '2024', '2025', '1900', '2000',
+    '0012', '0000', '99', '68', '69', '25', '250', '25_0', '_', '/', '-', '.', ':', ',', ' ', '  ', '\t', '\n',
+    'AUG', 'FEB', 'ABC', 'aug', 'Feb', 'February', 'february', 'March', 'MARCH', 'May', 'Sep', 'Sept', 'Auguſt',
+    'am', 'PM', '٢٨', 'x', 'Date', '10:00', '9:30 AM', '12:00:00',
+]
+#and dates in every format, with parts out of range or one piece too many
+TEMPLATES = [
+    '{d}/{M}/{y}', '{d}-{m}-{Y}', '{d}/{m}/{Y}', '{d}.{m}.{y}', '{Y}-{m}-{d}', '{d} {B} {Y}',
+    '{B} {d}, {Y}', '{b} {d}, {Y}', '{d} {b} {Y}', ' {d}/{M}/{Y} ',
+]
+
+
+def generatedTexts(count, seed=7):
+    rnd = random.Random(seed)
+    for i in range(count):
+        if i % 2:
+            yield ''.join(rnd.choice(ATOMS) for _ in range(rnd.randint(1, 7)))
+        else:
+            fields = dict(
+                d=rnd.choice(['1', '01', '29', '30', '31', '0', '32', ' 5', '٢']),
+                m=rnd.choice(['1', '02', '12', '13', '0']),
+                Y=rnd.choice(['2024', '2023', '1900', '2000', '0000', '0031', '20245']),
+                y=rnd.choice(['00', '24', '68', '69', '99', '5', '250', '25_1']),
+                M=rnd.choice(['AUG', 'FEB', 'feb', 'XYZ']),
+                B=rnd.choice(['February', 'FEBRUARY', 'Sept', 'may']),
+                b=rnd.choice(['Feb', 'sep', 'Sept', 'MAY']),
+            )
+            yield rnd.choice(TEMPLATES).format(**fields) + rnd.choice(['', '', ' x', '/1', '0'])
+
+
+def test_classifyToken_and_formatDate_match_strptime():
+    dates = 0
+    for text in generatedTexts(400_000):
+        expected = 'date' if searchIsDate(text) else 'time' if searchIsTime(text) else None
+        assert classifyToken(text) == expected, repr(text)
+        formatted = strptimeFormatDate(text)
+        assert formatDate(text) == formatted, repr(text)
+        dates += formatted is not None
+    #Enough of them are dates for the formats to be exercised
+    assert dates > 40_000
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("28/AUG/25", "28-08-25"), ("28/AUG/2025", "28-08-25"), (" 5/SEP/24 ", "05-09-24"),
+    ("29/FEB/24", "29-02-24"), ("29/FEB/25", None), ("31/APR/25", None), ("28/aug/25", None),
+    ("12-09-2025", "12-09-25"), ("12/09/25", "12-09-25"), ("2025-01-05", "05-01-25"), ("05.01.99", "05-01-99"),
+    ("5 March 2025", "05-03-25"), ("March 5, 2025", "05-03-25"), ("5 Mar 2025", "05-03-25"),
+    ("Exam on 12-09-2025 FN", "12-09-25"), ("", None), ("TBA", None),
+])
+def test_formatDate(text, expected):
+    assert formatDate(text) == expected
+    assert strptimeFormatDate(text) == expected
+
+
+@pytest.mark.parametrize("text", ["28/AUG/250", "28/AUG/25_0", "28/AUG/20250", "28/AUG/5"])
+def test_formatDate_takes_portal_years_of_two_or_four_digits(text):
+    assert formatDate(text) is None
@@ -0,0 +1,77 @@
+"""
+Upstream requests cut off by our own deadline, against a slow mock_ecampus.py: they must
+not count as portal timeouts or shrink the concurrency limit everyone shares.
+
+    python -m pytest test_transport.py
+"""
+import asyncio
+import contextvars
+
+import pytest
+from requests import Timeout
+
+import mock_ecampus
+from util import Transport
+from util.Deadline import DeadlineExceeded, startDeadline
+from util.Limiter import AdaptiveLimiter
+from util.Metrics import upstream_timeouts
+from util.Transport import newSession, newAsyncClient
+
+PAGE = "https://ecampus.psgtech.ac.in/studzone"
+
+pytestmark = pytest.mark.usefixtures("portal")
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    """A fresh limiter for the requests of one test, on a portal answering in 300 ms"""
+    limiter = AdaptiveLimiter(initial=20, min_limit=4, max_limit=100)
+    monkeypatch.setattr(Transport, "upstream_limiter", limiter)
+    monkeypatch.setattr(mock_ecampus.config, "latency_ms", 300.0)
+    return limiter
+
+
+def timeouts():
+    return sum(sample[-1] for sample in upstream_timeouts.samples())
+
+
+def fetchWithDeadline(seconds):
+    session = newSession()
+    startDeadline(seconds)
+    session.get(PAGE)
+
+
+def test_sync_requests_cut_off_by_the_deadline(limiter):
+    counted = timeouts()
+    for _ in range(15):
+        with pytest.raises(Timeout):
+            contextvars.Context().run(fetchWithDeadline, 0.05)
+
+    assert limiter.limit == 20
+    assert limiter.in_flight == 0
+    assert timeouts() == counted
+
+
+def test_async_requests_cut_off_by_the_deadline(limiter):
+    async def run():
+        client = newAsyncClient()
+        startDeadline(0.05)
+        results = await asyncio.gather(*(client.get(PAGE) for _ in range(15)), return_exceptions=True)
+        assert all(isinstance(result, DeadlineExceeded) for result in results)
+
+    counted = timeouts()
+    asyncio.run(run())
+
+    assert limiter.limit == 20
+    assert limiter.in_flight == 0
+    assert timeouts() == counted
+
+
+def test_portal_timeouts_still_shrink_the_limit(limiter):
+    #No deadline, the portal itself was too slow
+    counted = timeouts()
+    with pytest.raises(Timeout):
+        newSession().get(PAGE, timeout=0.05)
+
+    assert limiter.limit < 20
+    assert timeouts() == counted + 1
@@ -0,0 +1,83 @@
+"""
+getUserInfo and getUserInfoAsync over the scholarship and profile pages, and the failures
+that must not pass for a student without a name.
+
+    python -m pytest test_user_info.py
+"""
+import asyncio
+
+import pytest
+
+from portal_fixtures import FixtureSession, scholarshipPage, profilePage
+from util.Deadline import DeadlineExceeded
+from util.HomePage import LoggedOutError
+from util.Limiter import UpstreamBusyError
+from util.UserInfo import getUserInfo, getUserInfoAsync, SCHOLARSHIP_PAGE_URL, PROFILE_PAGE_URL
+
+ROLLNO = "22z101"
+LOGIN_PAGE = "<html><body><form><input name='rollno'><input name='password' type='password'></form></body></html>"
+
+
+class FixtureClient(FixtureSession):
+    """Async stand-in that can also fail a page with an exception"""
+
+    def __init__(self, pages, errors=None):
+        super().__init__(pages)
+        self.errors = errors or {}
+        self.requested = []
+
+    async def get(self, url, **kwargs):
+        self.requested.append(url)
+        if url in self.errors:
+            raise self.errors[url]
+        return FixtureSession.get(self, url)
+
+
+def lookups(pages):
+    """The results of both lookups over the same pages"""
+    return [getUserInfo(FixtureSession(pages), ROLLNO), asyncio.run(getUserInfoAsync(FixtureClient(pages), ROLLNO))]
+
+
+def test_name_from_the_scholarship_page():
+    pages = {SCHOLARSHIP_PAGE_URL: scholarshipPage("ASHA R"), PROFILE_PAGE_URL: profilePage("OTHER")}
+    for user_info in lookups(pages):
+        assert user_info["username"] == "ASHA R"
+
+
+def test_name_from_the_profile_page_when_the_scholarship_page_fails():
+    for user_info in lookups({PROFILE_PAGE_URL: profilePage("ASHA R")}):
+        assert user_info["username"] == "ASHA R"
+
+
+def test_roll_number_when_the_pages_read_have_no_name():
+    #The scholarship page was read, so the profile page failing is not an error
+    for user_info in lookups({SCHOLARSHIP_PAGE_URL: "<html><body></body></html>"}):
+        assert user_info == {"username": ROLLNO, "is_birthday": False}
+
+
+def test_every_page_failing_raises():
+    with pytest.raises(RuntimeError):
+        getUserInfo(FixtureSession({}), ROLLNO)
+    with pytest.raises(RuntimeError):
+        asyncio.run(getUserInfoAsync(FixtureClient({}), ROLLNO))
+
+
+def test_logged_out_session_raises():
+    pages = {SCHOLARSHIP_PAGE_URL: LOGIN_PAGE, PROFILE_PAGE_URL: LOGIN_PAGE}
+    with pytest.raises(LoggedOutError):
+        getUserInfo(FixtureSession(pages), ROLLNO)
+    with pytest.raises(LoggedOutError):
+        asyncio.run(getUserInfoAsync(FixtureClient(pages), ROLLNO))
+
+
+@pytest.mark.parametrize("error", [
+    DeadlineExceeded("Request deadline passed during GET /studzone/Scholar/VallalarScholarship"),
+    UpstreamBusyError("timeout", "No upstream slot within 1.0s"),
+])
+def test_deadline_and_busy_upstream_end_the_lookup(error):
+    pages = {SCHOLARSHIP_PAGE_URL: scholarshipPage(), PROFILE_PAGE_URL: profilePage()}
+    client = FixtureClient(pages, errors={SCHOLARSHIP_PAGE_URL: error})
+    with pytest.raises(type(error)):
+        asyncio.run(getUserInfoAsync(client, ROLLNO))
+    #Not retried on the profile page
+    assert client.requested == [SCHOLARSHIP_PAGE_URL]
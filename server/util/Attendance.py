@@ -1,30 +1,58 @@
-from bs4 import BeautifulSoup
-from pandas import DataFrame
+from .ResultTable import ResultTable
+from .Cache import TTLCache
+from .Parser import parseDocument, findAll, findFirst, elementText
+from .Metrics import timedParse
+from .Executors import runParse
+from .ServerTiming import timedCompute
+from .HomePage import checkPortalPage
+import asyncio
+import os
+import uuid
+
+STUDENT_PERCENTAGE_URL = "https://ecampus.psgtech.ac.in/studzone/Attendance/StudentPercentage"
+COURSE_PLAN_URL        = "https://ecampus.psgtech.ac.in/studzone/Attendance/courseplan"
+
+#Course maps only change between semesters, so keep them per student for a long time
+COURSE_MAP_TTL  = int(os.environ.get("COURSE_MAP_TTL", "43200"))
+COURSE_MAP_SIZE = int(os.environ.get("COURSE_MAP_SIZE", "4096"))
+course_map_cache = TTLCache(COURSE_MAP_TTL, COURSE_MAP_SIZE)
 
 def getStudentAttendance(session):
     #Get the student attendance page using the current session
-    student_percentage_url = "https://ecampus.psgtech.ac.in/studzone/Attendance/StudentPercentage"
-    student_percentage_page = session.get(student_percentage_url)
+    student_percentage_page = session.get(STUDENT_PERCENTAGE_URL)
+    checkPortalPage(student_percentage_page)
 
+    #Get the mapping of course code to course name's initials
+    course_map = getCourseNames(session)
+
+    return parseStudentAttendance(student_percentage_page.text, course_map)
+
+async def getStudentAttendanceAsync(client):
+    #Fetch the attendance page and the course names concurrently
+    student_percentage_page, course_map = await asyncio.gather(
+        client.get(STUDENT_PERCENTAGE_URL),
+        getCourseNamesAsync(client),
+    )
+    checkPortalPage(student_percentage_page)
+
+    return await runParse(parseStudentAttendance, student_percentage_page.text, course_map)
+
+@timedParse
+def parseStudentAttendance(html, course_map):
     #Get the html from the student attendance page
-    attendance_soup = BeautifulSoup(student_percentage_page.text,"lxml")
+    attendance_document = parseDocument(html)
 
     #Get the table element from the html
-    attendance_table = attendance_soup.find("table",{"id":"example"}).find("tbody")
+    attendance_table = findFirst(findFirst(attendance_document,"table",{"id":"example"}),"tbody")
 
     #Get the list of table rows
-    table_rows = attendance_table.find_all("tr")
-
-    #Get the mapping of course code to course name's initials
-    course_map = getCourseNames(session)
+    table_rows = findAll(attendance_table,"tr")
 
     #Extract the values and append it to a list of records/rows
     data = []
 
     for row in table_rows:
-        record = []
-        for cell in row.find_all("td"):
-            record.append(cell.text)
+        record = [elementText(cell) for cell in findAll(row,"td")]
         try:
             record[0] = ''.join( [ record[0], '   -   ', course_map[record[0]] ] )
         except KeyError:
@@ -33,40 +61,65 @@ def getStudentAttendance(session):
         
     return data
 
+def courseMapKey(session):
+    #Pooled sessions carry a per-student key, so the map is shared across requests
+    key = getattr(session, "student_key", None)
+    if key is None:
+        #Unpooled sessions still share one course map between their own scrapes
+        key = session.student_key = uuid.uuid4().hex
+    return key
+
+#An empty map would drop every attendance and internals row until it expired, so only
+#maps with courses are cached
 def getCourseNames(session):
-    #Find the course details page url
-    courses_url = "https://ecampus.psgtech.ac.in/studzone/Attendance/courseplan"
+    return course_map_cache.getOrLoad(courseMapKey(session), lambda: fetchCourseNames(session), keep=bool)
+
+async def getCourseNamesAsync(client):
+    return await course_map_cache.getOrLoadAsync(courseMapKey(client), lambda: fetchCourseNamesAsync(client), keep=bool)
 
-    #Get the course details page
-    courses_page = session.get(courses_url)
+def fetchCourseNames(session):
+    #Get the course details page, an error page or the login form must not parse as no courses
+    courses_page = session.get(COURSE_PLAN_URL)
+    checkPortalPage(courses_page)
 
+    return parseCourseNames(courses_page.text)
+
+async def fetchCourseNamesAsync(client):
+    courses_page = await client.get(COURSE_PLAN_URL)
+    checkPortalPage(courses_page)
+
+    return await runParse(parseCourseNames, courses_page.text)
+
+@timedParse
+def parseCourseNames(html):
     #Get the html of the course details page
-    courses_soup = BeautifulSoup(courses_page.text, "lxml")
+    courses_document = parseDocument(html)
 
     #Get the list of div elements containing course details of each course
-    courses = courses_soup.find_all("div",{"class":"col-md-8"})
+    courses = findAll(courses_document,"div",{"class":"col-md-8"})
 
     #Create an empty dictionary
     course_map = {}
 
     #Iterate through the list of divs to get the contents
     for course in courses:
-        course_code = course.find("h5")
-        course_name = course.find("h6")
+        course_code = elementText(findFirst(course,"h5"))
+        course_name = elementText(findFirst(course,"h6"))
 
         #Initialize an empty list
         course_initials = []
-        for words in course_name.text.split():
+        for words in course_name.split():
             #Check for special characters
-            if ord(words[0]) in list(range(65,91)):
+            if "A" <= words[0] <= "Z":
                 #Append the first letter of each word in course name
                 course_initials.append(words[0])
 
         #Convert the list of initials to string and map it to the course code
-        course_map[course_code.text] = ''.join(course_initials)
+        course_map[course_code] = ''.join(course_initials)
 
     return course_map
 
+@timedCompute
 def getAffordableLeaves(data,custom_percentage):
     #Declare an empty result table
     result = []
@@ -88,29 +141,72 @@ def getAffordableLeaves(data,custom_percentage):
         row.append(custom_leaves)
         result.append(row)
 
-    #Create a dataframe from the result list with headers
+    #Create a result table from the result list with headers
     result_header = ["Course Code", "Attendance", f"Bunks"]
-    df = DataFrame(result,columns=result_header)
+    table = ResultTable(result,columns=result_header)
 
-    return df
+    return table
     
 
 def calculateLeaves(classes_present , classes_total , maintenance_percentage):
-    #Initialize leaves with 0
-    affordable_leaves = 0
-    #Let i represent the ith class from last updated date
-    i=1
-
+    """
+    Number of classes that can be skipped (positive) or must be attended in a row
+    (negative) to stay at or above maintenance_percentage. Solved in closed form,
+    the result is then settled with the same float comparisons a class-by-class
+    simulation would make, so edge cases round exactly as before.
+    """
     #First check whether or not current attendance meets maintenance and then proceed
     if float(classes_present/classes_total)*100 < maintenance_percentage:
-        #Simulate attendance after attending i classes while also checking if attendance met at each i
-        while float((classes_present + i)/(classes_total + i))*100 <= maintenance_percentage:
-            affordable_leaves -=1 #negative leaves denote number of unskippable classes to meet maintenance
-            i+=1
+        #Attending i more classes still leaves attendance at or below maintenance
+        def below(i):
+            return float((classes_present + i)/(classes_total + i))*100 <= maintenance_percentage
+
+        if maintenance_percentage >= 100:
+            raise ValueError(f"{maintenance_percentage}% attendance can never be reached")
+
+        #Largest i with (present + i) * 100 <= p * (total + i)
+        estimate = (maintenance_percentage*classes_total - 100*classes_present) // (100 - maintenance_percentage)
+        unskippable = settleCount(int(max(estimate, 0)), below)
+
+        #negative leaves denote number of unskippable classes to meet maintenance
+        return -unskippable
+
     #Else block is run if maintenance is met
     else:
-        while float(classes_present/(classes_total + i))*100 >= maintenance_percentage:
-            affordable_leaves +=1
-            i+=1
-
-    return affordable_leaves
\ No newline at end of file
+        #Skipping i classes keeps attendance at or above maintenance
+        def above(i):
+            return float(classes_present/(classes_total + i))*100 >= maintenance_percentage
+
+        if maintenance_percentage <= 0:
+            raise ValueError(f"{maintenance_percentage}% attendance is met after any number of leaves")
+
+        #Largest i with present * 100 >= p * (total + i)
+        estimate = (100*classes_present - maintenance_percentage*classes_total) // maintenance_percentage
+        return settleCount(int(max(estimate, 0)), above)
+
+
+def settleCount(count, holds):
+    """
+    Move count to the last i for which holds(1..i) is true, starting from an
+    estimate that may be off by a little because of float rounding
+    """
+    while holds(count + 1):
+        count += 1
+    while count > 0 and not holds(count):
+        count -= 1
+    return count
+
+
+def calculateLeavesGrid(classes_present, classes_total, targets):
+    """calculateLeaves for every target percentage, None where a target can never be reached"""
+    #Nothing can be said about a course that has not held any classes yet
+    if classes_total <= 0:
+        return [None] * len(targets)
+
+    grid = []
+    for target in targets:
+        try:
+            grid.append(calculateLeaves(classes_present, classes_total, target))
+        except ValueError:
+            grid.append(None)
+    return grid
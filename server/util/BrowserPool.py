@@ -0,0 +1,232 @@
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from fastapi import HTTPException
+
+logger = logging.getLogger("nimora-feedback")
+
+# Headless Chrome is expensive to start and heavy to run, so feedback jobs borrow
+# long-lived browsers from a bounded pool. Each job gets a fresh browser context
+# (its own cookies and storage), and browsers are replaced after a number of jobs
+# or once their process tree grows past a memory limit.
+
+FEEDBACK_BROWSER_POOL_SIZE       = int(os.environ.get("FEEDBACK_BROWSER_POOL_SIZE", "2"))
+FEEDBACK_BROWSER_MAX_JOBS        = int(os.environ.get("FEEDBACK_BROWSER_MAX_JOBS", "25"))
+FEEDBACK_BROWSER_MAX_RSS_MB      = int(os.environ.get("FEEDBACK_BROWSER_MAX_RSS_MB", "700"))
+FEEDBACK_BROWSER_ACQUIRE_TIMEOUT = float(os.environ.get("FEEDBACK_BROWSER_ACQUIRE_TIMEOUT", "120"))
+
+
+class PooledBrowser:
+    __slots__ = ("driver", "jobs", "home_handle")
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.jobs = 0
+        #The window the browser started with, kept open so the browser outlives job contexts
+        self.home_handle = driver.current_window_handle
+
+
+class BrowserPool:
+    """
+    Bounded pool of headless browsers. At most size jobs run at once, later
+    ones wait up to acquire_timeout seconds for a browser to free up.
+    """
+
+    def __init__(self, launch, size=FEEDBACK_BROWSER_POOL_SIZE, max_jobs=FEEDBACK_BROWSER_MAX_JOBS,
+                 max_rss_mb=FEEDBACK_BROWSER_MAX_RSS_MB, acquire_timeout=FEEDBACK_BROWSER_ACQUIRE_TIMEOUT):
+        self.launch = launch
+        self.size = size
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self.acquire_timeout = acquire_timeout
+        self._idle = []
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._busy = 0
+        self._launched = 0
+        self._recycled = 0
+
+    @contextmanager
+    def session(self):
+        """Borrow a browser switched to a fresh, isolated context for one job"""
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise HTTPException(status_code=503, detail="All feedback browsers are busy. Please try again shortly.")
+
+        with self._lock:
+            self._busy += 1
+
+        browser = None
+        try:
+            browser = self._checkout()
+            context = openContext(browser.driver)
+            try:
+                yield browser.driver
+            finally:
+                closeContext(browser.driver, context, browser.home_handle)
+        except BaseException:
+            #A browser that failed mid-job is only kept if it still answers
+            if browser is not None and not isResponsive(browser.driver):
+                self._discard(browser)
+                browser = None
+            raise
+        finally:
+            if browser is not None:
+                self._checkin(browser)
+            with self._lock:
+                self._busy -= 1
+            self._slots.release()
+
+    def _checkout(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+
+        browser = PooledBrowser(self.launch())
+        with self._lock:
+            self._launched += 1
+        return browser
+
+    def _checkin(self, browser):
+        browser.jobs += 1
+        if browser.jobs >= self.max_jobs:
+            logger.info(f"Recycling feedback browser after {browser.jobs} jobs")
+            self._discard(browser)
+            return
+
+        rss_mb = processTreeRssMb(driverPid(browser.driver))
+        if rss_mb is not None and rss_mb > self.max_rss_mb:
+            logger.info(f"Recycling feedback browser using {rss_mb:.0f}MB")
+            self._discard(browser)
+            return
+
+        with self._lock:
+            self._idle.append(browser)
+
+    def _discard(self, browser):
+        with self._lock:
+            self._recycled += 1
+        quitDriver(browser.driver)
+
+    def prewarm(self, count=None):
+        """Launch browsers ahead of the first job, up to the pool size"""
+        count = self.size if count is None else min(count, self.size)
+        with self._lock:
+            missing = count - len(self._idle) - self._busy
+        for _ in range(missing):
+            try:
+                browser = PooledBrowser(self.launch())
+            except Exception as e:
+                logger.warning(f"Could not pre-launch feedback browser: {e}")
+                return
+            with self._lock:
+                self._launched += 1
+                self._idle.append(browser)
+        logger.info(f"Pre-launched {max(missing, 0)} feedback browsers")
+
+    def shutdown(self):
+        """Quit every idle browser, busy ones are quit when their jobs return them"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self.max_jobs = 0
+        for browser in idle:
+            quitDriver(browser.driver)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size"     : self.size,
+                "idle"     : len(self._idle),
+                "busy"     : self._busy,
+                "launched" : self._launched,
+                "recycled" : self._recycled,
+            }
+
+
+def openContext(driver):
+    """Open a tab in a new incognito-like browser context and switch to it"""
+    try:
+        context = driver.execute_cdp_cmd("Target.createBrowserContext", {"disposeOnDetach": False})["browserContextId"]
+        target = driver.execute_cdp_cmd("Target.createTarget", {"url": "about:blank", "browserContextId": context})["targetId"]
+        #chromedriver uses the target id as the window handle
+        driver.switch_to.window(target)
+        return context
+    except Exception as e:
+        #Fall back to the shared context, closeContext then wipes its cookies and storage
+        logger.warning(f"Could not open an isolated browser context: {e}")
+        return None
+
+
+def closeContext(driver, context, home_handle):
+    try:
+        if context is None:
+            driver.execute_script("window.localStorage && localStorage.clear(); window.sessionStorage && sessionStorage.clear();")
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            driver.get("about:blank")
+            return
+
+        for handle in driver.window_handles:
+            if handle != home_handle:
+                driver.switch_to.window(handle)
+                driver.close()
+        driver.switch_to.window(home_handle)
+        driver.execute_cdp_cmd("Target.disposeBrowserContext", {"browserContextId": context})
+    except Exception as e:
+        logger.warning(f"Could not clean up browser context: {e}")
+
+
+def isResponsive(driver):
+    try:
+        driver.window_handles
+        return True
+    except Exception:
+        return False
+
+
+def quitDriver(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+def driverPid(driver):
+    try:
+        return driver.service.process.pid
+    except AttributeError:
+        return None
+
+
+def processTreeRssMb(pid):
+    """Resident memory of pid and all its descendants in MB, None where /proc is unavailable"""
+    if pid is None or not os.path.isdir("/proc"):
+        return None
+
+    #Map every process to its children from /proc/<pid>/stat
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as stat:
+                #The command name may contain spaces, the parent pid follows the closing bracket
+                ppid = int(stat.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    total_kb = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        pending.extend(children.get(current, []))
+        try:
+            with open(f"/proc/{current}/status") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+        except (OSError, ValueError):
+            continue
+
+    return total_kb / 1024
@@ -0,0 +1,271 @@
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from .Deadline import DeadlineExceeded, checkDeadline, current_deadline
+
+logger = logging.getLogger("nimora-api")
+
+
+class AsyncSingleFlight:
+    """
+    Collapse concurrent calls for the same key into one awaited call. The call runs in a
+    task of its own, so no single caller's cancellation decides the result for the others,
+    under the latest deadline of the callers waiting on it: each one joining with a later
+    deadline (or none) extends it. Every caller waits for it until its own deadline.
+    """
+
+    def __init__(self):
+        self._calls = {}
+
+    def inFlight(self, key):
+        return key in self._calls
+
+    def _start(self, key, fn):
+        flight = _AsyncFlight(contextvars.copy_context(), current_deadline.get())
+        flight.task = asyncio.get_running_loop().create_task(fn(), context=flight.context)
+        self._calls[key] = flight
+
+        def finished(task):
+            if self._calls.get(key) is flight:
+                del self._calls[key]
+            #Mark the exception as retrieved when every caller had already gone
+            if not task.cancelled():
+                task.exception()
+
+        flight.task.add_done_callback(finished)
+        return flight
+
+    async def do(self, key, fn):
+        while True:
+            remaining = checkDeadline("a shared call")
+            flight = self._calls.get(key)
+            if flight is None:
+                flight = self._start(key, fn)
+            else:
+                flight.extend(current_deadline.get())
+            task = flight.task
+            try:
+                #Shield so one cancelled or timed out caller does not cancel the shared call
+                if remaining is None:
+                    return await asyncio.shield(task)
+                return await asyncio.wait_for(asyncio.shield(task), remaining)
+            except asyncio.CancelledError:
+                #The shared call itself was cancelled, not this caller, so start another
+                if task.cancelled() and not asyncio.current_task().cancelling():
+                    continue
+                raise
+            except TimeoutError:
+                if not task.done():
+                    raise DeadlineExceeded("Request deadline passed waiting on a shared call") from None
+                #A step started before the deadline was extended still ran out of the earlier
+                #one, so try again if this caller has time left (checked at the top)
+                if isinstance(task.exception(), DeadlineExceeded):
+                    continue
+                raise
+
+
+class _AsyncFlight:
+    __slots__ = ("context", "deadline", "task")
+
+    def __init__(self, context, deadline):
+        self.context = context
+        self.deadline = deadline
+        self.task = None
+
+    def extend(self, deadline):
+        """Hold the call to deadline if it is later, None being no deadline at all"""
+        if self.deadline is None or (deadline is not None and deadline <= self.deadline):
+            return
+        self.deadline = deadline
+        #The task only enters its context while it runs, never while another task does
+        self.context.run(current_deadline.set, deadline)
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire ttl seconds after they were stored.
+    Loads through getOrLoad/getOrLoadAsync are single-flight: concurrent callers
+    asking for the same missing key wait on one loader call instead of each
+    running their own. A loaded value that keep(value) rejects is handed to
+    every waiter but not stored, and neither is a failed load.
+    """
+
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = {}
+        self._loading_async = AsyncSingleFlight()
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, stored = entry
+            if now - stored > self.ttl:
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+
+            #Evict the least recently used entries beyond the size bound
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def getOrLoad(self, key, loader, keep=None):
+        """Return the cached value, or call loader() once for all threads waiting on key"""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._lock:
+            flight = self._loading.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._loading[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+            if keep is None or keep(flight.value):
+                self.set(key, flight.value)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._loading.pop(key, None)
+            flight.done.set()
+
+    async def getOrLoadAsync(self, key, loader, keep=None):
+        """Return the cached value, or await loader() once for all tasks waiting on key"""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        async def load():
+            value = await loader()
+            if keep is None or keep(value):
+                self.set(key, value)
+            return value
+
+        return await self._loading_async.do(key, load)
+
+
+class StaleWhileRevalidateCache:
+    """
+    LRU cache for values that may be served stale while they are refreshed.
+    A value younger than its fresh_for is returned as is. One that is older but
+    still within max_stale is returned immediately, and a single background
+    refresh is started for it. Anything older is loaded before returning.
+    Failed loads are never cached.
+    """
+
+    def __init__(self, max_size, max_stale):
+        self.max_size = max_size
+        self.max_stale = max_stale
+        self._entries = OrderedDict()
+        self._flights = AsyncSingleFlight()
+        self._refreshes = set()
+
+    def _age(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        return time.monotonic() - entry[1]
+
+    def isUsable(self, key, fresh_for):
+        """Whether get() could answer key without waiting on a load"""
+        age = self._age(key)
+        return age is not None and age <= fresh_for + self.max_stale
+
+    def _store(self, key, value):
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+
+        #Evict the least recently used entries beyond the size bound
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def _load(self, key, loader):
+        async def load():
+            value = await loader()
+            self._store(key, value)
+            return value
+
+        return await self._flights.do(key, load)
+
+    async def _refresh(self, key, loader):
+        try:
+            await self._load(key, loader)
+        except Exception as e:
+            logger.warning(f"Background refresh failed, keeping stale value: {e}")
+
+    async def get(self, key, loader, fresh_for, refresh=False):
+        """Return the value for key, loading it with loader() when needed"""
+        age = self._age(key)
+
+        if refresh or age is None or age > fresh_for + self.max_stale:
+            return await self._load(key, loader)
+
+        value = self._entries[key][0]
+        self._entries.move_to_end(key)
+
+        #Serve the stale value now and revalidate it once in the background, in a context of
+        #its own so it is not held to the deadline or timings of the request that started it
+        if age > fresh_for and not self._flights.inFlight(key):
+            task = asyncio.create_task(self._refresh(key, loader), context=contextvars.Context())
+            self._refreshes.add(task)
+            task.add_done_callback(self._refreshes.discard)
+
+        return value
+
+    def invalidate(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class _Flight:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+_MISSING = object()
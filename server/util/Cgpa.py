@@ -1,29 +1,37 @@
-from bs4 import BeautifulSoup
-from pandas import DataFrame
+from .ResultTable import ResultTable
 from fastapi import HTTPException
+from .Parser import parseDocument, findFirst, tableRows
+from .Metrics import timedParse
+from .Executors import runParse
+from .ServerTiming import timedCompute
+from .HomePage import checkPortalPage
+
+COURSES_PAGE_URL = "https://ecampus.psgtech.ac.in/studzone2/AttWfStudCourseSelection.aspx"
+RESULTS_PAGE_URL = "https://ecampus.psgtech.ac.in/studzone2/FrmEpsStudResult.aspx"
 
 def getStudentCourses(session):
     #Get the courses page using the current session
-    courses_page_url = "https://ecampus.psgtech.ac.in/studzone2/AttWfStudCourseSelection.aspx"
-    courses_page = session.get(courses_page_url)
+    courses_page = session.get(COURSES_PAGE_URL)
+    checkPortalPage(courses_page, "studzone2")
+
+    return parseStudentCourses(courses_page.text)
+
+async def getStudentCoursesAsync(client):
+    courses_page = await client.get(COURSES_PAGE_URL)
+    checkPortalPage(courses_page, "studzone2")
 
+    return await runParse(parseStudentCourses, courses_page.text)
+
+@timedParse
+def parseStudentCourses(html):
     #Get the html from the courses page
-    courses_soup = BeautifulSoup(courses_page.text, "lxml")
+    courses_document = parseDocument(html)
 
     #Get the completed courses table element
-    completed_courses_table = courses_soup.find("table",{"id":"PDGCourse"})
+    completed_courses_table = findFirst(courses_document,"table",{"id":"PDGCourse"})
 
-    #Get the table rows
-    completed_table_rows = completed_courses_table.find_all("tr")
-    
-    #Extract the records and values and store in list of lists
-    data = []
-
-    for row in completed_table_rows:
-        record=[]
-        for cell in row.find_all("td"):
-            record.append(cell.text)
-        data.append(record)
+    #Extract the records and values of each table row and store in list of lists
+    data = tableRows(completed_courses_table)
     
     #Map the letter grades to their corresponding numeric values:
     letter_grade = {
@@ -47,20 +55,23 @@ def getStudentCourses(session):
 
 
 def getCompletedSemester(session):
-    results_page_url = "https://ecampus.psgtech.ac.in/studzone2/FrmEpsStudResult.aspx"
-    results_page     = session.get(results_page_url)
-    
-    results_page_soup = BeautifulSoup(results_page.text, "lxml")
-    results_table = results_page_soup.find("table",{"id":"DgResult"})
-    
-    rows = results_table.find_all("tr")
+    results_page = session.get(RESULTS_PAGE_URL)
+    checkPortalPage(results_page, "studzone2")
+
+    return parseCompletedSemester(results_page.text)
+
+async def getCompletedSemesterAsync(client):
+    results_page = await client.get(RESULTS_PAGE_URL)
+    checkPortalPage(results_page, "studzone2")
+
+    return await runParse(parseCompletedSemester, results_page.text)
+
+@timedParse
+def parseCompletedSemester(html):
+    results_page_document = parseDocument(html)
+    results_table = findFirst(results_page_document,"table",{"id":"DgResult"})
     
-    data = []
-    for row in rows:
-        record = []
-        for cell in row.find_all("td"):
-            record.append(cell.text)
-        data.append(record)
+    data = tableRows(results_table)
     
     #Returns the least semester with RA or next semester if none
     for record in data[1:]:
@@ -72,17 +83,19 @@ def getCompletedSemester(session):
     return sem_index+1
 
 
+@timedCompute
 def getCGPA(data, completed_semester):
-    from pandas import DataFrame
-
     #Get the most recent semester for iterating
     most_recent_semester = data[1][4]
 
-    #Create a dataframe with required columns
-    data[0][4]="COURSE_SEM"
-    df = DataFrame(data[1:],columns=data[0])
-    required_columns = ["COURSE_SEM","GRADE","CREDITS"]
-    df = df[required_columns]
+    #Keep only the required columns of each course as (semester, grade, credits)
+    #Rename the semester column on a copy, data may be a scrape shared with other requests
+    header = list(data[0])
+    header[4]="COURSE_SEM"
+    sem_index     = header.index("COURSE_SEM")
+    grade_index   = header.index("GRADE")
+    credits_index = header.index("CREDITS")
+    records = [(row[sem_index], row[grade_index], row[credits_index]) for row in data[1:]]
 
     #Declare an empty result table with header
     result_headers = ["SEMESTER","GPA","CGPA"]
@@ -96,14 +109,14 @@ def getCGPA(data, completed_semester):
     backlogs = False
     for semester in range(1,most_recent_semester+1): #index from 1st to most recent semester
         if not backlogs:
-            courses = df.loc[df["COURSE_SEM"] == semester] #get all courses of particular semester
+            courses = [record for record in records if record[0] == semester] #get all courses of particular semester
             if semester >= completed_semester: #check for backlogs in particular semester
                 backlogs = True
                 record = [semester , "-", "-"]
                 result.append(record)
             else:
-                semester_product = sum(courses["GRADE"] * courses["CREDITS"])
-                semester_credits = sum(courses["CREDITS"])
+                semester_product = sum(grade * credits for _, grade, credits in courses)
+                semester_credits = sum(credits for _, _, credits in courses)
 
                 overall_product += semester_product
                 overall_credits += semester_credits
@@ -120,6 +133,6 @@ def getCGPA(data, completed_semester):
             record = [semester , "-", "-"]
             result.append(record)
     
-    result = DataFrame(result, columns=result_headers)
+    result = ResultTable(result, columns=result_headers)
 
     return result
@@ -0,0 +1,34 @@
+import contextvars
+import time
+
+# Request deadlines. app.py gives every request one; logins, upstream fetches and parses
+# started after it has passed fail with DeadlineExceeded, and fetches still waiting on
+# the portal are cut off when it passes. Work without a deadline is never limited.
+
+#time.monotonic() by which the current request must be done, None for no deadline
+current_deadline = contextvars.ContextVar("current_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's deadline passed before a step could finish"""
+
+
+def startDeadline(seconds):
+    """Give the rest of the current request (and tasks it starts) seconds to finish"""
+    current_deadline.set(time.monotonic() + seconds)
+
+
+def timeRemaining():
+    """Seconds left before the deadline, None without one"""
+    deadline = current_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def checkDeadline(step):
+    """Raise DeadlineExceeded if the deadline passed before step, otherwise return timeRemaining()"""
+    remaining = timeRemaining()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded(f"Request deadline passed before {step}")
+    return remaining
@@ -0,0 +1,99 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .Metrics import Histogram, PARSE_BUCKETS, LATENCY_BUCKETS
+from .ServerTiming import recordPhase
+
+# A thread pool per kind of work, so a burst of blocking portal calls can never hold up
+# parsing for requests whose pages have already arrived, and neither waits behind
+# AnyIO's shared pool. Async scrapers parse large pages on the cpu executor; blocking
+# calls (sync sessions, browser start-up) go to the io executor.
+
+IO_EXECUTOR_WORKERS  = int(os.environ.get("IO_EXECUTOR_WORKERS", "32"))
+CPU_EXECUTOR_WORKERS = int(os.environ.get("CPU_EXECUTOR_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+#Pages smaller than this parse in a few milliseconds, not worth contending with the event loop for the GIL
+CPU_PARSE_INLINE_BYTES = int(os.environ.get("CPU_PARSE_INLINE_BYTES", "16384"))
+
+executor_queue_seconds = Histogram(
+    "nimora_executor_queue_seconds", "Time work waited for a worker of each executor", ("pool",),
+    buckets=PARSE_BUCKETS + LATENCY_BUCKETS[-6:])
+
+
+class InstrumentedExecutor(ThreadPoolExecutor):
+    """
+    ThreadPoolExecutor that counts busy workers and queued work and times each wait for a
+    worker. Work runs in a copy of the submitter's context, like asyncio.to_thread, so the
+    request deadline and timings follow it onto the worker.
+    """
+
+    def __init__(self, name, workers):
+        super().__init__(max_workers=workers, thread_name_prefix=name)
+        self.name = name
+        self.workers = workers
+        self.busy = 0
+        self.queued = 0
+        self._counts = threading.Lock()
+
+    def submit(self, function, *args, **kwargs):
+        context = contextvars.copy_context()
+        submitted = time.perf_counter()
+        with self._counts:
+            self.queued += 1
+
+        future = super().submit(context.run, self._work, submitted, function, args, kwargs)
+        future.add_done_callback(self._dropped)
+        return future
+
+    def _work(self, submitted, function, args, kwargs):
+        waited = time.perf_counter() - submitted
+        with self._counts:
+            self.queued -= 1
+            self.busy += 1
+        executor_queue_seconds.observe(waited, pool=self.name)
+        if waited >= 0.001:
+            recordPhase("wait", f"{self.name} executor", waited)
+
+        try:
+            return function(*args, **kwargs)
+        finally:
+            with self._counts:
+                self.busy -= 1
+
+    def _dropped(self, future):
+        #Work cancelled before a worker picked it up never reaches _work
+        if future.cancelled():
+            with self._counts:
+                self.queued -= 1
+
+    async def run(self, function, *args):
+        """Await function(*args) on this executor"""
+        return await asyncio.wrap_future(self.submit(function, *args))
+
+    def stats(self):
+        with self._counts:
+            return {"busy": self.busy, "queued": self.queued, "limit": self.workers}
+
+
+io_executor  = InstrumentedExecutor("io", IO_EXECUTOR_WORKERS)
+cpu_executor = InstrumentedExecutor("cpu", CPU_EXECUTOR_WORKERS)
+
+
+async def runParse(parse, html, *args):
+    """Await parse(html, *args) on the cpu executor, keeping the event loop free for I/O. Small pages parse inline."""
+    if len(html) < CPU_PARSE_INLINE_BYTES:
+        return parse(html, *args)
+    return await cpu_executor.run(parse, html, *args)
+
+
+async def runBlocking(function, *args):
+    """Await blocking I/O on the io executor"""
+    return await io_executor.run(function, *args)
+
+
+def executorStats():
+    return {executor.name: executor.stats() for executor in (io_executor, cpu_executor)}
@@ -3,18 +3,136 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import StaleElementReferenceException
+from selenium.common.exceptions import StaleElementReferenceException, WebDriverException
 from webdriver_manager.chrome import ChromeDriverManager
 from random import randint
 from fastapi import HTTPException
+from .BrowserPool import BrowserPool
 import logging
 import os
+import shutil
+import threading
 
 logger = logging.getLogger("nimora-feedback")
 
 # Check if feedback feature is disabled
 FEEDBACK_DISABLED = os.environ.get("DISABLE_FEEDBACK", "false").lower() == "true"
 
+# Fill each form with one injected script instead of a WebDriver call per answer
+FEEDBACK_SCRIPTED_FORMS = os.environ.get("FEEDBACK_SCRIPTED_FORMS", "true").lower() == "true"
+
+# Clicks the first option of every intermediate question and moves the carousel on,
+# waiting for each question to render like WebDriverWait did. Calls back with the
+# number of questions whose answer is checked.
+INTERMEDIATE_FILL_SCRIPT = """
+const questions = arguments[0];
+const timeout = arguments[1];
+const done = arguments[arguments.length - 1];
+const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+
+async function waitFor(selector) {
+    const deadline = Date.now() + timeout;
+    while (Date.now() < deadline) {
+        const element = document.querySelector(selector);
+        if (element) return element;
+        await sleep(50);
+    }
+    return null;
+}
+
+function slid(button) {
+    const carousel = button.closest('.carousel');
+    return new Promise(resolve => {
+        const timer = setTimeout(resolve, 1000);
+        if (carousel) carousel.addEventListener('slid.bs.carousel', () => { clearTimeout(timer); resolve(); }, {once: true});
+    });
+}
+
+let filled = 0;
+(async () => {
+    for (let question = 1; question <= questions; question++) {
+        const label = await waitFor(`label[for='radio-${question}-1']`);
+        if (!label) break;
+        label.click();
+        const input = document.getElementById(`radio-${question}-1`);
+        if (!input || input.checked) filled++;
+
+        const next = document.querySelector("button[class='carousel-control-next']");
+        if (next) {
+            const moved = slid(next);
+            next.click();
+            await moved;
+        }
+    }
+    done(filled);
+})().catch(() => done(filled));
+"""
+
+# Picks one of the first two stars in every row of the end semester table and
+# returns the number of rows whose rating is checked.
+ENDSEM_FILL_SCRIPT = """
+let filled = 0;
+document.querySelectorAll("#feedbackTableBody > tr").forEach(row => {
+    const labels = row.querySelectorAll("td.rating-cell > div.star-rating > label");
+    if (!labels.length) return;
+    const label = labels[Math.floor(Math.random() * Math.min(2, labels.length))];
+    label.scrollIntoView();
+    label.click();
+    const input = label.htmlFor ? document.getElementById(label.htmlFor) : null;
+    if (!input || input.checked) filled++;
+});
+return filled;
+"""
+
+# Chrome and ChromeDriver locations, resolved once per process instead of per job
+CHROME_BINARY = "/usr/bin/google-chrome" if os.path.exists("/usr/bin/google-chrome") else None
+driver_path = None
+driver_path_lock = threading.Lock()
+
+
+def resolve_driver_path():
+    """Find a ChromeDriver binary, downloading one only if the system has none"""
+    global driver_path
+    if driver_path:
+        return driver_path
+
+    with driver_path_lock:
+        if driver_path:
+            return driver_path
+
+        # First, try to use system-installed ChromeDriver
+        path = shutil.which("chromedriver")
+
+        if not path:
+            try:
+                # Second, try WebDriver Manager with /tmp as cache (common in serverless)
+                if os.path.exists("/tmp"):
+                    from webdriver_manager.core.os_manager import ChromeType
+                    from webdriver_manager.core.download_manager import WDMDownloadManager
+
+                    manager = ChromeDriverManager(
+                        download_manager=WDMDownloadManager(cache_directory="/tmp"),
+                        chrome_type=ChromeType.GOOGLE
+                    )
+                    path = manager.install()
+            except Exception as e:
+                logger.warning(f"WebDriver Manager with custom cache failed: {e}")
+
+        if not path:
+            try:
+                # Third, try WebDriver Manager with default settings (may work in some environments)
+                path = ChromeDriverManager().install()
+            except Exception as e:
+                logger.error(f"All ChromeDriver installation methods failed: {e}")
+                raise HTTPException(
+                    status_code=500, 
+                    detail="ChromeDriver setup failed. This feature requires a compatible server environment with ChromeDriver support."
+                )
+
+        logger.info(f"Using ChromeDriver at {path}")
+        driver_path = path
+        return driver_path
+
 
 def create_driver():
     """Set up and create a Chrome WebDriver instance"""
@@ -43,57 +161,32 @@ def create_driver():
     options.add_argument("--user-agent=Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36")
     
     # Set binary location if available
-    options.binary_location = "/usr/bin/google-chrome" if os.path.exists("/usr/bin/google-chrome") else None
-    
-    # Try different approaches for ChromeDriver in serverless environment
-    try:
-        # First, try to use system-installed ChromeDriver
-        import shutil
-        chromedriver_path = shutil.which("chromedriver")
-        if chromedriver_path:
-            service = Service(chromedriver_path)
-            driver = webdriver.Chrome(service=service, options=options)
-            return driver
-    except Exception as e:
-        logger.warning(f"System ChromeDriver failed: {e}")
-    
-    try:
-        # Second, try WebDriver Manager with custom path if possible
-        import tempfile
-        import os
-        
-        # Try to use /tmp directory if available (common in serverless)
-        cache_dir = "/tmp" if os.path.exists("/tmp") else None
-        
-        if cache_dir:
-            from webdriver_manager.core.os_manager import ChromeType
-            from webdriver_manager.core.download_manager import WDMDownloadManager
-            
-            # Configure WebDriver Manager to use /tmp
-            manager = ChromeDriverManager(
-                download_manager=WDMDownloadManager(cache_directory=cache_dir),
-                chrome_type=ChromeType.GOOGLE
-            )
-            service = Service(manager.install())
-            driver = webdriver.Chrome(service=service, options=options)
-            return driver
-    except Exception as e:
-        logger.warning(f"WebDriver Manager with custom cache failed: {e}")
+    options.binary_location = CHROME_BINARY
     
     try:
-        # Third, try WebDriver Manager with default settings (may work in some environments)
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
-        return driver
+        service = Service(resolve_driver_path())
+        return webdriver.Chrome(service=service, options=options)
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"All ChromeDriver installation methods failed: {e}")
+        logger.error(f"Could not start Chrome: {e}")
         raise HTTPException(
             status_code=500, 
             detail="ChromeDriver setup failed. This feature requires a compatible server environment with ChromeDriver support."
         )
 
 
-def intermediate_feedback(browser):
+# Browsers shared by all feedback jobs, launched on first use
+browser_pool = BrowserPool(create_driver)
+
+
+def report(progress, stage, done=None, total=None):
+    """Pass job progress to the caller's callback, if there is one"""
+    if progress is not None:
+        progress(stage, done, total)
+
+
+def intermediate_feedback(browser, progress=None):
     """Process intermediate feedback form"""
     # Get the courses
     courses = browser.find_elements(By.CLASS_NAME, "intermediate-body")
@@ -106,31 +199,69 @@ def intermediate_feedback(browser):
     
     # Iterate through the courses
     for course in range(len(courses)):
+        report(progress, "filling", course, len(courses))
         courses = browser.find_elements(By.CLASS_NAME, "intermediate-body")
         browser.execute_script("arguments[0].scrollIntoView(); arguments[0].click();", courses[course])
         
         questions = browser.find_element(By.CSS_SELECTOR, "div.bottom-0").text
         questions = int(questions.split()[-1])
         
-        clicks = 0
-        while clicks < questions:
-            try:
-                radio_button = wait.until(EC.element_to_be_clickable((By.XPATH, f"//label[@for='radio-{clicks+1}-1']")))
-                browser.execute_script("arguments[0].click();", radio_button)
-                clicks += 1
-                next_btn = wait.until(EC.element_to_be_clickable((By.XPATH, "//button[@class='carousel-control-next']")))
-                browser.execute_script("arguments[0].click();", next_btn)
-            except StaleElementReferenceException:
-                continue
+        if not FEEDBACK_SCRIPTED_FORMS or not fill_intermediate_scripted(browser, questions):
+            fill_intermediate_clicks(browser, wait, questions)
             
         back = browser.find_element(By.CLASS_NAME, "overlay")
         browser.execute_script("arguments[0].click();", back)
     
-    browser.quit()
+    report(progress, "submitted", len(courses), len(courses))
     return {"status": "success", "message": "Intermediate feedback completed"}
 
 
-def endsem_feedback(browser):
+def fill_intermediate_clicks(browser, wait, questions):
+    """Answer the open course's questions one WebDriver click at a time"""
+    clicks = 0
+    while clicks < questions:
+        try:
+            radio_button = wait.until(EC.element_to_be_clickable((By.XPATH, f"//label[@for='radio-{clicks+1}-1']")))
+            browser.execute_script("arguments[0].click();", radio_button)
+            clicks += 1
+            next_btn = wait.until(EC.element_to_be_clickable((By.XPATH, "//button[@class='carousel-control-next']")))
+            browser.execute_script("arguments[0].click();", next_btn)
+        except StaleElementReferenceException:
+            continue
+
+
+def fill_intermediate_scripted(browser, questions):
+    """Answer the open course's questions in one script call, False if nothing could be filled"""
+    try:
+        #Each question may wait up to 10 seconds to render plus a second for the carousel
+        browser.set_script_timeout(questions * 11 + 5)
+        filled = browser.execute_async_script(INTERMEDIATE_FILL_SCRIPT, questions, 10000)
+    except WebDriverException as e:
+        logger.warning(f"Scripted intermediate feedback failed, clicking instead: {e}")
+        return False
+
+    if filled == 0:
+        return False
+    if filled != questions:
+        raise HTTPException(status_code=500, detail=f"Intermediate feedback filled {filled} of {questions} questions")
+    return True
+
+
+def fill_endsem_scripted(browser, questions):
+    """Rate every row of the open staff table in one script call, False if the counts disagree"""
+    try:
+        filled = browser.execute_script(ENDSEM_FILL_SCRIPT)
+    except WebDriverException as e:
+        logger.warning(f"Scripted end semester feedback failed, clicking instead: {e}")
+        return False
+
+    if filled != questions:
+        logger.warning(f"Scripted end semester feedback rated {filled} of {questions} rows, clicking instead")
+        return False
+    return True
+
+
+def endsem_feedback(browser, progress=None):
     """Process end-semester feedback form"""
     wait = WebDriverWait(browser, 10)
     try:
@@ -141,6 +272,7 @@ def endsem_feedback(browser):
     staff_list = browser.find_elements(By.CSS_SELECTOR, "div.staff-item")
     
     for staff in range(len(staff_list)):
+        report(progress, "filling", staff, len(staff_list))
         wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "div.staff-item")))
         staff_list = browser.find_elements(By.CSS_SELECTOR, "div.staff-item")
         browser.execute_script("arguments[0].scrollIntoView();arguments[0].click()", staff_list[staff])
@@ -149,23 +281,24 @@ def endsem_feedback(browser):
         wait.until(EC.element_to_be_clickable((By.XPATH, "//tbody[@id='feedbackTableBody']/tr[1]/td[@class='rating-cell']/div[@class='star-rating']/label[1]")))
         
         review_list = browser.find_elements(By.CSS_SELECTOR, "td.question-cell")
-        for count in range(1, len(review_list) + 1):
-            star_button = browser.find_element(By.XPATH, f"//tbody[@id='feedbackTableBody']/tr[{count}]/td[@class='rating-cell']/div[@class='star-rating']/label[{randint(1,2)}]")
-            browser.execute_script("arguments[0].scrollIntoView();arguments[0].click()", star_button)
+        if not FEEDBACK_SCRIPTED_FORMS or not fill_endsem_scripted(browser, len(review_list)):
+            for count in range(1, len(review_list) + 1):
+                star_button = browser.find_element(By.XPATH, f"//tbody[@id='feedbackTableBody']/tr[{count}]/td[@class='rating-cell']/div[@class='star-rating']/label[{randint(1,2)}]")
+                browser.execute_script("arguments[0].scrollIntoView();arguments[0].click()", star_button)
         
         submit_button = browser.find_element(By.ID, "btnSave")
         browser.execute_script("arguments[0].scrollIntoView();arguments[0].click()", submit_button)
         wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "img.img-fluid")))
         
+    report(progress, "submitting", len(staff_list), len(staff_list))
     final_submit_button = browser.find_element(By.ID, "btnFinalSubmit")
     browser.execute_script("arguments[0].scrollIntoView();arguments[0].click()", final_submit_button)
     
-    browser.quit()
     return {"status": "success", "message": "End semester feedback completed"}
 
 
-async def auto_feedback_task(index, rollno, password):
-    """Background task to complete feedback forms"""
+def auto_feedback_task(index, rollno, password, progress=None):
+    """Background task to complete feedback forms, blocks until the forms are submitted"""
     if FEEDBACK_DISABLED:
         logger.warning("Feedback automation is disabled")
         raise HTTPException(
@@ -173,54 +306,47 @@ async def auto_feedback_task(index, rollno, password):
             detail="Feedback automation is currently disabled. Please try again later or contact support."
         )
     
-    browser = None
     try:
-        # Create a webdriver with error handling
-        browser = create_driver()
-        wait = WebDriverWait(browser, 10)
-        
-        browser.get("https://ecampus.psgtech.ac.in/studzone")
-        
-        # Fill out the credentials
-        rollno_field = browser.find_element(By.ID, "rollno")
-        rollno_field.send_keys(rollno)
+        # Borrow a pooled browser, the job runs in its own browser context
+        report(progress, "waiting_for_browser")
+        with browser_pool.session() as browser:
+            wait = WebDriverWait(browser, 10)
+            
+            report(progress, "logging_in")
+            browser.get("https://ecampus.psgtech.ac.in/studzone")
+            
+            # Fill out the credentials
+            rollno_field = browser.find_element(By.ID, "rollno")
+            rollno_field.send_keys(rollno)
 
-        password_field = browser.find_element(By.ID, "password")
-        password_field.send_keys(password)
+            password_field = browser.find_element(By.ID, "password")
+            password_field.send_keys(password)
 
-        checkbox = browser.find_element(By.ID, "terms")
-        browser.execute_script("arguments[0].click();", checkbox)
+            checkbox = browser.find_element(By.ID, "terms")
+            browser.execute_script("arguments[0].click();", checkbox)
 
-        login_button = browser.find_element(By.ID, "btnLogin")
-        browser.execute_script("arguments[0].click();", login_button)
-        
-        # Get the feedback index page
-        feedback_card = wait.until(EC.element_to_be_clickable((By.XPATH, f"//h5[text()='Feedback']")))
-        browser.execute_script("arguments[0].scrollIntoView();arguments[0].click();", feedback_card)
-        
-        wait.until(EC.element_to_be_clickable((By.CLASS_NAME, "card-body")))
-        feedbacks = browser.find_elements(By.CLASS_NAME, "card-body")
-        
-        # Click the desired feedback
-        browser.execute_script("arguments[0].click();", feedbacks[index])
-        
-        # Process the appropriate feedback form
-        if index == 0:
-            return endsem_feedback(browser)
-        else:
-            return intermediate_feedback(browser)
+            login_button = browser.find_element(By.ID, "btnLogin")
+            browser.execute_script("arguments[0].click();", login_button)
+            
+            # Get the feedback index page
+            report(progress, "opening_feedback")
+            feedback_card = wait.until(EC.element_to_be_clickable((By.XPATH, f"//h5[text()='Feedback']")))
+            browser.execute_script("arguments[0].scrollIntoView();arguments[0].click();", feedback_card)
+            
+            wait.until(EC.element_to_be_clickable((By.CLASS_NAME, "card-body")))
+            feedbacks = browser.find_elements(By.CLASS_NAME, "card-body")
+            
+            # Click the desired feedback
+            browser.execute_script("arguments[0].click();", feedbacks[index])
             
+            # Process the appropriate feedback form
+            if index == 0:
+                return endsem_feedback(browser, progress)
+            else:
+                return intermediate_feedback(browser, progress)
+            
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in feedback automation: {str(e)}")
-        if browser:
-            try:
-                browser.quit()
-            except:
-                pass
         raise HTTPException(status_code=500, detail=f"Error in feedback automation: {str(e)}")
-    finally:
-        if browser:
-            try:
-                browser.quit()
-            except:
-                pass
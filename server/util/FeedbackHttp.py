@@ -0,0 +1,211 @@
+from .HomePage import getHomePageAttendance, STUDZONE_LOGIN_URL
+from .Parser import parseDocument, findAll, findFirst, elementText
+from urllib.parse import urljoin
+from random import randint
+from fastapi import HTTPException
+import logging
+import os
+import re
+
+logger = logging.getLogger("nimora-feedback")
+
+# Browserless feedback engine. It walks the same path as the Selenium flow in
+# Feedback.py (home page -> Feedback card -> feedback card by index -> one form per
+# staff/course -> final submit) over a plain HTTP session, reading links from the
+# pages and posting their forms with every rating filled in, as the browser would.
+
+#"selenium" drives Chrome, "http" uses this engine
+FEEDBACK_ENGINE = os.environ.get("FEEDBACK_ENGINE", "selenium").lower()
+
+#Retry with Selenium when the HTTP engine cannot follow the portal's pages and has submitted nothing
+FEEDBACK_HTTP_FALLBACK = os.environ.get("FEEDBACK_HTTP_FALLBACK", "true").lower() == "true"
+
+#Feedback index page, only used when the home page has no link to it
+FEEDBACK_INDEX_URL = os.environ.get("FEEDBACK_HTTP_INDEX_URL", "https://ecampus.psgtech.ac.in/studzone/Feedback")
+
+#URL targets in onclick handlers and data attributes of clickable cards
+SCRIPT_URL = re.compile(r"""(?:location(?:\.href)?\s*=|location\.assign\(|window\.open\()\s*['"]([^'"]+)['"]""")
+LINK_ATTRIBUTES = ("href", "data-href", "data-url", "formaction")
+
+#Submit buttons of the per-staff/course forms and of the final submission
+SAVE_BUTTON_IDS  = ("btnSave",)
+FINAL_BUTTON_IDS = ("btnFinalSubmit",)
+
+
+class FeedbackFlowError(Exception):
+    """The portal pages did not look as expected. Raised only before anything was submitted."""
+
+
+def elementLink(element, base_url):
+    """URL a click on element leads to: an enclosing or inner link, or an onclick/data-* target"""
+    candidates = [element]
+    candidates.extend(element.iterancestors())
+    candidates.extend(element.iterdescendants())
+
+    for candidate in candidates:
+        for attribute in LINK_ATTRIBUTES:
+            target = candidate.get(attribute)
+            if target and not target.startswith(("#", "javascript:")):
+                return urljoin(base_url, target)
+
+        match = SCRIPT_URL.search(candidate.get("onclick") or "")
+        if match:
+            return urljoin(base_url, match.group(1))
+
+    return None
+
+
+def formPayload(form, choose, button=None):
+    """Field values the browser would send for form, with choose(options) picking each radio group"""
+    payload = []
+    radio_groups = {}
+
+    for field in form.iter("input", "select", "textarea"):
+        name = field.get("name")
+        if not name or field.get("disabled") is not None:
+            continue
+
+        if field.tag == "select":
+            options = findAll(field, "option")
+            selected = [option for option in options if option.get("selected") is not None] or options[:1]
+            for option in selected:
+                payload.append((name, option.get("value", elementText(option))))
+        elif field.tag == "textarea":
+            payload.append((name, field.text or ""))
+        else:
+            kind = (field.get("type") or "text").lower()
+            if kind == "radio":
+                radio_groups.setdefault(name, []).append(field.get("value", "on"))
+            elif kind == "checkbox":
+                if field.get("checked") is not None:
+                    payload.append((name, field.get("value", "on")))
+            elif kind not in ("submit", "button", "image", "reset", "file"):
+                payload.append((name, field.get("value", "")))
+
+    #Every question is a radio group, answer all of them
+    for name, options in radio_groups.items():
+        payload.append((name, choose(options)))
+
+    #ASP.NET pages look at which button posted the form
+    if button is not None and button.get("name"):
+        payload.append((button.get("name"), button.get("value", "")))
+
+    return payload, len(radio_groups)
+
+
+def formButton(form, button_ids):
+    for button_id in button_ids:
+        button = findFirst(form, "*", {"id": button_id})
+        if button is not None:
+            return button
+    return None
+
+
+def submitForm(session, form, page_url, choose, button=None):
+    action = (button.get("formaction") if button is not None else None) or form.get("action") or page_url
+    payload, answered = formPayload(form, choose, button)
+
+    if (form.get("method") or "get").lower() == "post":
+        response = session.post(urljoin(page_url, action), data=payload, timeout=30)
+    else:
+        response = session.get(urljoin(page_url, action), params=payload, timeout=30)
+
+    if not response.ok:
+        raise HTTPException(status_code=502, detail=f"Feedback form was rejected by the portal ({response.status_code})")
+    return response, answered
+
+
+def fetchPage(session, url):
+    response = session.get(url, timeout=30)
+    if not response.ok:
+        raise FeedbackFlowError(f"{url} answered {response.status_code}")
+    return response, parseDocument(response.text)
+
+
+def feedbackForms(session, page, document):
+    """
+    The per-staff/course forms of a feedback page, as (form, page_url) pairs. A page
+    either holds them inline or lists staff/courses that each link to their own form.
+    """
+    forms = [form for form in findAll(document, "form") if formButton(form, SAVE_BUTTON_IDS) is not None]
+    if forms:
+        return [(form, page.url) for form in forms]
+
+    items = findAll(document, "div", {"class": "staff-item"}) or findAll(document, "div", {"class": "intermediate-body"})
+    forms = []
+    for item in items:
+        url = elementLink(item, page.url)
+        if url is None:
+            raise FeedbackFlowError("A feedback entry has no link to its form")
+        item_page, item_document = fetchPage(session, url)
+        for form in findAll(item_document, "form"):
+            if formButton(form, SAVE_BUTTON_IDS) is not None or form.xpath(".//input[@type='radio']"):
+                forms.append((form, item_page.url))
+    return forms
+
+
+def submitFeedbackHttp(index, rollno, password, progress=None):
+    """Complete feedback form number index over HTTP, the counterpart of auto_feedback_task"""
+    def report(stage, done=None, total=None):
+        if progress is not None:
+            progress(stage, done, total)
+
+    report("logging_in")
+    session = getHomePageAttendance(rollno, password)
+    if not session:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    #Find the Feedback card on the home page, like the Selenium flow clicks it
+    report("opening_feedback")
+    home, home_document = fetchPage(session, STUDZONE_LOGIN_URL)
+    heading = home_document.xpath("//h5[normalize-space()='Feedback']")
+    index_url = (elementLink(heading[0], home.url) if heading else None) or FEEDBACK_INDEX_URL
+
+    index_page, index_document = fetchPage(session, index_url)
+    cards = findAll(index_document, "div", {"class": "card-body"})
+    if len(cards) <= index:
+        raise HTTPException(status_code=404, detail="No feedback forms found")
+
+    form_url = elementLink(cards[index], index_page.url)
+    if form_url is None:
+        raise FeedbackFlowError("The feedback card has no link to its forms")
+
+    page, document = fetchPage(session, form_url)
+    forms = feedbackForms(session, page, document)
+    if not forms:
+        #Nothing to post means the forms are built by scripts, which only the browser can fill
+        raise FeedbackFlowError("No feedback forms in the page markup")
+
+    #End semester ratings pick one of the first two stars at random, intermediate ones the first option
+    if index == 0:
+        choose = lambda options: options[randint(0, min(len(options), 2) - 1)]
+    else:
+        choose = lambda options: options[0]
+
+    answered = 0
+    for number, (form, form_page_url) in enumerate(forms):
+        report("filling", number, len(forms))
+        _, filled = submitForm(session, form, form_page_url, choose, formButton(form, SAVE_BUTTON_IDS))
+        answered += filled
+
+    #End semester feedback is only recorded after the final submission
+    try:
+        final_page, final_document = fetchPage(session, page.url)
+    except FeedbackFlowError as e:
+        #Forms were already submitted, so this must not fall back to Selenium
+        raise HTTPException(status_code=502, detail=f"Could not reach the final feedback submission: {e}")
+    for form in findAll(final_document, "form"):
+        button = formButton(form, FINAL_BUTTON_IDS)
+        if button is not None:
+            report("submitting", len(forms), len(forms))
+            submitForm(session, form, final_page.url, choose, button)
+            break
+    else:
+        if index == 0:
+            #The staff forms are saved but nothing counts until the final submission
+            raise HTTPException(status_code=502, detail="The final feedback submission was not found, feedback was not recorded")
+
+    report("submitted", len(forms), len(forms))
+    kind = "End semester" if index == 0 else "Intermediate"
+    logger.info(f"{kind} feedback submitted over HTTP: {len(forms)} forms, {answered} answers")
+    return {"status": "success", "message": f"{kind} feedback completed", "forms": len(forms), "answers": answered}
@@ -0,0 +1,160 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from .BrowserPool import FEEDBACK_BROWSER_POOL_SIZE
+
+logger = logging.getLogger("nimora-feedback")
+
+# Feedback jobs run for tens of seconds of blocking browser work, so they get their
+# own executor instead of the event loop or the threadpool that serves sync endpoints.
+# Jobs are tracked by id for status polling. A student has at most one job queued or
+# running: asking again for the same feedback with the same credentials gets that job
+# back, anything else is refused until it finishes.
+
+FEEDBACK_WORKERS     = int(os.environ.get("FEEDBACK_WORKERS", str(FEEDBACK_BROWSER_POOL_SIZE)))
+FEEDBACK_QUEUE_LIMIT = int(os.environ.get("FEEDBACK_QUEUE_LIMIT", "50"))
+FEEDBACK_JOB_TTL     = int(os.environ.get("FEEDBACK_JOB_TTL", "3600"))
+FEEDBACK_JOB_HISTORY = int(os.environ.get("FEEDBACK_JOB_HISTORY", "5000"))
+
+
+class FeedbackJob:
+    __slots__ = ("id", "key", "request", "status", "stage", "done", "total", "message",
+                 "created", "started", "finished")
+
+    def __init__(self, key, request):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.request = request
+        self.status = "queued"
+        self.stage = "queued"
+        self.done = 0
+        self.total = None
+        self.message = "Waiting for a feedback worker"
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+    def progress(self, stage, done=None, total=None):
+        """Called from the job while it runs to report what it is doing"""
+        self.stage = stage
+        if done is not None:
+            self.done = done
+        if total is not None:
+            self.total = total
+
+    def toDict(self):
+        return {
+            "job_id"   : self.id,
+            "status"   : self.status,
+            "stage"    : self.stage,
+            "progress" : {"done": self.done, "total": self.total},
+            "message"  : self.message,
+            "created"  : self.created,
+            "started"  : self.started,
+            "finished" : self.finished,
+        }
+
+
+class FeedbackJobQueue:
+    """
+    Runs run(*args, progress=job.progress) for each submitted job on a dedicated
+    executor. At most max_queued jobs wait at once, further submissions get a 429.
+    """
+
+    def __init__(self, run, workers=FEEDBACK_WORKERS, max_queued=FEEDBACK_QUEUE_LIMIT,
+                 job_ttl=FEEDBACK_JOB_TTL, history=FEEDBACK_JOB_HISTORY):
+        self.run = run
+        self.workers = workers
+        self.max_queued = max_queued
+        self.job_ttl = job_ttl
+        self.history = history
+        self._executor = None
+        self._jobs = OrderedDict()
+        self._active = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, request, *args):
+        """
+        Queue a job for key (the student), returning (job, created) where created is False
+        for a duplicate: the same request, a hash of what was asked for and the credentials,
+        while key's job is still active. A different request for key gets a 409.
+        """
+        with self._lock:
+            self._prune()
+
+            job = self._active.get(key)
+            if job is not None:
+                if job.request != request:
+                    raise HTTPException(status_code=409, detail="Another feedback request for this roll number is in progress. Please wait for it to finish.")
+                return job, False
+
+            if self._count("queued") >= self.max_queued:
+                raise HTTPException(status_code=429, detail="Too many feedback requests are waiting. Please try again in a few minutes.")
+
+            job = FeedbackJob(key, request)
+            self._jobs[job.id] = job
+            self._active[key] = job
+
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="feedback")
+
+        self._executor.submit(self._run, job, args)
+        return job, True
+
+    def _run(self, job, args):
+        job.status = "running"
+        job.stage = "starting"
+        job.message = "Feedback automation in progress"
+        job.started = time.time()
+        try:
+            result = self.run(*args, progress=job.progress)
+            job.status = "completed"
+            job.message = (result or {}).get("message", "Feedback completed")
+        except HTTPException as he:
+            job.status = "failed"
+            job.message = he.detail
+        except Exception as e:
+            logger.error(f"Feedback job {job.id} failed: {e}")
+            job.status = "failed"
+            job.message = "Feedback automation failed. Please try again."
+        finally:
+            job.stage = job.status
+            job.finished = time.time()
+            with self._lock:
+                if self._active.get(job.key) is job:
+                    del self._active[job.key]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _count(self, status):
+        return sum(1 for job in self._active.values() if job.status == status)
+
+    def _prune(self):
+        #Forget finished jobs once they are old, or when the history is full
+        now = time.time()
+        for job_id in list(self._jobs):
+            job = self._jobs[job_id]
+            if job.finished is None:
+                continue
+            if now - job.finished > self.job_ttl or len(self._jobs) > self.history:
+                del self._jobs[job_id]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers" : self.workers,
+                "queued"  : self._count("queued"),
+                "running" : self._count("running"),
+                "limit"   : self.max_queued,
+            }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
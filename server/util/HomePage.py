@@ -1,21 +1,85 @@
-from requests import Session
-from bs4 import BeautifulSoup
 from datetime import datetime
+from .SessionPool import SessionPool, sessionKey
+from .Cache import AsyncSingleFlight
+from .Parser import parseDocument, findFirst
+from .Metrics import timedParse, login_seconds
+from .ServerTiming import recordPhase
+from .Deadline import checkDeadline
+from .Transport import newSession, newAsyncClient, isClientUsable
+import asyncio
+import functools
 import pytz
+import re
+import time
 
-def getHomePageAttendance(rollno, password):
-    #Start a session
-    login_url = "https://ecampus.psgtech.ac.in/studzone"
-    session = Session()
+STUDZONE_LOGIN_URL  = "https://ecampus.psgtech.ac.in/studzone"
+STUDZONE2_LOGIN_URL = "https://ecampus.psgtech.ac.in/studzone2/"
+
+#Password field of each portal's login form. A logged-out session is sent to the form,
+#following the redirect, so a scraped page that has the field was never the page asked for
+LOGIN_FORM_FIELDS = {
+    portal: re.compile(rf"""<input\b[^>]*\bname\s*=\s*["']?{field}["'\s/>]""", re.IGNORECASE)
+    for portal, field in (("studzone", "password"), ("studzone2", "txtpwdcheck"))
+}
+
+
+class LoggedOutError(Exception):
+    """The portal answered with its login form, the session is no longer logged in"""
+
+
+def isLoginPage(html, portal):
+    return LOGIN_FORM_FIELDS[portal].search(html) is not None
 
-    #Get the login page
-    login_page = session.get(login_url)
 
+def checkPortalPage(response, portal="studzone"):
+    """Raise for an error answer or the login form, so neither is parsed as a page without rows"""
+    response.raise_for_status()
+    if isLoginPage(response.text, portal):
+        raise LoggedOutError(f"The {portal} session was logged out")
+
+
+def recordLogin(portal):
+    """Decorator recording how long a login to portal takes, and whether it worked, in the metrics and request timings"""
+    def observe(started, result):
+        elapsed = time.perf_counter() - started
+        login_seconds.observe(elapsed, portal=portal, result=result)
+        recordPhase("login", portal, elapsed)
+
+    def decorate(login):
+        if asyncio.iscoroutinefunction(login):
+            @functools.wraps(login)
+            async def recordedAsync(rollno, password):
+                started = time.perf_counter()
+                try:
+                    session = await login(rollno, password)
+                except Exception:
+                    observe(started, "error")
+                    raise
+                observe(started, "success" if session else "rejected")
+                return session
+            return recordedAsync
+
+        @functools.wraps(login)
+        def recorded(rollno, password):
+            started = time.perf_counter()
+            try:
+                session = login(rollno, password)
+            except Exception:
+                observe(started, "error")
+                raise
+            observe(started, "success" if session else "rejected")
+            return session
+        return recorded
+    return decorate
+
+
+@timedParse
+def attendanceLoginPayload(login_html, rollno, password):
     #Extract the html from the page using lxml parser
-    login_soup = BeautifulSoup(login_page.text , "lxml")
+    login_document = parseDocument(login_html)
 
     #Get the dynamic token used for login
-    token = login_soup.find("input",{"name":"__RequestVerificationToken"})["value"]
+    token = findFirst(login_document,"input",{"name":"__RequestVerificationToken"}).attrib["value"]
 
     #Create a payload to POST to the login form
     payload = {
@@ -25,35 +89,32 @@ def getHomePageAttendance(rollno, password):
     "__RequestVerificationToken" : token
     }
 
-    #Get the response from POST
-    response = session.post(login_url, data=payload)
+    return payload
 
+
+@timedParse
+def isAttendanceHomePage(html):
     #Check if we have landed on student home page
-    #and the pass the current session for the next function
-    response_soup = BeautifulSoup(response.text , "lxml")
-    check = response_soup.find("nav",{"class":"navbar navbar-expand-lg navbar-light"})
-    if check:
-        return session
-    else:
-        return False
+    response_document = parseDocument(html)
+    check = findFirst(response_document,"nav",{"class":"navbar navbar-expand-lg navbar-light"})
+    return check is not None
 
 
-def getHomePageCGPA(rollno, password):
-    #Start a session
-    login_url = "https://ecampus.psgtech.ac.in/studzone2/"
-    session = Session()
+def isCGPAHomePage(html):
+    #A rejected login answers with the login form again, password field and all
+    return not isLoginPage(html, "studzone2")
 
-    #Get the login page
-    login_page = session.get(login_url)
 
+@timedParse
+def cgpaLoginPayload(login_html, rollno, password):
     #Extract the html from the page using lxml parser
-    login_soup = BeautifulSoup(login_page.text , "lxml")
+    login_document = parseDocument(login_html)
 
     #Get the dynamic tokens used for login
-    viewstate           = login_soup.find("input",{"name":"__VIEWSTATE"})["value"]
-    viewstate_generator = login_soup.find("input",{"name":"__VIEWSTATEGENERATOR"})["value"]
-    event_validation    = login_soup.find("input",{"name" : "__EVENTVALIDATION"})["value"]
-    abcd3               = login_soup.find("input",{"name" : "abcd3"})["value"]
+    viewstate           = findFirst(login_document,"input",{"name":"__VIEWSTATE"}).attrib["value"]
+    viewstate_generator = findFirst(login_document,"input",{"name":"__VIEWSTATEGENERATOR"}).attrib["value"]
+    event_validation    = findFirst(login_document,"input",{"name":"__EVENTVALIDATION"}).attrib["value"]
+    abcd3               = findFirst(login_document,"input",{"name":"abcd3"}).attrib["value"]
 
     #Create a payload to POST to the login form
     payload = {
@@ -69,39 +130,231 @@ def getHomePageCGPA(rollno, password):
         "abcd3"                : abcd3
     }
 
-def getHomePageCGPA(rollno, password):
-    #Start a session
-    login_url = "https://ecampus.psgtech.ac.in/studzone2/"
-    session = Session()
+    return payload
+
+
+@recordLogin("studzone")
+def getHomePageAttendance(rollno, password):
+    #Start a session on the shared connection pool
+    session = newSession()
 
     #Get the login page
-    login_page = session.get(login_url)
+    login_page = session.get(STUDZONE_LOGIN_URL)
+    payload = attendanceLoginPayload(login_page.text, rollno, password)
 
-    #Extract the html from the page using lxml parser
-    login_soup = BeautifulSoup(login_page.text , "lxml")
+    #Get the response from POST
+    response = session.post(STUDZONE_LOGIN_URL, data=payload)
 
-    #Get the dynamic tokens used for login
-    viewstate           = login_soup.find("input",{"name":"__VIEWSTATE"})["value"]
-    viewstate_generator = login_soup.find("input",{"name":"__VIEWSTATEGENERATOR"})["value"]
-    event_validation    = login_soup.find("input",{"name" : "__EVENTVALIDATION"})["value"]
-    abcd3               = login_soup.find("input",{"name" : "abcd3"})["value"]
+    #A portal error is not a rejected login
+    response.raise_for_status()
+
+    #Pass the current session for the next function if the login worked
+    if isAttendanceHomePage(response.text):
+        return session
+    else:
+        session.release()
+        return False
 
-    #Create a payload to POST to the login form
-    payload = {
-        "__EVENTTARGET"        : "",
-        "__EVENTARGUMENT"      : "",
-        "__LASTFOCUS"          : "",
-        "__VIEWSTATE"          : viewstate,
-        "__VIEWSTATEGENERATOR" : viewstate_generator,
-        "__EVENTVALIDATION"    : event_validation,
-        "rdolst"               : "S",
-        "txtusercheck"         : rollno,
-        "txtpwdcheck"          : password,
-        "abcd3"                : abcd3
-    }
+
+@recordLogin("studzone2")
+def getHomePageCGPA(rollno, password):
+    #Start a session on the shared connection pool
+    session = newSession()
+
+    #Get the login page
+    login_page = session.get(STUDZONE2_LOGIN_URL)
+    payload = cgpaLoginPayload(login_page.text, rollno, password)
 
     #Send a POST request from current session
-    session.post(login_url, data=payload)
+    response = session.post(STUDZONE2_LOGIN_URL, data=payload)
+
+    #A portal error is not a rejected login
+    response.raise_for_status()
+
+    #Pass the current session for the next function if the login worked
+    if isCGPAHomePage(response.text):
+        return session
+    else:
+        session.release()
+        return False
+
+
+@recordLogin("studzone")
+async def getHomePageAttendanceAsync(rollno, password):
+    #Start an async client with its own cookie jar
+    client = newAsyncClient()
+
+    login_page = await client.get(STUDZONE_LOGIN_URL)
+    payload = attendanceLoginPayload(login_page.text, rollno, password)
+
+    response = await client.post(STUDZONE_LOGIN_URL, data=payload)
+
+    #A portal error is not a rejected login
+    response.raise_for_status()
+
+    if isAttendanceHomePage(response.text):
+        return client
+    else:
+        await client.aclose()
+        return False
+
+
+@recordLogin("studzone2")
+async def getHomePageCGPAAsync(rollno, password):
+    #Start an async client with its own cookie jar
+    client = newAsyncClient()
+
+    login_page = await client.get(STUDZONE2_LOGIN_URL)
+    payload = cgpaLoginPayload(login_page.text, rollno, password)
+
+    response = await client.post(STUDZONE2_LOGIN_URL, data=payload)
+
+    #A portal error is not a rejected login
+    response.raise_for_status()
+
+    if isCGPAHomePage(response.text):
+        return client
+    else:
+        await client.aclose()
+        return False
+
+
+#Logged-in sessions shared across requests for the same student
+session_pool = SessionPool()
+client_pool  = SessionPool()
+
+#Async logins and scrapes in flight, joined by identical concurrent requests instead of repeated
+login_flights  = AsyncSingleFlight()
+scrape_flights = AsyncSingleFlight()
+
+#Login function for each portal
+PORTAL_LOGINS = {
+    "studzone"  : getHomePageAttendance,
+    "studzone2" : getHomePageCGPA,
+}
+
+PORTAL_LOGINS_ASYNC = {
+    "studzone"  : getHomePageAttendanceAsync,
+    "studzone2" : getHomePageCGPAAsync,
+}
+
+#Protected pages that bounce back to the login form once a session has died
+PORTAL_PROBE_URLS = {
+    "studzone"  : "https://ecampus.psgtech.ac.in/studzone/Attendance/StudentPercentage",
+    "studzone2" : "https://ecampus.psgtech.ac.in/studzone2/AttWfStudCourseSelection.aspx",
+}
+
+
+def hasExpiredCookies(cookies):
+    #Expired cookies mean the portal has already forgotten us, no request needed
+    now = time.time()
+    for cookie in cookies:
+        if cookie.is_expired(now):
+            return True
+    return False
+
+
+def isSessionAlive(session, portal):
+    """Cheaply check whether a pooled session is still logged in"""
+    if hasExpiredCookies(session.cookies):
+        return False
+
+    #A logged-out session is redirected to the login page, so only the status is needed
+    try:
+        probe = session.get(PORTAL_PROBE_URLS[portal], allow_redirects=False, stream=True, timeout=10)
+        probe.close()
+    except Exception:
+        return False
+
+    return probe.status_code == 200
+
+
+async def isSessionAliveAsync(client, portal):
+    """Async counterpart of isSessionAlive for pooled async clients"""
+    if hasExpiredCookies(client.cookies.jar):
+        return False
+
+    try:
+        async with client.stream("GET", PORTAL_PROBE_URLS[portal], follow_redirects=False, timeout=10) as probe:
+            status_code = probe.status_code
+    except Exception:
+        return False
+
+    return status_code == 200
+
+
+def getPooledSession(rollno, password, portal="studzone"):
+    """Return a logged-in session for the portal, reusing a pooled one while it is alive"""
+    key = sessionKey(rollno, password, portal)
+
+    session, needs_validation = session_pool.checkout(key)
+    if session is not None:
+        if not needs_validation or isSessionAlive(session, portal):
+            return session
+        session_pool.invalidate(key)
+
+    #Log in again and pool the new session only if the login succeeded
+    session = PORTAL_LOGINS[portal](rollno, password)
+    if session:
+        session.student_key = key
+        session_pool.put(key, session)
 
     return session
 
+
+async def getPooledSessionAsync(rollno, password, portal="studzone"):
+    """
+    Return a logged-in async client for the portal, reusing a pooled one while it is alive.
+    Concurrent calls for the same credentials share one probe or login.
+    """
+    key = sessionKey(rollno, password, portal)
+
+    client, needs_validation = client_pool.checkout(key)
+    if client is not None and isClientUsable(client) and not needs_validation:
+        return client
+
+    joined = login_flights.inFlight(key)
+    started = time.perf_counter()
+    client = await login_flights.do(key, lambda: loginPooledAsync(key, rollno, password, portal, client))
+    if joined:
+        #The login itself is timed by the request that started it
+        recordPhase("login", f"{portal} shared", time.perf_counter() - started)
+    return client
+
+
+async def loginPooledAsync(key, rollno, password, portal, client):
+    checkDeadline(f"{portal} login")
+
+    #Probe the pooled client first, it may still be logged in
+    if client is not None and isClientUsable(client):
+        if await isSessionAliveAsync(client, portal):
+            return client
+        client_pool.invalidate(key)
+
+    client = await PORTAL_LOGINS_ASYNC[portal](rollno, password)
+    if client:
+        client.student_key = key
+        client_pool.put(key, client)
+
+    return client
+
+
+async def scrapeShared(client, scrape, *args):
+    """
+    Await scrape(client, *args), or join the identical scrape already in flight for the
+    same student and portal. The result is shared, so callers must not modify it.
+    """
+    key = (getattr(client, "student_key", id(client)), scrape.__name__) + args
+    joined = scrape_flights.inFlight(key)
+    started = time.perf_counter()
+    result = await scrape_flights.do(key, lambda: scrape(client, *args))
+    if joined:
+        recordPhase("fetch", f"{scrape.__name__} shared", time.perf_counter() - started)
+    return result
+
+
+def invalidatePooledSession(rollno, password, portal="studzone"):
+    """Forget a pooled session, e.g. after a scrape failed on it"""
+    key = sessionKey(rollno, password, portal)
+    session_pool.invalidate(key)
+    client_pool.invalidate(key)
@@ -1,33 +1,50 @@
-from bs4 import BeautifulSoup
-from pandas import DataFrame
-from .Attendance import getCourseNames
+from .Attendance import getCourseNames, getCourseNamesAsync
+from .Parser import parseDocument, findAll, findFirst, elementText
+from .Metrics import timedParse
+from .Executors import runParse
+from .ServerTiming import timedCompute
+from .HomePage import checkPortalPage
+import asyncio
+import math
+
+INTERNALS_URL = "https://ecampus.psgtech.ac.in/studzone/ContinuousAssessment/CAMarksView"
 
 def getInternals(session):
-    internals_url = "https://ecampus.psgtech.ac.in/studzone/ContinuousAssessment/CAMarksView"
-    
-    internals_page = session.get(internals_url)
-    internals_soup = BeautifulSoup(internals_page.text, "lxml")
+    internals_page = session.get(INTERNALS_URL)
+    checkPortalPage(internals_page)
+    course_map = getCourseNames(session)
+
+    return parseInternals(internals_page.text, course_map)
+
+async def getInternalsAsync(client):
+    #Fetch the marks page and the course names concurrently
+    internals_page, course_map = await asyncio.gather(
+        client.get(INTERNALS_URL),
+        getCourseNamesAsync(client),
+    )
+    checkPortalPage(internals_page)
+
+    return await runParse(parseInternals, internals_page.text, course_map)
+
+@timedParse
+def parseInternals(html, course_map):
+    internals_document = parseDocument(html)
     
-    content_tables = internals_soup.find_all("table")
+    content_tables = findAll(internals_document, "table")
 
     #Check for the presence of both the tables
     if len(content_tables) != 2:
         return False
     
     # lab_table = content_tables[0]
-    theory_table_body = content_tables[1].find("tbody")
-    
-    theory_table_rows = theory_table_body.find_all("tr")
+    theory_table_body = findFirst(content_tables[1], "tbody")
     
-    course_map = getCourseNames(session)
+    theory_table_rows = findAll(theory_table_body, "tr")
     
     #Get the theory internal marks in the form of list
     theory_table = []
     for row in theory_table_rows:
-        record = []
-        cells = row.find_all("td")
-        for cell in cells:
-            record.append(cell.text)
+        record = [elementText(cell) for cell in findAll(row, "td")]
         try:
             record[0] = ''.join( [ record[0], '   -   ', course_map[record[0]] ] )
         except KeyError:
@@ -37,6 +54,7 @@ def getInternals(session):
     return theory_table
     
     
+@timedCompute
 def getTargetScore(theory_table, target):
     #Check for temporary/final mark entry
     final = True
@@ -65,12 +83,63 @@ def getTargetScore(theory_table, target):
     
 
 def calculateTarget(internal,final):
+    """
+    Lowest end semester score (45 to 100) that reaches the final percentage, or '-'.
+    Solved in closed form and then checked with the same float comparison as
+    trying every score from 45 upwards, so the result is identical.
+    """
     # 0.8 = 0.4(internals weightage) * 2(convert /50 to /100)
     # 0.6 = (end semester exam weightage)
     internal = (float)(internal)
     final    = (float)(final)
-    for target in range(45,101):
-        if (float)(0.8 * internal) + (float)(0.6 * target) >= final:
-            return target
-        
-    return '-'
\ No newline at end of file
+
+    def reaches(target):
+        return (float)(0.8 * internal) + (float)(0.6 * target) >= final
+
+    #Smallest score with 0.8 * internal + 0.6 * score >= final, kept within 45..101
+    needed = (final - 0.8 * internal) / 0.6
+    if not math.isfinite(needed) or needed <= 45:
+        target = 45
+    elif needed > 100:
+        target = 101
+    else:
+        target = math.ceil(needed)
+
+    #Float rounding can leave the estimate one score off either way
+    while target > 45 and reaches(target - 1):
+        target -= 1
+    while target <= 100 and not reaches(target):
+        target += 1
+
+    if target > 100:
+        return '-'
+    return target
+
+
+@timedCompute
+def getTargetGrid(theory_table, targets):
+    """
+    Minimum end semester score of every course for each of the targets, as rows of
+    [course, internal, scores]. internal and scores are '*' until the course has marks.
+    """
+    #Check for temporary/final mark entry
+    final = True
+    for record in theory_table:
+        if record[-1] == '*':
+            final = False
+            break
+
+    result = []
+    for record in theory_table:
+        if record[-2] in ['',' ','*']:
+            result.append([record[0], '*', '*'])
+            continue
+
+        internal = '{:.2f}'.format(float(record[-2]))
+        if not final:
+            internal = ''.join( [internal, '*'] )
+
+        scores = [calculateTarget(record[-2], target) for target in targets]
+        result.append([record[0], internal, scores])
+
+    return result
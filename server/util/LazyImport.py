@@ -0,0 +1,81 @@
+import importlib
+import logging
+import os
+import sys
+import threading
+import time
+
+logger = logging.getLogger("nimora-api")
+
+# Feature modules with heavy dependencies (Selenium for feedback) are imported on
+# first use instead of at boot, so cold starts only pay for what every request needs.
+
+#Boot import budget in milliseconds, exceeding it is logged as a warning at startup
+IMPORT_BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", "1000"))
+
+#Seconds spent importing, keyed by module name ("app" is the boot import)
+import_times = {}
+
+#Every LazyModule created, for the import report
+lazy_modules = []
+
+
+class LazyModule:
+    """Stand-in for a module that is imported the first time one of its attributes is used"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+        lazy_modules.append(self)
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    started = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    #Only count the import if this call actually paid for it
+                    if self._name not in import_times:
+                        import_times[self._name] = time.perf_counter() - started
+                    self._module = module
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+
+def recordImport(name, started):
+    """Record the import time of name, started being a time.perf_counter() reading"""
+    import_times[name] = time.perf_counter() - started
+
+
+def importReport():
+    """Import costs in milliseconds, for /health and the startup log"""
+    boot_ms = import_times.get("app", 0.0) * 1000
+    return {
+        "boot_ms"       : round(boot_ms, 1),
+        "budget_ms"     : IMPORT_BUDGET_MS,
+        "within_budget" : boot_ms <= IMPORT_BUDGET_MS,
+        "lazy_modules"  : {
+            module._name: {
+                "loaded"    : module.loaded,
+                "import_ms" : round(import_times[module._name] * 1000, 1) if module._name in import_times else None,
+            }
+            for module in lazy_modules
+        },
+        "loaded_modules": len(sys.modules),
+    }
+
+
+def logImportReport():
+    report = importReport()
+    message = f"App imported in {report['boot_ms']}ms (budget {report['budget_ms']:.0f}ms)"
+    if report["within_budget"]:
+        logger.info(message)
+    else:
+        logger.warning(message + ", check for heavy imports on the boot path")
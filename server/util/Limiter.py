@@ -0,0 +1,186 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+
+class UpstreamBusyError(Exception):
+    """No slot to the upstream freed up in time, or too many requests were already waiting"""
+
+    def __init__(self, reason, message):
+        super().__init__(message)
+        self.reason = reason
+
+
+class _Waiter:
+    __slots__ = ("event", "loop", "future", "granted")
+
+    def __init__(self, loop=None):
+        self.loop = loop
+        self.future = loop.create_future() if loop is not None else None
+        self.event = threading.Event() if loop is None else None
+        self.granted = False
+
+    def wake(self):
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit for one upstream that adapts like TCP congestion control (AIMD).
+    Every success while the window is at least half used widens it by 1/limit, about
+    one slot per round trip. A failure, or a response slower than tolerance times the
+    usual latency of its page, shrinks it by backoff, once per round of requests.
+    Requests beyond the window wait in FIFO order for at most queue_timeout seconds.
+    Threads and coroutines on any event loop share the same window.
+    """
+
+    #Latencies below this are never treated as slow, whatever the page usually takes
+    MIN_SLOW_SECONDS = 0.05
+
+    #Weight of a new latency sample in a page's usual latency
+    BASELINE_WEIGHT = 0.05
+
+    MAX_PAGES = 256
+
+    def __init__(self, initial, min_limit, max_limit, backoff=0.7, tolerance=2.0, queue_size=1000, queue_timeout=30.0):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._waiters = deque()
+        self._baselines = {}
+        self._decreased_at = 0.0
+        self._lock = threading.Lock()
+
+    def _take(self):
+        #Only when nobody is queued, so waiters are served in order
+        if not self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return True
+        return False
+
+    def _enqueue(self, loop=None):
+        if len(self._waiters) >= self.queue_size:
+            self.rejected += 1
+            raise UpstreamBusyError("queue_full", f"{len(self._waiters)} upstream requests already waiting")
+        waiter = _Waiter(loop)
+        self._waiters.append(waiter)
+        return waiter
+
+    def _grant(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            waiter.granted = True
+            self.in_flight += 1
+            waiter.wake()
+
+    def _giveUp(self, waiter, timed_out=True):
+        """Leave the queue, returns whether a slot was granted meanwhile"""
+        if waiter.granted:
+            return True
+        self._waiters.remove(waiter)
+        self.timed_out += timed_out
+        return False
+
+    def _wait(self, timeout):
+        #The caller may have less time left than the queue allows
+        if timeout is None:
+            return self.queue_timeout
+        return max(0.0, min(timeout, self.queue_timeout))
+
+    def acquire(self, timeout=None):
+        """Wait for a slot from a thread, for at most timeout seconds if given; returns the time of the grant"""
+        with self._lock:
+            if self._take():
+                return time.perf_counter()
+            waiter = self._enqueue()
+
+        wait = self._wait(timeout)
+        if not waiter.event.wait(wait):
+            with self._lock:
+                if not self._giveUp(waiter):
+                    raise UpstreamBusyError("timeout", f"No upstream slot within {wait:.1f}s")
+        return time.perf_counter()
+
+    async def acquireAsync(self, timeout=None):
+        """Wait for a slot from a coroutine, for at most timeout seconds if given; returns the time of the grant"""
+        with self._lock:
+            if self._take():
+                return time.perf_counter()
+            waiter = self._enqueue(asyncio.get_running_loop())
+
+        wait = self._wait(timeout)
+        try:
+            await asyncio.wait_for(waiter.future, wait)
+        except asyncio.TimeoutError:
+            with self._lock:
+                if not self._giveUp(waiter):
+                    raise UpstreamBusyError("timeout", f"No upstream slot within {wait:.1f}s")
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = self._giveUp(waiter, timed_out=False)
+            if granted:
+                self.release(None)
+            raise
+        return time.perf_counter()
+
+    def release(self, started, page=None, latency=None, failed=False):
+        """
+        Give a slot back. started is what acquire returned; with it the outcome of the
+        request adjusts the window. Without it (nothing was sent) the window is kept.
+        """
+        with self._lock:
+            self.in_flight -= 1
+            if started is not None:
+                if failed or self._isSlow(page, latency):
+                    self._decrease(started)
+                elif (self.in_flight + 1) * 2 >= self.limit:
+                    self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._grant()
+
+    def _isSlow(self, page, latency):
+        baseline = self._baselines.get(page)
+        if baseline is None:
+            if len(self._baselines) >= self.MAX_PAGES:
+                self._baselines.clear()
+            self._baselines[page] = latency
+            return False
+
+        self._baselines[page] = baseline + self.BASELINE_WEIGHT * (latency - baseline)
+        return latency > self.MIN_SLOW_SECONDS and latency > baseline * self.tolerance
+
+    def _decrease(self, started):
+        #Requests sent before the last decrease saw the old window, their news is already acted on
+        if started < self._decreased_at:
+            return
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+        self._decreased_at = time.perf_counter()
+
+    @property
+    def queue_depth(self):
+        return len(self._waiters)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "limit"       : int(self.limit),
+                "in_flight"   : self.in_flight,
+                "queue_depth" : len(self._waiters),
+                "rejected"    : self.rejected,
+                "timed_out"   : self.timed_out,
+            }
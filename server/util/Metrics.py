@@ -0,0 +1,223 @@
+import asyncio
+import functools
+import math
+import threading
+import time
+
+from .ServerTiming import recordPhase
+from .Deadline import checkDeadline
+
+# Prometheus metrics without the prometheus_client dependency: counters, gauges and
+# histograms with labels, rendered in the text exposition format for GET /metrics.
+# Recording is a dict update under a lock, cheap enough for every upstream request.
+
+#Upstream pages and logins, in seconds
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+#Parsing a page, in seconds
+PARSE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+#Every metric created, in creation order
+registry = []
+
+
+def escapeLabel(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def formatLabels(names, values, extra=()):
+    pairs = [f'{name}="{escapeLabel(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{escapeLabel(value)}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def formatValue(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} takes labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self):
+        """(suffix, label values, extra labels, value) for every series"""
+        with self._lock:
+            return [("", key, (), value) for key, value in self._values.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, key, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{formatLabels(self.labels, key, extra)} {formatValue(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    A value that goes up and down. Given a function, the gauge is read when metrics are
+    rendered instead: the function returns the value, or {label values tuple: value}.
+    """
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labels=(), function=None):
+        super().__init__(name, documentation, labels)
+        self.function = function
+
+    def set(self, value, **labels):
+        key = self.key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        if self.function is None:
+            return super().samples()
+        values = self.function()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [("", tuple(map(str, key)), (), value) for key, value in values.items() if value is not None]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            series = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+
+        samples = []
+        for key, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                samples.append(("_bucket", key, (("le", formatValue(float(bound))),), cumulative))
+            samples.append(("_sum", key, (), total))
+            samples.append(("_count", key, (), count))
+        return samples
+
+    def timed(self, **labels):
+        """Decorator recording how long each call of a function or coroutine function takes"""
+        def decorate(function):
+            if asyncio.iscoroutinefunction(function):
+                @functools.wraps(function)
+                async def timedAsync(*args, **kwargs):
+                    started = time.perf_counter()
+                    try:
+                        return await function(*args, **kwargs)
+                    finally:
+                        self.observe(time.perf_counter() - started, **labels)
+                return timedAsync
+
+            @functools.wraps(function)
+            def timedSync(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - started, **labels)
+            return timedSync
+        return decorate
+
+
+def render():
+    """Every registered metric in the Prometheus text exposition format"""
+    return "\n".join(metric.render() for metric in registry) + "\n"
+
+
+# Metrics shared by the util modules and app.py
+
+login_seconds = Histogram(
+    "nimora_login_seconds", "Time to log in to an ecampus portal", ("portal", "result"))
+
+upstream_request_seconds = Histogram(
+    "nimora_upstream_request_seconds", "Time for one request to the ecampus portal, by page", ("method", "page", "status"))
+
+upstream_errors = Counter(
+    "nimora_upstream_errors_total", "Upstream requests that failed or answered with a 5xx", ("page", "reason"))
+
+upstream_timeouts = Counter(
+    "nimora_upstream_timeouts_total", "Upstream requests that timed out", ("page",))
+
+upstream_in_flight = Gauge(
+    "nimora_upstream_in_flight", "Requests to the ecampus portal currently waiting for an answer")
+
+upstream_queue_seconds = Histogram(
+    "nimora_upstream_queue_seconds", "Time a request waited for a slot under the upstream concurrency limit", buckets=PARSE_BUCKETS + LATENCY_BUCKETS[-6:])
+
+upstream_rejected = Counter(
+    "nimora_upstream_rejected_total", "Upstream requests never sent because the limiter queue was full or too slow", ("reason",))
+
+parse_seconds = Histogram(
+    "nimora_parse_seconds", "Time to parse a portal page", ("function",), buckets=PARSE_BUCKETS)
+
+section_seconds = Histogram(
+    "nimora_data_section_seconds", "Time to produce one /data section, cached or scraped", ("section", "result"))
+
+
+def timedParse(function):
+    """
+    Decorator recording a parse function in nimora_parse_seconds and the request timings
+    under its own name. Parsing is not started once the request deadline has passed.
+    """
+    name = function.__name__
+
+    @functools.wraps(function)
+    def timed(*args, **kwargs):
+        checkDeadline(name)
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            parse_seconds.observe(elapsed, function=name)
+            recordPhase("parse", name, elapsed)
+    return timed
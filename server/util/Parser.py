@@ -0,0 +1,95 @@
+from functools import lru_cache
+import re
+from lxml import etree
+from lxml import html as lxml_html
+
+# Thin lxml layer that mirrors the handful of BeautifulSoup calls the scrapers use
+# (find, find_all, .text, .string) without building a Python object per node.
+# XPath queries are compiled once per (tag, attrs) and run in C.
+
+
+def parseDocument(markup):
+    """Parse a page (str or bytes) into an lxml element tree rooted at <html>"""
+    try:
+        return lxml_html.document_fromstring(markup)
+    except etree.ParserError:
+        #Empty pages parse to an empty document, like BeautifulSoup does
+        return lxml_html.Element("html")
+
+
+@lru_cache(maxsize=256)
+def compileQuery(tag, attrs, first):
+    """Build a descendant XPath for tag with BeautifulSoup-style attribute matching"""
+    predicates = []
+    for name, value in attrs:
+        if name == "class":
+            #class is multi-valued, so match the whole attribute or any single token
+            predicates.append(
+                f"(@class='{value}' or contains(concat(' ', normalize-space(@class), ' '), ' {value} '))"
+            )
+        else:
+            predicates.append(f"@{name}='{value}'")
+
+    query = f"descendant::{tag}"
+    if predicates:
+        query += "[" + " and ".join(predicates) + "]"
+    if first:
+        query = f"({query})[1]"
+
+    return etree.XPath(query)
+
+
+def findAll(element, tag, attrs=None):
+    """Equivalent of element.find_all(tag, attrs)"""
+    query = compileQuery(tag, tuple(sorted(attrs.items())) if attrs else (), False)
+    return query(element)
+
+
+def findFirst(element, tag, attrs=None):
+    """Equivalent of element.find(tag, attrs), None when nothing matches"""
+    query = compileQuery(tag, tuple(sorted(attrs.items())) if attrs else (), True)
+    matches = query(element)
+    return matches[0] if matches else None
+
+
+def elementText(element):
+    """Equivalent of element.text in BeautifulSoup: all descendant text joined"""
+    #Copy into a plain str so results do not keep the whole tree alive
+    return str(element.text_content())
+
+
+def elementString(element):
+    """Equivalent of element.string in BeautifulSoup: the only text child, else None"""
+    children = len(element)
+    if children == 0:
+        return element.text
+    if children == 1 and not element.text and not element[0].tail:
+        return elementString(element[0])
+    return None
+
+
+def tableRows(table):
+    """Text of every <td> in every <tr> under table, one list per row"""
+    return [[elementText(cell) for cell in findAll(row, "td")] for row in findAll(table, "tr")]
+
+
+#Attribute tokens are separated by XML whitespace only, like the class matching above
+XML_SPACE = re.compile(r"[ \t\r\n]+")
+
+
+@lru_cache(maxsize=64)
+def compileAttributeQuery(tag, attribute):
+    return etree.XPath(f"descendant::{tag}/@{attribute}", smart_strings=False)
+
+
+def attributeTokens(element, tag, attribute="class"):
+    """Set of the whitespace separated tokens of attribute on every tag under element"""
+    tokens = set()
+    for value in compileAttributeQuery(tag, attribute)(element):
+        tokens.update(XML_SPACE.split(value.strip(" \t\r\n")))
+    return tokens
+
+
+def hasTag(element, tag):
+    """Whether anything under element is a tag element"""
+    return next(element.iterdescendants(tag), None) is not None
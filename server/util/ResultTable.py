@@ -0,0 +1,42 @@
+class ResultTable:
+    """
+    Small read-only table returned by the compute functions (getCGPA,
+    getAffordableLeaves, parseExamSchedule). It offers the few DataFrame
+    features the API relied on, so pandas is not needed on the request path.
+    """
+
+    __slots__ = ("columns", "rows")
+
+    def __init__(self, rows, columns):
+        self.columns = tuple(columns)
+        self.rows = [tuple(row) for row in rows]
+
+        #Every row must line up with the header, like DataFrame(rows, columns=...)
+        for row in self.rows:
+            if len(row) != len(self.columns):
+                raise ValueError(f"{len(self.columns)} columns passed, passed data had {len(row)} columns")
+
+    @property
+    def empty(self):
+        return not self.rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __getitem__(self, column):
+        """Values of one column, in row order"""
+        index = self.columns.index(column)
+        return [row[index] for row in self.rows]
+
+    def to_dict(self, orient="records"):
+        """One dict per row keyed by column name, the same as DataFrame.to_dict(orient='records')"""
+        if orient != "records":
+            raise ValueError(f"orient '{orient}' not supported")
+        columns = self.columns
+        return [dict(zip(columns, row)) for row in self.rows]
+
+    def __repr__(self):
+        return f"ResultTable(columns={list(self.columns)}, rows={len(self.rows)})"
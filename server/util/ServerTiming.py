@@ -0,0 +1,140 @@
+import contextvars
+import functools
+import time
+
+# Phase timings of one request, returned in the Server-Timing header and, when asked
+# for, as a `timings` object in the response body. Logins, upstream fetches, parses and
+# compute steps report themselves here. Nothing is collected for a request that did
+# not start timings: every hook reads one context variable and returns.
+
+#Timings of the request being served, None when it is not collecting
+current_timings = contextvars.ContextVar("current_timings", default=None)
+
+
+def escapeDescription(text):
+    return str(text).replace("\\", "\\\\").replace('"', '\\"')
+
+
+class RequestTimings:
+    """Phases of one request as (section, phase, detail, seconds), shared by its sections"""
+    __slots__ = ("entries", "section", "started", "handled", "in_body")
+
+    def __init__(self, in_body=False):
+        self.entries = []
+        self.section = None
+        self.started = time.perf_counter()
+        self.handled = None
+        self.in_body = in_body
+
+    def forSection(self, section):
+        """A view recording into the same request under a /data section name"""
+        view = RequestTimings.__new__(RequestTimings)
+        view.entries = self.entries
+        view.section = section
+        view.started = self.started
+        view.handled = None
+        view.in_body = self.in_body
+        return view
+
+    def add(self, phase, detail, seconds):
+        #list.append is atomic, so parses on worker threads can record too
+        self.entries.append((self.section, phase, detail, seconds))
+
+    def serverTiming(self, finished=None):
+        """Server-Timing header value, with the total and the time spent writing the response"""
+        metrics = []
+        for section, phase, detail, seconds in self.entries:
+            name = f"{section}.{phase}" if section else phase
+            metrics.append(f'{name};dur={seconds * 1000:.1f};desc="{escapeDescription(detail)}"')
+
+        finished = finished or time.perf_counter()
+        if self.handled is not None:
+            metrics.append(f"respond;dur={(finished - self.handled) * 1000:.1f}")
+        metrics.append(f"total;dur={(finished - self.started) * 1000:.1f}")
+        return ", ".join(metrics)
+
+    def toDict(self):
+        """Body `timings` object: request phases, then each section's total and phases"""
+        phases = []
+        sections = {}
+        for section, phase, detail, seconds in self.entries:
+            record = {"phase": phase, "detail": detail, "ms": round(seconds * 1000, 1)}
+            if section is None:
+                phases.append(record)
+                continue
+
+            timing = sections.setdefault(section, {"ms": None, "source": None, "phases": []})
+            if phase == "total":
+                timing["ms"] = record["ms"]
+                timing["source"] = detail
+            else:
+                timing["phases"].append(record)
+
+        finished = self.handled or time.perf_counter()
+        timings = {"total_ms": round((finished - self.started) * 1000, 1), "phases": phases}
+        if sections:
+            timings["sections"] = sections
+        return timings
+
+
+def startTimings(in_body=False):
+    """Collect timings for the rest of the current request"""
+    timings = RequestTimings(in_body)
+    current_timings.set(timings)
+    return timings
+
+
+def sectionTimings(section):
+    """Record the rest of the current task under section, or None when not collecting"""
+    timings = current_timings.get()
+    if timings is None:
+        return None
+    timings = timings.forSection(section)
+    current_timings.set(timings)
+    return timings
+
+
+def recordPhase(phase, detail, seconds):
+    timings = current_timings.get()
+    if timings is not None:
+        timings.add(phase, detail, seconds)
+
+
+def timedPhase(phase):
+    """Decorator recording each call of a function as phase, detailed by its name"""
+    def decorate(function):
+        detail = function.__name__
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            timings = current_timings.get()
+            if timings is None:
+                return function(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                timings.add(phase, detail, time.perf_counter() - started)
+        return timed
+    return decorate
+
+
+timedCompute = timedPhase("compute")
+
+
+def includeTimings(endpoint):
+    """
+    Decorator for async endpoints: marks where handling ended, so the header can tell
+    serialization apart, and adds `timings` to dict responses of requests that asked.
+    """
+    @functools.wraps(endpoint)
+    async def timed(*args, **kwargs):
+        result = await endpoint(*args, **kwargs)
+        timings = current_timings.get()
+        if timings is not None:
+            timings.handled = time.perf_counter()
+            if timings.in_body and isinstance(result, dict):
+                #A copy, the dict may be shared with other requests or the section cache
+                result = {**result, "timings": timings.toDict()}
+        return result
+    return timed
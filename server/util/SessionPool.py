@@ -0,0 +1,85 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Pool tuning, overridable per deployment
+SESSION_POOL_TTL = int(os.environ.get("SESSION_POOL_TTL", "900"))
+SESSION_POOL_VALIDATE_AFTER = int(os.environ.get("SESSION_POOL_VALIDATE_AFTER", "120"))
+SESSION_POOL_SIZE = int(os.environ.get("SESSION_POOL_SIZE", "2048"))
+
+
+def sessionKey(rollno, password, portal):
+    """Hash the credentials and portal so raw passwords never become pool keys"""
+    digest = hashlib.sha256()
+    for part in (rollno, password, portal):
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class PooledSession:
+    __slots__ = ("session", "created", "last_used")
+
+    def __init__(self, session, now):
+        self.session = session
+        self.created = now
+        self.last_used = now
+
+
+class SessionPool:
+    """
+    LRU pool of logged-in upstream sessions.
+    Entries expire a fixed time after login, and entries that sat idle for
+    longer than validate_after are flagged so the caller can probe them first.
+    A session leaving the pool, by expiry, eviction or invalidation, is only
+    dropped from it: other requests may still be using it, and it is freed
+    once the last of them is done with it.
+    """
+
+    def __init__(self, ttl=SESSION_POOL_TTL, validate_after=SESSION_POOL_VALIDATE_AFTER, max_size=SESSION_POOL_SIZE):
+        self.ttl = ttl
+        self.validate_after = validate_after
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def checkout(self, key):
+        """Return (session, needs_validation), or (None, False) when nothing usable is pooled"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, False
+
+            #Drop sessions that outlived the portal's login lifetime
+            if now - entry.created > self.ttl:
+                del self._entries[key]
+                return None, False
+
+            self._entries.move_to_end(key)
+            needs_validation = now - entry.last_used > self.validate_after
+            entry.last_used = now
+            return entry.session, needs_validation
+
+    def put(self, key, session):
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = PooledSession(session, now)
+            self._entries.move_to_end(key)
+
+            #Evict the least recently used sessions beyond the size bound
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -1,86 +1,200 @@
-from pandas import DataFrame
-from bs4 import BeautifulSoup
-from .Attendance import getCourseNames
+from .ResultTable import ResultTable
+from .Attendance import getCourseNames, getCourseNamesAsync
+from .Parser import parseDocument, findAll, elementText, attributeTokens, hasTag
+from .Metrics import timedParse
+from .Executors import runParse
+from .HomePage import checkPortalPage
+from collections import Counter
+import asyncio
 import re
-from datetime import datetime
+import threading
+from functools import lru_cache
+import calendar
 import logging
 import os
 
 # Setup logging
 logger = logging.getLogger("nimora-api")
 
+SCHEDULE_PAGE_URL = "https://ecampus.psgtech.ac.in/studzone/ContinuousAssessment/CATestTimeTable"
+
 def getExamSchedule(session):
     #Get the exam schedule page
-    schedule_page_url = "https://ecampus.psgtech.ac.in/studzone/ContinuousAssessment/CATestTimeTable"
-    schedule_page = session.get(schedule_page_url)
-
-    #Get the html of the page
-    schedule_page_soup = BeautifulSoup(schedule_page.text , "lxml")
+    schedule_page = session.get(SCHEDULE_PAGE_URL)
+    checkPortalPage(schedule_page)
 
     # Save HTML for debugging (optional)
     # saveHtmlForDebugging(schedule_page.text, "exam_schedule_debug.html")
 
-    #Check for presence of schedule content
-    content_flag = schedule_page_soup.find("div",{"class":"Test-card"})
+    #Map the course codes with course initials
+    course_map = getCourseNames(session)
 
-    if content_flag is None:
-        logger.warning("No Test-card div found on the page")
-        # Try alternative selectors
-        content_flag = schedule_page_soup.find("div",{"class":"test-card"})
-        if content_flag is None:
-            content_flag = schedule_page_soup.find("div",{"class":"exam-card"})
-        if content_flag is None:
-            content_flag = schedule_page_soup.find("table")
-        if content_flag is None:
-            logger.error("No exam content found on the page")
-            return []
-
-    #Get the html of each exam's content - try multiple selectors
-    exams_soup = schedule_page_soup.find_all("div",{"class":"text-left"})
+    return parseExamSchedule(schedule_page.text, course_map)
+
+async def getExamScheduleAsync(client):
+    #Fetch the schedule page and the course names concurrently
+    schedule_page, course_map = await asyncio.gather(
+        client.get(SCHEDULE_PAGE_URL),
+        getCourseNamesAsync(client),
+    )
+    checkPortalPage(schedule_page)
+
+    return await runParse(parseExamSchedule, schedule_page.text, course_map)
+
+# The schedule page has had several layouts, so parseExamSchedule has a chain of
+# selectors for the exam container, the exam items and each item's contents. The
+# classes and tags a page uses are its layout fingerprint: they decide which selector
+# of each chain matches, so the strategy is worked out once per fingerprint and later
+# pages of that layout skip the selectors it cannot match. Probing every selector on the
+# page would find the same container and items, since the fingerprint records exactly
+# what they match.
+
+#Selectors as (tag, class), in the order they are tried
+CONTAINER_SELECTORS = (("div", "Test-card"), ("div", "test-card"), ("div", "exam-card"), ("table", None))
+ITEM_SELECTORS      = (("div", "text-left"), ("div", "exam-item"), ("tr", None), ("div", "card"))
+CONTENT_SELECTORS   = (("span", "sol"), ("td", None), ("div", "exam-detail"), ("span", None), ("p", None))
+
+SELECTOR_CHAINS = CONTAINER_SELECTORS + ITEM_SELECTORS + CONTENT_SELECTORS
+FINGERPRINT_CLASSES = {tag: {name for chain_tag, name in SELECTOR_CHAINS if chain_tag == tag and name} for tag, _ in SELECTOR_CHAINS}
+FINGERPRINT_TAGS = tuple(sorted({tag for tag, name in SELECTOR_CHAINS if name is None}))
+
+#Layouts seen are few, the cache is only cleared if something odd floods it
+MAX_CACHED_LAYOUTS = 64
+
+
+class ScheduleStrategy:
+    """The container and item selector that match a layout, and the content selectors worth trying"""
+    __slots__ = ("container", "items", "contents")
+
+    def __init__(self, container, items, contents):
+        self.container = container
+        self.items = items
+        self.contents = contents
+
+    @property
+    def path(self):
+        return f"{selectorName(self.container)} > {selectorName(self.items)}"
+
+
+#Layout fingerprint -> ScheduleStrategy
+strategy_cache = {}
+strategy_lock = threading.Lock()
+
+#How often each container/items path, content selector and full probe was used
+strategy_hits = Counter()
+
+
+def selectorName(selector):
+    if selector is None:
+        return "none"
+    tag, name = selector
+    return f"{tag}.{name}" if name else tag
+
+
+def selectAll(element, selector):
+    tag, name = selector
+    return findAll(element, tag, {"class": name} if name else None)
+
+
+def layoutFingerprint(document):
+    """The chain classes and tags present on the page, which fix what every selector matches"""
+    present = []
+    for tag, names in FINGERPRINT_CLASSES.items():
+        if names:
+            present.extend(f"{tag}.{name}" for name in names & attributeTokens(document, tag))
+    present.extend(tag for tag in FINGERPRINT_TAGS if hasTag(document, tag))
+    return frozenset(present)
+
+
+def resolveStrategy(fingerprint):
+    present = [selector for selector in SELECTOR_CHAINS if selectorName(selector) in fingerprint]
+    container = next((selector for selector in CONTAINER_SELECTORS if selector in present), None)
+    items = next((selector for selector in ITEM_SELECTORS if selector in present), None)
+    contents = tuple(selector for selector in CONTENT_SELECTORS if selector in present)
+    return ScheduleStrategy(container, items, contents)
+
+
+def scheduleStrategyStats():
+    """Hit counts per selector path and the layouts cached, for diagnostics"""
+    with strategy_lock:
+        return {
+            "layouts" : len(strategy_cache),
+            "hits"    : dict(strategy_hits),
+        }
+
+
+@timedParse
+def parseExamSchedule(html, course_map):
+    #Get the html of the page
+    schedule_page_document = parseDocument(html)
+
+    #Look up how this layout is parsed, working it out the first time it is seen
+    fingerprint = layoutFingerprint(schedule_page_document)
+    with strategy_lock:
+        strategy = strategy_cache.get(fingerprint)
+        if strategy is None:
+            if len(strategy_cache) >= MAX_CACHED_LAYOUTS:
+                strategy_cache.clear()
+            strategy = strategy_cache[fingerprint] = resolveStrategy(fingerprint)
+            strategy_hits["resolved"] += 1
+
+    schedule_data = parseExams(schedule_page_document, strategy, course_map)
+
+    # If no valid data was found, return empty list
+    if not schedule_data:
+        if schedule_data is not None:
+            logger.warning("No valid exam data found")
+        return []
+
+    #Set the result table headers
+    table_headers = ["COURSE_CODE","DATE","TIME"]
+
+    #Create and return a result table
+    table = ResultTable(schedule_data, columns = table_headers)
     
-    if not exams_soup:
-        # Try alternative selectors
-        exams_soup = schedule_page_soup.find_all("div",{"class":"exam-item"})
-    if not exams_soup:
-        exams_soup = schedule_page_soup.find_all("tr")
-    if not exams_soup:
-        exams_soup = schedule_page_soup.find_all("div",{"class":"card"})
+    logger.info(f"Returning {len(table)} exams")
+    return table
+
+def parseExams(schedule_page_document, strategy, course_map):
+    """Exam rows of the page using strategy, None when it has no exam content at all"""
+    #Check for presence of schedule content
+    if strategy.container != CONTAINER_SELECTORS[0]:
+        logger.warning("No Test-card div found on the page")
+    if strategy.container is None:
+        logger.error("No exam content found on the page")
+        return None
+
+    #Get the html of each exam's content
+    exams_soup = selectAll(schedule_page_document, strategy.items) if strategy.items else []
 
     # Check if we found any exams
     if not exams_soup:
         logger.warning("No exam containers found on the page")
-        return []
+        return None
 
     logger.info(f"Found {len(exams_soup)} exam containers")
 
     #Extract exam details and append the records to a list
     schedule_data = []
-
-    #Map the course codes with course initials and store in list of records
-    course_map = getCourseNames(session)
+    hits = Counter({strategy.path: 1})
 
     #Get the required details of each courses' exam
     for i, exam in enumerate(exams_soup):
         # logger.info(f"Processing exam {i+1}")
         
-        #Get the html contents of each exam - try multiple selectors
-        exam_contents = exam.find_all("span",{"class":"sol"})
-        
-        if not exam_contents:
-            # Try alternative selectors
-            exam_contents = exam.find_all("td")
-        if not exam_contents:
-            exam_contents = exam.find_all("div",{"class":"exam-detail"})
-        if not exam_contents:
-            exam_contents = exam.find_all("span")
-        if not exam_contents:
-            exam_contents = exam.find_all("p")
+        #Get the html contents of each exam - the first content selector that matches
+        exam_contents = []
+        for selector in strategy.contents:
+            exam_contents = selectAll(exam, selector)
+            if exam_contents:
+                hits[f"contents:{selectorName(selector)}"] += 1
+                break
         
         # logger.info(f"Found {len(exam_contents)} content elements")
         
         # Log all the content for debugging
         # for j, content in enumerate(exam_contents):
-        #     logger.info(f"  Content {j}: '{content.text.strip()}'")
+        #     logger.info(f"  Content {j}: '{elementText(content).strip()}'")
         
         # Try to extract course code, date, and time more intelligently
         course_code = None
@@ -89,22 +203,22 @@ def getExamSchedule(session):
         
         # Look for course code (usually first element)
         if exam_contents:
-            course_code = exam_contents[0].text.strip()
+            course_code = elementText(exam_contents[0]).strip()
             if course_code.startswith(':'):
                 course_code = course_code[1:].strip()
         
         # Look for date and time in the remaining elements
         for content in exam_contents[1:]:
-            text = content.text.strip()
+            text = elementText(content).strip()
             if text.startswith(':'):
                 text = text[1:].strip()
             
-            # Try to identify if this is a date
-            if isDate(text):
+            # Identify if this is a date or a time
+            kind = classifyToken(text)
+            if kind == "date":
                 date_str = text
                 # logger.info(f"Found date: '{date_str}'")
-            # Try to identify if this is a time
-            elif isTime(text):
+            elif kind == "time":
                 time_str = text
                 # logger.info(f"Found time: '{time_str}'")
         
@@ -113,11 +227,11 @@ def getExamSchedule(session):
             # Try to extract from specific positions
             if len(exam_contents) >= 3:
                 if not date_str:
-                    date_str = exam_contents[2].text.strip()
+                    date_str = elementText(exam_contents[2]).strip()
                     if date_str.startswith(':'):
                         date_str = date_str[1:].strip()
                 if len(exam_contents) >= 5 and not time_str:
-                    time_str = exam_contents[4].text.strip()
+                    time_str = elementText(exam_contents[4]).strip()
                     if time_str.startswith(':'):
                         time_str = time_str[1:].strip()
         
@@ -125,30 +239,30 @@ def getExamSchedule(session):
         if not date_str or not time_str:
             # Look for date/time by searching for labels
             for content in exam_contents:
-                text = content.text.strip().lower()
+                text = elementText(content).strip().lower()
                 if 'date' in text or 'day' in text:
                     # Extract the actual date from this element or next element
-                    date_match = re.search(r'(\d{1,2}[/\-\.]\d{1,2}[/\-\.]\d{2,4})', content.text)
+                    date_match = NUMERIC_DATE.search(elementText(content))
                     if date_match:
                         date_str = date_match.group(1)
                 elif 'time' in text:
                     # Extract the actual time from this element or next element
-                    time_match = re.search(r'(\d{1,2}:\d{2})', content.text)
+                    time_match = CLOCK_TIME.search(elementText(content))
                     if time_match:
                         time_str = time_match.group(1)
         
         # If still no date/time, try to extract from the entire exam container
         if not date_str or not time_str:
-            exam_text = exam.get_text()
+            exam_text = elementText(exam)
             # Look for date patterns in the entire exam text
-            date_matches = re.findall(r'(\d{1,2}[/\-\.]\d{1,2}[/\-\.]\d{2,4})', exam_text)
-            if date_matches:
-                date_str = date_matches[0]
+            date_match = NUMERIC_DATE.search(exam_text)
+            if date_match:
+                date_str = date_match.group(1)
             
             # Look for time patterns in the entire exam text
-            time_matches = re.findall(r'(\d{1,2}:\d{2}(?:\s*(AM|PM|am|pm))?)', exam_text)
-            if time_matches:
-                time_str = time_matches[0][0]
+            time_match = CLOCK_TIME_OF_DAY.search(exam_text)
+            if time_match:
+                time_str = time_match.group(1)
         
         # Validate that we have all required data
         if not course_code or not date_str or not time_str:
@@ -173,19 +287,10 @@ def getExamSchedule(session):
         schedule_data.append(row)
         # logger.info(f"Added exam: {course_code} on {formatted_date} at {time_str}")
 
-    # If no valid data was found, return empty list
-    if not schedule_data:
-        logger.warning("No valid exam data found")
-        return []
+    with strategy_lock:
+        strategy_hits.update(hits)
 
-    #Set the dataframe headers
-    df_headers = ["COURSE_CODE","DATE","TIME"]
-
-    #Create and return a dataframe
-    df = DataFrame(schedule_data, columns = df_headers)
-    
-    logger.info(f"Returning {len(df)} exams")
-    return df
+    return schedule_data
 
 def saveHtmlForDebugging(html_content, filename):
     """Save HTML content to a file for debugging"""
@@ -201,44 +306,115 @@ def saveHtmlForDebugging(html_content, filename):
     except Exception as e:
         logger.warning(f"Could not save debug HTML: {e}")
 
-def isDate(text):
-    """Check if text looks like a date"""
-    if not text:
-        return False
-    
-    # Common date patterns
-    date_patterns = [
-        r'\d{1,2}[/\-\.]\d{1,2}[/\-\.]\d{2,4}',  # DD/MM/YYYY or DD-MM-YYYY
-        r'\d{4}[/\-\.]\d{1,2}[/\-\.]\d{1,2}',   # YYYY/MM/DD or YYYY-MM-DD
-        r'\d{1,2}\s+\w+\s+\d{4}',                # DD Month YYYY
-        r'\w+\s+\d{1,2},?\s+\d{4}',              # Month DD, YYYY
-        r'\d{1,2}/[A-Z]{3}/\d{2}',               # DD/MON/YY (like 28/AUG/25)
-    ]
-    
-    for pattern in date_patterns:
-        if re.search(pattern, text):
-            return True
-    
-    return False
+# Exam dates and times are recognized with patterns compiled once, and dates are
+# normalized by matching the formats directly instead of trying strptime on each and
+# catching its ValueError. The same few exam dates recur for every student, so
+# classifyToken and formatDate remember the strings they have seen.
+
+#What counts as a date or a time anywhere in a token
+DATE_PATTERNS = (
+    r'\d{1,2}[/\-\.]\d{1,2}[/\-\.]\d{2,4}',  # DD/MM/YYYY or DD-MM-YYYY
+    r'\d{4}[/\-\.]\d{1,2}[/\-\.]\d{1,2}',   # YYYY/MM/DD or YYYY-MM-DD
+    r'\d{1,2}\s+\w+\s+\d{4}',                # DD Month YYYY
+    r'\w+\s+\d{1,2},?\s+\d{4}',              # Month DD, YYYY
+    r'\d{1,2}/[A-Z]{3}/\d{2}',               # DD/MON/YY (like 28/AUG/25)
+)
+TIME_PATTERN = r'\d{1,2}:\d{2}'              # HH:MM, also the start of HH:MM:SS and HH:MM AM/PM
+
+#One match decides: a date anywhere wins, otherwise a time anywhere
+TOKEN_KIND = re.compile(
+    rf"(?=.*?(?:{'|'.join(DATE_PATTERNS)}))(?P<date>)|(?=.*?{TIME_PATTERN})(?P<time>)",
+    re.DOTALL,
+)
 
-def isTime(text):
-    """Check if text looks like a time"""
+#Dates and times picked out of labels and whole exam texts
+NUMERIC_DATE      = re.compile(r'(\d{1,2}[/\-\.]\d{1,2}[/\-\.]\d{2,4})')
+CLOCK_TIME        = re.compile(r'(\d{1,2}:\d{2})')
+CLOCK_TIME_OF_DAY = re.compile(r'(\d{1,2}:\d{2}(?:\s*(AM|PM|am|pm))?)')
+
+#DD/MON/YY as the portal prints it (like 28/AUG/25), or with the full year
+PORTAL_DATE = re.compile(r'(\d{1,2})/([A-Z]{3})/(\d{2}|\d{4})')
+MONTH_ABBREVIATIONS = {
+    'JAN': 1, 'FEB': 2, 'MAR': 3, 'APR': 4, 'MAY': 5, 'JUN': 6,
+    'JUL': 7, 'AUG': 8, 'SEP': 9, 'OCT': 10, 'NOV': 11, 'DEC': 12
+}
+
+#The regexes strptime matches these directives with
+MONTH_NAMES = {name.lower(): number for number, name in enumerate(calendar.month_name) if name}
+MONTH_ABBRS = {name.lower(): number for number, name in enumerate(calendar.month_abbr) if name}
+DATE_DIRECTIVES = {
+    'd': r"(?P<d>3[0-1]|[1-2]\d|0[1-9]|[1-9]| [1-9])",
+    'm': r"(?P<m>1[0-2]|0[1-9]|[1-9])",
+    'Y': r"(?P<Y>\d\d\d\d)",
+    'y': r"(?P<y>\d\d)",
+    'B': "(?P<B>" + "|".join(map(re.escape, sorted(MONTH_NAMES, key=len, reverse=True))) + ")",
+    'b': "(?P<b>" + "|".join(map(re.escape, sorted(MONTH_ABBRS, key=len, reverse=True))) + ")",
+}
+
+def strptimePattern(date_format):
+    """Compile date_format into the regex datetime.strptime would match it with"""
+    pieces = re.split(r"(%\w|\s+)", date_format)
+    pattern = "".join(
+        DATE_DIRECTIVES[piece[1]] if piece.startswith('%') else r"\s+" if piece.isspace() else re.escape(piece)
+        for piece in pieces
+    )
+    return re.compile(pattern, re.IGNORECASE)
+
+#Formats tried in order after DD/MON/YY
+DATE_FORMATS = tuple(strptimePattern(date_format) for date_format in (
+    "%d/%m/%Y",    # DD/MM/YYYY
+    "%d-%m-%Y",    # DD-MM-YYYY
+    "%d/%m/%y",    # DD/MM/YY
+    "%d-%m-%y",    # DD-MM-YY
+    "%Y-%m-%d",    # YYYY-MM-DD
+    "%d.%m.%Y",    # DD.MM.YYYY
+    "%d.%m.%y",    # DD.MM.YY
+    "%d %B %Y",    # DD Month YYYY
+    "%B %d, %Y",   # Month DD, YYYY
+    "%d %b %Y",    # DD Mon YYYY
+    "%b %d, %Y",   # Mon DD, YYYY
+))
+
+#Last resort, searched anywhere in the string. The groups are read as day, month, year.
+DATE_SEARCHES = (
+    re.compile(r'(\d{1,2})[/\-\.](\d{1,2})[/\-\.](\d{2,4})'),  # DD/MM/YYYY or DD-MM-YYYY
+    re.compile(r'(\d{4})[/\-\.](\d{1,2})[/\-\.](\d{1,2})'),   # YYYY/MM/DD or YYYY-MM-DD
+)
+
+@lru_cache(maxsize=4096)
+def classifyToken(text):
+    """'date' or 'time' for text that looks like one (a date takes precedence), None otherwise"""
     if not text:
-        return False
-    
-    # Common time patterns
-    time_patterns = [
-        r'\d{1,2}:\d{2}\s*(AM|PM|am|pm)?',      # HH:MM AM/PM
-        r'\d{1,2}:\d{2}:\d{2}',                 # HH:MM:SS
-        r'\d{1,2}:\d{2}',                        # HH:MM
-    ]
-    
-    for pattern in time_patterns:
-        if re.search(pattern, text):
-            return True
-    
-    return False
+        return None
+    match = TOKEN_KIND.match(text)
+    return match.lastgroup if match else None
+
+def isValidDate(year, month, day):
+    return 1 <= year <= 9999 and 1 <= month <= 12 and 1 <= day <= calendar.monthrange(year, month)[1]
 
+def shortDate(year, month, day):
+    return f"{day:02d}-{month:02d}-{year % 100:02d}"
+
+def matchedFormat(match):
+    """(year, month, day) from a DATE_FORMATS match, read the way strptime reads it"""
+    values = match.groupdict()
+    if values.get('Y') is not None:
+        year = int(values['Y'])
+    else:
+        #strptime puts two digit years 69-99 in the 1900s
+        year = int(values['y'])
+        year += 2000 if year <= 68 else 1900
+
+    if values.get('m') is not None:
+        month = int(values['m'])
+    elif values.get('B') is not None:
+        month = MONTH_NAMES.get(values['B'].lower())
+    else:
+        month = MONTH_ABBRS.get(values['b'].lower())
+
+    return year, month, int(values['d'])
+
+@lru_cache(maxsize=4096)
 def formatDate(date_str):
     """
     Format date string to DD-MM-YY format
@@ -251,82 +427,35 @@ def formatDate(date_str):
     date_str = date_str.strip()
     
     # Handle DD/MON/YY format (like 28/AUG/25)
-    if re.match(r'\d{1,2}/[A-Z]{3}/\d{2}', date_str):
-        try:
-            # Parse DD/MON/YY format
-            day, month, year = date_str.split('/')
-            day = int(day)
-            year = int(year)
-            
-            # Convert month abbreviation to number
-            month_map = {
-                'JAN': 1, 'FEB': 2, 'MAR': 3, 'APR': 4, 'MAY': 5, 'JUN': 6,
-                'JUL': 7, 'AUG': 8, 'SEP': 9, 'OCT': 10, 'NOV': 11, 'DEC': 12
-            }
-            
-            if month in month_map:
-                month_num = month_map[month]
-                # Handle 2-digit years
-                if year < 100:
-                    year += 2000
-                
-                # Validate date
-                date_obj = datetime(year, month_num, day)
-                return date_obj.strftime("%d-%m-%y")
-        except (ValueError, KeyError):
-            pass
-    
-    # Try different date formats
-    date_formats = [
-        "%d/%m/%Y",    # DD/MM/YYYY
-        "%d-%m-%Y",    # DD-MM-YYYY
-        "%d/%m/%y",    # DD/MM/YY
-        "%d-%m-%y",    # DD-MM-YY
-        "%Y-%m-%d",    # YYYY-MM-DD
-        "%d.%m.%Y",    # DD.MM.YYYY
-        "%d.%m.%y",    # DD.MM.YY
-        "%d %B %Y",    # DD Month YYYY
-        "%B %d, %Y",   # Month DD, YYYY
-        "%d %b %Y",    # DD Mon YYYY
-        "%b %d, %Y",   # Mon DD, YYYY
-    ]
+    match = PORTAL_DATE.fullmatch(date_str)
+    if match and match.group(2) in MONTH_ABBREVIATIONS:
+        day, year = int(match.group(1)), int(match.group(3))
+        month = MONTH_ABBREVIATIONS[match.group(2)]
+        # Handle 2-digit years
+        if year < 100:
+            year += 2000
+        if isValidDate(year, month, day):
+            return shortDate(year, month, day)
     
-    for fmt in date_formats:
-        try:
-            date_obj = datetime.strptime(date_str, fmt)
-            # Return in DD-MM-YY format
-            return date_obj.strftime("%d-%m-%y")
-        except ValueError:
+    # Try different date formats, each has to match the whole string
+    for date_format in DATE_FORMATS:
+        match = date_format.match(date_str)
+        if match is None or match.end() != len(date_str):
             continue
+        year, month, day = matchedFormat(match)
+        if month is not None and isValidDate(year, month, day):
+            return shortDate(year, month, day)
     
     # If no format matches, try to extract date using regex
-    # Look for patterns like DD/MM/YYYY, DD-MM-YYYY, etc.
-    patterns = [
-        r'(\d{1,2})[/\-\.](\d{1,2})[/\-\.](\d{2,4})',  # DD/MM/YYYY or DD-MM-YYYY
-        r'(\d{4})[/\-\.](\d{1,2})[/\-\.](\d{1,2})',   # YYYY/MM/DD or YYYY-MM-DD
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, date_str)
+    for pattern in DATE_SEARCHES:
+        match = pattern.search(date_str)
         if match:
-            groups = match.groups()
-            if len(groups) == 3:
-                day, month, year = groups
-                try:
-                    # Convert to integers
-                    day = int(day)
-                    month = int(month)
-                    year = int(year)
-                    
-                    # Handle 2-digit years
-                    if year < 100:
-                        year += 2000
-                    
-                    # Validate date
-                    date_obj = datetime(year, month, day)
-                    return date_obj.strftime("%d-%m-%y")
-                except ValueError:
-                    continue
+            day, month, year = map(int, match.groups())
+            # Handle 2-digit years
+            if year < 100:
+                year += 2000
+            if isValidDate(year, month, day):
+                return shortDate(year, month, day)
     
     # If all parsing attempts fail, return None
     return None
@@ -0,0 +1,309 @@
+from requests import Session, Timeout
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit
+from .Metrics import Gauge, upstream_request_seconds, upstream_errors, upstream_timeouts, upstream_in_flight, upstream_queue_seconds, upstream_rejected
+from .Limiter import AdaptiveLimiter, UpstreamBusyError
+from .Deadline import DeadlineExceeded, checkDeadline, timeRemaining
+from .ServerTiming import recordPhase
+import asyncio
+import httpx
+import logging
+import os
+import re
+import time
+import weakref
+
+logger = logging.getLogger("nimora-api")
+
+# Process-wide connection pooling to ecampus.psgtech.ac.in.
+# Every student gets their own session/client (and so their own cookie jar),
+# but all of them borrow connections from the shared pools below, so TCP and
+# TLS handshakes are paid once per connection instead of once per login.
+
+UPSTREAM_POOL_MAXSIZE    = int(os.environ.get("UPSTREAM_POOL_MAXSIZE", "100"))
+UPSTREAM_KEEPALIVE_POOL  = int(os.environ.get("UPSTREAM_KEEPALIVE_POOL", "50"))
+UPSTREAM_KEEPALIVE_EXPIRY = float(os.environ.get("UPSTREAM_KEEPALIVE_EXPIRY", "60"))
+UPSTREAM_WARMUP_CONNECTIONS = int(os.environ.get("UPSTREAM_WARMUP_CONNECTIONS", "2"))
+
+# Requests in flight to the portal at once, adapted to its latency and errors (util/Limiter.py)
+UPSTREAM_LIMIT_INITIAL   = int(os.environ.get("UPSTREAM_LIMIT_INITIAL", "20"))
+UPSTREAM_LIMIT_MIN       = int(os.environ.get("UPSTREAM_LIMIT_MIN", "4"))
+UPSTREAM_LIMIT_MAX       = int(os.environ.get("UPSTREAM_LIMIT_MAX", str(UPSTREAM_POOL_MAXSIZE)))
+UPSTREAM_LIMIT_BACKOFF   = float(os.environ.get("UPSTREAM_LIMIT_BACKOFF", "0.7"))
+UPSTREAM_LIMIT_TOLERANCE = float(os.environ.get("UPSTREAM_LIMIT_TOLERANCE", "2.0"))
+UPSTREAM_QUEUE_SIZE      = int(os.environ.get("UPSTREAM_QUEUE_SIZE", "1000"))
+UPSTREAM_QUEUE_TIMEOUT   = float(os.environ.get("UPSTREAM_QUEUE_TIMEOUT", "30"))
+
+WARMUP_URL = "https://ecampus.psgtech.ac.in/studzone"
+
+#Send portal requests somewhere else, e.g. http://127.0.0.1:9000 for mock_ecampus.py
+PORTAL_ORIGIN    = "https://ecampus.psgtech.ac.in"
+ECAMPUS_BASE_URL = os.environ.get("ECAMPUS_BASE_URL", "").rstrip("/")
+
+UPSTREAM_HEADERS = {
+    "Accept-Encoding" : "gzip, deflate",
+    "Connection"      : "keep-alive",
+}
+
+#Timeouts for the async client, the portal is slow but should never hang forever
+ASYNC_TIMEOUT = httpx.Timeout(60.0, connect=15.0)
+
+#One urllib3 pool manager shared by every requests.Session
+shared_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=UPSTREAM_POOL_MAXSIZE)
+
+#httpx connections belong to the event loop that opened them, so keep one transport per loop
+async_transports = weakref.WeakKeyDictionary()
+
+#Shared by every session and client, sync or async
+upstream_limiter = AdaptiveLimiter(
+    initial=UPSTREAM_LIMIT_INITIAL,
+    min_limit=UPSTREAM_LIMIT_MIN,
+    max_limit=UPSTREAM_LIMIT_MAX,
+    backoff=UPSTREAM_LIMIT_BACKOFF,
+    tolerance=UPSTREAM_LIMIT_TOLERANCE,
+    queue_size=UPSTREAM_QUEUE_SIZE,
+    queue_timeout=UPSTREAM_QUEUE_TIMEOUT,
+)
+
+Gauge("nimora_upstream_limit", "Current concurrency limit for the ecampus portal", function=lambda: int(upstream_limiter.limit))
+Gauge("nimora_upstream_queue_depth", "Requests waiting for a slot under the upstream concurrency limit", function=lambda: upstream_limiter.queue_depth)
+
+
+class PortalSession(Session):
+    """requests.Session with its own cookie jar that borrows the shared connection pool"""
+
+    def __init__(self):
+        super().__init__()
+        self.headers.update(UPSTREAM_HEADERS)
+        self.mount("https://", shared_adapter)
+        self.mount("http://", shared_adapter)
+        self.released = False
+
+    def request(self, method, url, *args, **kwargs):
+        if self.released:
+            raise RuntimeError("Cannot send a request, as the session has been closed")
+        url = portalUrl(url)
+        timer = UpstreamTimer(method, url)
+        timer.acquire()
+        with timer:
+            #requests has no total timeout, so the deadline bounds connecting and each read
+            remaining = checkDeadline(f"{timer.method} {timer.page}")
+            if remaining is not None:
+                kwargs["timeout"] = boundedTimeout(kwargs.get("timeout"), remaining)
+            response = super().request(method, url, *args, **kwargs)
+            timer.answered(response.status_code)
+            return response
+
+    def release(self):
+        """Forget this session's login and refuse further requests, the shared connections stay open"""
+        self.released = True
+        self.cookies.clear()
+
+    def close(self):
+        #The adapter is shared with every other session, leave its connections open
+        self.release()
+
+
+class PortalClient(httpx.AsyncClient):
+    """httpx.AsyncClient with its own cookie jar that borrows the shared transport"""
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        super().__init__(
+            transport=sharedAsyncTransport(),
+            headers=UPSTREAM_HEADERS,
+            follow_redirects=True,
+            timeout=ASYNC_TIMEOUT,
+        )
+        self.released = False
+
+    def build_request(self, method, url, *args, **kwargs):
+        return super().build_request(method, portalUrl(url), *args, **kwargs)
+
+    async def send(self, request, *args, **kwargs):
+        if self.released:
+            raise RuntimeError("Cannot send a request, as the client has been closed")
+        timer = UpstreamTimer(request.method, request.url)
+        await timer.acquireAsync()
+        with timer:
+            remaining = checkDeadline(f"{timer.method} {timer.page}")
+            if remaining is None:
+                response = await super().send(request, *args, **kwargs)
+            else:
+                try:
+                    response = await asyncio.wait_for(super().send(request, *args, **kwargs), remaining)
+                except asyncio.TimeoutError:
+                    raise DeadlineExceeded(f"Request deadline passed during {timer.method} {timer.page}") from None
+            timer.answered(response.status_code)
+            return response
+
+    def release(self):
+        """Forget this client's login and refuse further requests, the shared transport stays open"""
+        self.released = True
+        self.cookies.clear()
+
+    async def aclose(self):
+        #The transport is shared with every other client, leave its connections open
+        self.release()
+
+
+def boundedTimeout(timeout, remaining):
+    """A requests timeout, (connect, read) or single, cut down to the seconds remaining"""
+    if isinstance(timeout, tuple):
+        return tuple(remaining if part is None else min(part, remaining) for part in timeout)
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+def portalUrl(url):
+    """url, moved to ECAMPUS_BASE_URL when one is set"""
+    if ECAMPUS_BASE_URL and isinstance(url, str) and url.startswith(PORTAL_ORIGIN):
+        return ECAMPUS_BASE_URL + url[len(PORTAL_ORIGIN):]
+    return url
+
+
+#Path segments that are ids, collapsed so every student's page shares one metrics label
+ID_SEGMENT = re.compile(r"/(?:\d+|[0-9a-fA-F-]{16,})(?=/|$)")
+
+TIMEOUT_ERRORS = (Timeout, httpx.TimeoutException)
+
+
+def upstreamPage(url):
+    """Page template of an upstream URL for metrics, its path without ids or query"""
+    path = ID_SEGMENT.sub("/{id}", urlsplit(str(url)).path.rstrip("/"))
+    return path or "/"
+
+
+class UpstreamTimer:
+    """
+    Records one upstream request in the metrics and request timings: its time, status and
+    any error. Holds the request's slot under upstream_limiter and reports back how it went.
+    """
+    __slots__ = ("method", "page", "status", "started", "granted")
+
+    def __init__(self, method, url):
+        self.method = method.upper()
+        self.page = upstreamPage(url)
+        self.status = "error"
+        self.granted = None
+
+    def acquire(self):
+        """Wait for a slot from a thread, no longer than the request deadline allows"""
+        started = time.perf_counter()
+        try:
+            self.granted = upstream_limiter.acquire(checkDeadline(f"{self.method} {self.page}"))
+        except UpstreamBusyError as e:
+            self.rejected(e)
+        finally:
+            self.queued(time.perf_counter() - started)
+
+    async def acquireAsync(self):
+        """Wait for a slot from a coroutine, no longer than the request deadline allows"""
+        started = time.perf_counter()
+        try:
+            self.granted = await upstream_limiter.acquireAsync(checkDeadline(f"{self.method} {self.page}"))
+        except UpstreamBusyError as e:
+            self.rejected(e)
+        finally:
+            self.queued(time.perf_counter() - started)
+
+    def rejected(self, error):
+        upstream_rejected.inc(reason=error.reason)
+        #A wait cut short by the deadline is the deadline's doing, not a busy portal
+        checkDeadline(f"{self.method} {self.page}")
+        raise error
+
+    def queued(self, waited):
+        upstream_queue_seconds.observe(waited)
+        #Only waits worth reading about go into the request timings
+        if waited >= 0.001:
+            recordPhase("queue", f"{self.method} {self.page}", waited)
+
+    def __enter__(self):
+        upstream_in_flight.inc()
+        self.started = time.perf_counter()
+        return self
+
+    def answered(self, status_code):
+        self.status = f"{status_code // 100}xx"
+        if status_code >= 500:
+            upstream_errors.inc(page=self.page, reason=f"http_{status_code}")
+
+    def cutOff(self, error):
+        """Whether error is a timeout the request deadline set, sync requests are given what is left of it"""
+        if not isinstance(error, TIMEOUT_ERRORS):
+            return False
+        remaining = timeRemaining()
+        return remaining is not None and remaining <= 0
+
+    def __exit__(self, kind, error, traceback):
+        upstream_in_flight.dec()
+        if isinstance(error, (asyncio.CancelledError, DeadlineExceeded)) or self.cutOff(error):
+            #Given up on by our side, which says nothing about the portal
+            self.status = "cancelled"
+        elif isinstance(error, TIMEOUT_ERRORS):
+            self.status = "timeout"
+            upstream_timeouts.inc(page=self.page)
+        elif error is not None and self.status == "error":
+            upstream_errors.inc(page=self.page, reason=type(error).__name__)
+        elapsed = time.perf_counter() - self.started
+        upstream_request_seconds.observe(elapsed, method=self.method, page=self.page, status=self.status)
+        recordPhase("fetch", f"{self.method} {self.page}", elapsed)
+        if self.granted is not None:
+            if self.status == "cancelled":
+                upstream_limiter.release(None)
+            else:
+                failed = self.status in ("error", "timeout", "5xx")
+                upstream_limiter.release(self.granted, self.page, elapsed, failed)
+        return False
+
+
+def sharedAsyncTransport():
+    """Return the connection pool of the running event loop, creating it on first use"""
+    loop = asyncio.get_running_loop()
+    transport = async_transports.get(loop)
+    if transport is None:
+        transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=UPSTREAM_POOL_MAXSIZE,
+                max_keepalive_connections=UPSTREAM_KEEPALIVE_POOL,
+                keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY,
+            )
+        )
+        async_transports[loop] = transport
+    return transport
+
+
+def newSession():
+    return PortalSession()
+
+
+def newAsyncClient():
+    """Create an async client that behaves like requests.Session for the scrapers"""
+    return PortalClient()
+
+
+def isClientUsable(client):
+    #A client pooled under another event loop holds connections this loop cannot use
+    try:
+        return client.loop is asyncio.get_running_loop()
+    except AttributeError:
+        return True
+
+
+async def warmUpConnections(count=UPSTREAM_WARMUP_CONNECTIONS):
+    """Open keep-alive connections to the portal ahead of the first student request"""
+    if count <= 0:
+        return
+
+    client = newAsyncClient()
+
+    async def warm():
+        try:
+            response = await client.get(WARMUP_URL, timeout=15)
+            await response.aread()
+        except Exception as e:
+            logger.warning(f"Connection warm-up failed: {e}")
+
+    #Concurrent requests force separate connections, which then stay in the pool
+    await asyncio.gather(*(warm() for _ in range(count)))
+    logger.info(f"Warmed up {count} upstream connections")
@@ -0,0 +1,122 @@
+from .Parser import parseDocument, findAll, findFirst, elementString
+from .Metrics import timedParse
+from .Executors import runParse
+from .HomePage import checkPortalPage
+from .Deadline import DeadlineExceeded
+from .Limiter import UpstreamBusyError
+from datetime import datetime
+import pytz
+
+SCHOLARSHIP_PAGE_URL = "https://ecampus.psgtech.ac.in/studzone/Scholar/VallalarScholarship"
+PROFILE_PAGE_URL     = "https://ecampus.psgtech.ac.in/studzone/Profile"
+
+# Try multiple pages to get user info
+USER_INFO_PAGES = [
+    SCHOLARSHIP_PAGE_URL,  # Primary source
+    PROFILE_PAGE_URL       # Backup source
+]
+
+#Failures that end the lookup instead of moving on to the next page
+FATAL_ERRORS = (DeadlineExceeded, UpstreamBusyError)
+
+
+def getUserInfo(session, rollno):
+    """Get the student's name and birthday flag for personalized greetings"""
+    # Initialize default response
+    user_info = {"username": rollno, "is_birthday": False}
+
+    # Any page read is enough, but if none could be the lookup fails rather than
+    # passing the roll number off as the name
+    read, first_error = False, None
+    for page_url in USER_INFO_PAGES:
+        try:
+            page_response = session.get(page_url, timeout=10)  # Add timeout
+            checkPortalPage(page_response)
+
+            parseUserInfo(page_response.text, page_url, user_info, rollno)
+            read = True
+
+            # If we got a username that's not the roll number, we can stop
+            if user_info["username"] != rollno:
+                break
+
+        except FATAL_ERRORS:
+            raise
+        except Exception as page_error:
+            first_error = first_error or page_error
+            continue
+
+    if not read:
+        raise first_error
+    return user_info
+
+
+async def getUserInfoAsync(client, rollno):
+    """Async counterpart of getUserInfo"""
+    user_info = {"username": rollno, "is_birthday": False}
+
+    read, first_error = False, None
+    for page_url in USER_INFO_PAGES:
+        try:
+            page_response = await client.get(page_url, timeout=10)
+            checkPortalPage(page_response)
+
+            await runParse(parseUserInfo, page_response.text, page_url, user_info, rollno)
+            read = True
+
+            if user_info["username"] != rollno:
+                break
+
+        except FATAL_ERRORS:
+            raise
+        except Exception as page_error:
+            first_error = first_error or page_error
+            continue
+
+    if not read:
+        raise first_error
+    return user_info
+
+
+@timedParse
+def parseUserInfo(html, page_url, user_info, rollno):
+    """Update user_info in place from one of the USER_INFO_PAGES"""
+    page_document = parseDocument(html)
+
+    # Check if we're on the scholarship page
+    if page_url == SCHOLARSHIP_PAGE_URL:
+        personal_info_table = findFirst(page_document, "td", {"class": "personal-info"})
+        if personal_info_table is not None:
+            personal_info = findAll(personal_info_table, "td")
+
+            # Get username (first item in personal info)
+            if personal_info and len(personal_info) > 0:
+                username = elementString(personal_info[0]).strip()
+                if username and len(username) > 0:
+                    user_info["username"] = username
+
+            # Get birthday (third item in personal info)
+            if personal_info and len(personal_info) > 2:
+                try:
+                    birthdate_str = elementString(personal_info[2]).strip()
+                    birthdate = datetime.strptime(birthdate_str, "%d/%m/%Y").date()
+
+                    # Get current date in India timezone
+                    IST = pytz.timezone('Asia/Kolkata')
+                    today = datetime.now(IST).date()
+
+                    is_birthday = (birthdate.month == today.month and birthdate.day == today.day)
+                    user_info["is_birthday"] = is_birthday
+                except Exception as e:
+                    pass
+
+    # Check if we're on the profile page
+    elif page_url == PROFILE_PAGE_URL and user_info["username"] == rollno:
+        # Try to find username in profile page if we couldn't from scholarship page
+        name_element = findFirst(page_document, "input", {"id": "txtName"})
+        if name_element is not None and "value" in name_element.attrib:
+            username = name_element.attrib["value"].strip()
+            if username and len(username) > 0:
+                user_info["username"] = username
+
+    return user_info